@@ -22,6 +22,22 @@ from datetime import datetime
 import torch
 import warnings
 
+import uuid
+
+from voicecraft import noise_profiles, pipeline, voices
+from voicecraft.admission import AdmissionRejected, get_gate
+from voicecraft.backends import DEFAULT_F5_PRESET, F5_PRESETS, get_backends
+from voicecraft.config import DATA_DIR
+from voicecraft.figures import waveform_image
+from voicecraft.media import get_media_cache, player_source
+from voicecraft.models import get_model_manager
+from voicecraft.projects import create_project, list_projects
+from voicecraft.resources import get_governor
+from voicecraft.retention import disk_budget_bytes, disk_usage, project_usage
+from voicecraft.rtf import get_rtf_table
+from voicecraft.search import get_search_index
+from voicecraft.spectrogram import colorize, open_pyramid
+
 # Suppress the specific torch.classes warning
 warnings.filterwarnings("ignore", message=".*Tried to instantiate class '__path__._path'.*")
 
@@ -34,16 +50,74 @@ st.set_page_config(
 )
 
 # Create data directory if it doesn't exist
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # Initialize session state variables
 if 'projects' not in st.session_state:
-    st.session_state.projects = {}
+    # Projects on disk, including ones created through the HTTP API
+    st.session_state.projects = list_projects()
 if 'current_project_id' not in st.session_state:
     st.session_state.current_project_id = None
 if 'whisper_model' not in st.session_state:
     st.session_state.whisper_model = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'ingested_uploads' not in st.session_state:
+    # Upload widget file id last stored for each project
+    st.session_state.ingested_uploads = {}
+
+
+def show_queue_status(placeholder, position, eta):
+    """Show the session's place in the inference queue"""
+    placeholder.info(f"Waiting for a free slot - queue position {position}, estimated wait ~{eta:.0f}s")
+
+
+def format_duration(seconds):
+    """Seconds as a short human-readable duration"""
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def play_audio(project, key, start_time=0):
+    """Audio player for an artifact, fed from the media cache or the API"""
+    source, mime_type = player_source(project, key)
+    st.audio(source, format=mime_type, start_time=int(start_time))
+
+
+def show_model_choice(model_size, estimates, budget_minutes):
+    """The model auto picked for the time budget, and every size's estimate"""
+    if estimates[model_size] <= budget_minutes * 60:
+        st.info(f"Using Whisper {model_size}: estimated {format_duration(estimates[model_size])}.")
+    else:
+        st.warning(f"No model is expected to finish within {budget_minutes:g} minutes. "
+                   f"Using Whisper {model_size}: estimated {format_duration(estimates[model_size])}.")
+    st.caption("Estimates on this machine: " + ", ".join(
+        f"{size} {format_duration(seconds)}" for size, seconds in estimates.items()
+    ))
+
+
+def show_waveform(path, title, color):
+    """Waveform of an artifact, rendered once per version and served from the cache"""
+    st.image(get_media_cache().get(waveform_image(path, title, color)), use_column_width=True)
+
+def show_spectrograms(project):
+    """Original and cleaned spectrograms of the same time range, side by side"""
+    keys = [key for key in ('original_audio', 'cleaned_audio') if pipeline.available(project, key)]
+    with st.spinner("Computing spectrograms (once per recording)..."):
+        pyramids = {key: open_pyramid(pipeline.ensure(project, key)) for key in keys}
+    duration = max(pyramid.duration for pyramid in pyramids.values())
+    start, end = st.slider("Time range (seconds)", 0.0, float(duration), (0.0, float(min(duration, 60.0))),
+                           step=0.1, key=f"spectrogram_range_{project['id']}")
+    if end <= start:
+        return
+    for column, (key, pyramid) in zip(st.columns(len(pyramids)), pyramids.items()):
+        image, (shown_start, shown_end) = pyramid.view(start, end, columns=800)
+        column.image(colorize(image), use_column_width=True,
+                     caption=f"{'Original' if key == 'original_audio' else 'Processed'}: "
+                             f"{shown_start:.1f}-{shown_end:.1f}s, 0-8 kHz")
 
 # Sidebar for project management
 with st.sidebar:
@@ -57,18 +131,10 @@ with st.sidebar:
     new_project_name = st.text_input("New Project Name")
     if st.button("Create Project"):
         if new_project_name:
-            project_id = datetime.now().strftime("%Y%m%d%H%M%S")
-            project_dir = os.path.join(DATA_DIR, project_id)
-            os.makedirs(project_dir, exist_ok=True)
-            
-            st.session_state.projects[project_id] = {
-                "name": new_project_name,
-                "dir": project_dir,
-                "original_audio": None,
-                "cleaned_audio": None,
-                "transcription": None,
-                "cloned_audio": None
-            }
+            new_project = create_project(new_project_name)
+            project_id = new_project["id"]
+            
+            st.session_state.projects[project_id] = new_project
             st.session_state.current_project_id = project_id
             st.success(f"Project '{new_project_name}' created!")
         else:
@@ -79,16 +145,37 @@ with st.sidebar:
         st.markdown("---")
         st.subheader("Select Project")
         project_options = {f"{data['name']} ({pid})": pid for pid, data in st.session_state.projects.items()}
+        # A search hit opened on the last run selects its project
+        opened = st.session_state.pop('open_project', None)
+        if opened in st.session_state.projects:
+            st.session_state.project_select = f"{st.session_state.projects[opened]['name']} ({opened})"
         selected_project = st.selectbox(
             "Choose a project",
             options=list(project_options.keys()),
-            index=0 if st.session_state.current_project_id else None
+            index=0 if st.session_state.current_project_id else None,
+            key="project_select"
         )
         
         if selected_project:
             selected_pid = project_options[selected_project]
             st.session_state.current_project_id = selected_pid
     
+    # Search every project's transcript; a hit opens its project at that point
+    st.markdown("---")
+    st.subheader("Search Transcripts")
+    search_query = st.text_input("Phrase", key="search_query")
+    if search_query.strip():
+        hits = get_search_index().search(search_query)
+        if not hits:
+            st.caption("No matches.")
+        for i, hit in enumerate(hits):
+            where = f" at {hit['start']:.0f}s" if hit['start'] is not None else ""
+            st.caption(f"{hit['project_name']}{where}: {hit['snippet']}")
+            if st.button("Open", key=f"search_hit_{i}") and hit['project_id'] in st.session_state.projects:
+                st.session_state.open_project = hit['project_id']
+                st.session_state.seek = (hit['project_id'], hit['start'] or 0, False)
+                st.rerun()
+    
     st.markdown("---")
     st.info("Made with ❤️ by VoiceCraft")
 
@@ -98,6 +185,21 @@ if st.session_state.current_project_id:
     
     st.title(f"Project: {project['name']}")
     
+    # Opened from a search hit: play the recording from the matching segment
+    seek = st.session_state.get('seek')
+    if seek and seek[0] != project['id']:
+        # Another project was opened since
+        del st.session_state.seek
+    elif seek and pipeline.available(project, 'original_audio'):
+        # The player stays while the project is open, but only the first run
+        # starts it at the hit; later reruns do not jump back there
+        hit_project_id, hit_start, played = seek
+        st.session_state.seek = (hit_project_id, hit_start, True)
+        seek_key = 'cleaned_audio' if pipeline.available(project, 'cleaned_audio') else 'original_audio'
+        pipeline.ensure(project, seek_key)
+        st.caption(f"Search hit at {int(hit_start // 60)}:{int(hit_start % 60):02d}")
+        play_audio(project, seek_key, start_time=0 if played else hit_start)
+    
     # Create tabs for different functionalities
     tabs = st.tabs(["Audio Processing", "Transcription", "Voice Cloning"])
     
@@ -106,128 +208,123 @@ if st.session_state.current_project_id:
         st.header("Audio Processing")
         
         # Upload audio file
-        uploaded_file = st.file_uploader("Upload an audio file", type=["wav", "mp3", "m4a", "ogg"])
+        uploaded_file = st.file_uploader("Upload an audio file", type=["wav", "flac", "mp3", "m4a", "ogg"])
         
         if uploaded_file is not None:
-            # Save the uploaded file
-            original_path = os.path.join(project['dir'], "original_audio.wav")
-            
-            with open(original_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-            
-            project['original_audio'] = original_path
+            # Save the uploaded file (the widget keeps its value, so only once per upload)
+            if st.session_state.ingested_uploads.get(project['id']) != uploaded_file.file_id:
+                uploaded_file.seek(0)
+                pipeline.ingest(project, uploaded_file)
+                st.session_state.ingested_uploads[project['id']] = uploaded_file.file_id
+            original_path = project['original_audio']
             st.success("Audio file uploaded successfully!")
             
             # Display audio waveform
-            y, sr = librosa.load(original_path, sr=None)
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.plot(np.linspace(0, len(y)/sr, len(y)), y, color='blue', alpha=0.7)
-            ax.set_xlabel("Time (s)")
-            ax.set_ylabel("Amplitude")
-            ax.set_title("Original Audio Waveform")
-            st.pyplot(fig)
+            show_waveform(original_path, "Original Audio Waveform", "blue")
             
             # Audio player
-            st.audio(original_path)
+            play_audio(project, 'original_audio')
             
             # Noise reduction options
             st.subheader("Noise Reduction")
             apply_noise_reduction = st.checkbox("Apply Noise Reduction", value=True)
             
+            # Stored noise profiles for this project and for recording devices
+            profiles = noise_profiles.list_profiles(project_id=project['id'])
+            profile_options = ["Estimate from this file"] + [
+                f"{p['name']} (v{p['version']}, {p['scope']})" for p in profiles
+            ]
+            profile_choice = st.selectbox("Noise Profile", options=profile_options, index=0,
+                                          disabled=not apply_noise_reduction)
+            noise_profile = None
+            if profile_choice != profile_options[0]:
+                noise_profile = profiles[profile_options.index(profile_choice) - 1]['name']
+            
+            denoise_backend = st.selectbox(
+                "Denoise Backend",
+                options=list(pipeline.DENOISE_BACKENDS),
+                index=0,
+                disabled=not apply_noise_reduction,
+                help="torch runs the same spectral gating as noisereduce as batched tensor operations, with the same "
+                     "output; on CPU its throughput measured about the same (benchmarks/bench_denoise.py)."
+            )
+            
+            with st.expander("Capture Noise Profile"):
+                st.write("Store the noise of this room and mic once, then reuse it for every take.")
+                profile_name = st.text_input("Profile Name", key="noise_profile_name")
+                profile_scope = st.radio("Use For", options=["project", "device"], horizontal=True,
+                                         format_func=lambda s: "This project" if s == "project" else "Every project with this mic",
+                                         key="noise_profile_scope")
+                noise_clip = st.file_uploader("Noise-only clip (optional, otherwise silent parts of this recording are used)",
+                                              type=["wav", "mp3", "m4a", "ogg", "flac"], key="noise_clip")
+                if st.button("Capture Profile", key="capture_profile_button"):
+                    try:
+                        meta = pipeline.capture_noise_profile(project, profile_name.strip(), profile_scope, noise_clip)
+                        st.success(f"Saved noise profile '{meta['name']}' v{meta['version']} "
+                                   f"from {meta['noise_seconds']}s of noise.")
+                    except noise_profiles.NoiseProfileError as e:
+                        st.error(str(e))
+            
             if st.button("Process Audio"):
                 with st.spinner("Processing audio..."):
-                    # Load the audio file
-                    audio_data, sample_rate = librosa.load(original_path, sr=None)
-                    
-                    cleaned_path = os.path.join(project['dir'], "cleaned_audio.wav")
+                    cleaned_path = pipeline.denoise(project, apply_noise_reduction, noise_profile, backend=denoise_backend)
                     
                     if apply_noise_reduction:
-                        # Perform noise reduction
-                        reduced_noise = nr.reduce_noise(
-                            y=audio_data,
-                            sr=sample_rate,
-                            stationary=True,
-                            prop_decrease=1.0
-                        )
-                        # Save the cleaned audio
-                        sf.write(cleaned_path, reduced_noise, sample_rate)
                         st.success("Noise reduction completed!")
                     else:
-                        # Just copy the file without noise reduction
-                        sf.write(cleaned_path, audio_data, sample_rate)
                         st.success("File processed without noise reduction.")
                     
-                    project['cleaned_audio'] = cleaned_path
-                    
                     # Display cleaned audio waveform
-                    y_cleaned, sr_cleaned = librosa.load(cleaned_path, sr=None)
-                    fig, ax = plt.subplots(figsize=(10, 2))
-                    ax.plot(np.linspace(0, len(y_cleaned)/sr_cleaned, len(y_cleaned)), y_cleaned, color='green', alpha=0.7)
-                    ax.set_xlabel("Time (s)")
-                    ax.set_ylabel("Amplitude")
-                    ax.set_title("Processed Audio Waveform")
-                    st.pyplot(fig)
+                    show_waveform(cleaned_path, "Processed Audio Waveform", "green")
                     
                     # Audio player for cleaned audio
                     st.subheader("Processed Audio")
-                    st.audio(cleaned_path)
+                    play_audio(project, 'cleaned_audio')
         
         elif project.get('original_audio') and os.path.exists(project['original_audio']):
             st.success("Audio file already uploaded.")
             
             # Display audio waveform
-            y, sr = librosa.load(project['original_audio'], sr=None)
-            fig, ax = plt.subplots(figsize=(10, 2))
-            ax.plot(np.linspace(0, len(y)/sr, len(y)), y, color='blue', alpha=0.7)
-            ax.set_xlabel("Time (s)")
-            ax.set_ylabel("Amplitude")
-            ax.set_title("Original Audio Waveform")
-            st.pyplot(fig)
+            show_waveform(project['original_audio'], "Original Audio Waveform", "blue")
             
             # Audio player
-            st.audio(project['original_audio'])
-            
-            if project.get('cleaned_audio') and os.path.exists(project['cleaned_audio']):
-                # Display cleaned audio waveform
-                y_cleaned, sr_cleaned = librosa.load(project['cleaned_audio'], sr=None)
-                fig, ax = plt.subplots(figsize=(10, 2))
-                ax.plot(np.linspace(0, len(y_cleaned)/sr_cleaned, len(y_cleaned)), y_cleaned, color='green', alpha=0.7)
-                ax.set_xlabel("Time (s)")
-                ax.set_ylabel("Amplitude")
-                ax.set_title("Processed Audio Waveform")
-                st.pyplot(fig)
+            play_audio(project, 'original_audio')
+            
+            if pipeline.available(project, 'cleaned_audio'):
+                # Display cleaned audio waveform (regenerated first if it was evicted)
+                show_waveform(pipeline.ensure(project, 'cleaned_audio'), "Processed Audio Waveform", "green")
                 
                 # Audio player for cleaned audio
                 st.subheader("Processed Audio")
-                st.audio(project['cleaned_audio'])
+                play_audio(project, 'cleaned_audio')
+    
+        if pipeline.available(project, 'original_audio'):
+            with st.expander("Spectrogram"):
+                # Built (and evicted audio regenerated) only when asked for, not on every rerun
+                if st.checkbox("Show spectrograms", key=f"show_spectrograms_{project['id']}"):
+                    show_spectrograms(project)
     
     # Add this to the Audio Processing tab after displaying the processed audio
-        if project.get('cleaned_audio') and os.path.exists(project['cleaned_audio']):
+        if pipeline.available(project, 'cleaned_audio'):
             st.markdown("---")
             st.subheader("Optimize for Voice Cloning")
             st.write("Trimming the audio to a shorter duration may improve voice cloning performance.")
             
             trim_duration = st.slider("Trim Duration (seconds)", min_value=5, max_value=30, value=10, key="trim_duration")
+            auto_select = st.checkbox(
+                "Pick the cleanest window automatically",
+                value=True,
+                key="auto_select_window",
+                help="Scores the whole file for speech and noise and keeps the best window instead of the first seconds."
+            )
             
             if st.button("Trim Audio", key="trim_audio_button"):
                 with st.spinner(f"Trimming audio to {trim_duration} seconds..."):
                     try:
-                        # Load the audio
-                        y, sr = librosa.load(project['cleaned_audio'], sr=None)
-                        
-                        # Trim to specified duration
-                        samples = min(len(y), int(trim_duration * sr))
-                        trimmed_y = y[:samples]
-                        
-                        # Save trimmed audio
-                        trimmed_path = os.path.join(project['dir'], "trimmed_audio.wav")
-                        sf.write(trimmed_path, trimmed_y, sr)
-                        
-                        # Update project
-                        project['trimmed_audio'] = trimmed_path
+                        start, end = pipeline.trim_reference(project, trim_duration, auto_select=auto_select)
                         
-                        st.success(f"Audio trimmed to {trim_duration} seconds!")
-                        st.audio(trimmed_path)
+                        st.success(f"Audio trimmed to {end - start:.1f} seconds ({start:.1f}s - {end:.1f}s)!")
+                        play_audio(project, 'trimmed_audio')
                     except Exception as e:
                         st.error(f"Error trimming audio: {str(e)}")
 
@@ -236,45 +333,86 @@ if st.session_state.current_project_id:
     with tabs[1]:
         st.header("Audio Transcription")
         
-        if project.get('cleaned_audio') and os.path.exists(project['cleaned_audio']):
+        if pipeline.available(project, 'cleaned_audio'):
+            skip_silence = st.checkbox(
+                "Skip silence",
+                value=True,
+                help="Cut pauses and steady background (hum, hold music) before transcribing; timestamps still refer to the full recording."
+            )
+            
             # Model selection
-            model_size = st.selectbox(
+            model_choice = st.selectbox(
                 "Select Whisper Model Size",
-                options=["tiny", "base", "small", "medium", "large"],
-                index=1  # Default to "base"
+                options=["auto", "tiny", "base", "small", "medium", "large"],
+                index=2,  # Default to "base"
+                help="auto picks the most accurate model expected to finish within your time budget on this machine."
+            )
+            if model_choice == "auto":
+                budget_minutes = st.number_input("Time budget (minutes)", min_value=0.5, value=10.0, step=0.5)
+            word_timestamps = st.checkbox(
+                "Word-level timestamps",
+                value=False,
+                help="Slower, but lets trimmed reference clips get exactly the words they contain."
             )
             
+            # Estimating (and, on a new machine, calibrating) reads the audio, so only on request
+            if st.button("Estimate Time", key="estimate_transcription_button"):
+                with st.spinner("Estimating transcription time..."):
+                    if model_choice == "auto":
+                        show_model_choice(*pipeline.choose_whisper_model(
+                            project, budget_minutes * 60, session_id=st.session_state.session_id,
+                            skip_silence=skip_silence
+                        ), budget_minutes)
+                    else:
+                        st.caption(f"Estimated time on this machine: {format_duration(pipeline.estimate_transcription(project, model_choice, skip_silence=skip_silence))}")
+            
+            # A long transcription interrupted by a restart picks up where it stopped
+            resumable = model_choice != "auto" and pipeline.resumable_transcription(
+                project, model_choice, word_timestamps, skip_silence)
+            if resumable:
+                st.info(f"An interrupted transcription already covered {format_duration(resumable)}; it resumes from there.")
+            
             if st.button("Transcribe Audio"):
-                with st.spinner(f"Loading Whisper {model_size} model and transcribing audio..."):
+                queue_status = st.empty()
+                with st.spinner("Loading Whisper model and transcribing audio..."):
                     try:
-                        # Load model
-                        model = whisper.load_model(model_size)
-                        st.session_state.whisper_model = model
+                        model_size = model_choice
+                        if model_choice == "auto":
+                            model_size, estimates = pipeline.choose_whisper_model(
+                                project, budget_minutes * 60, session_id=st.session_state.session_id,
+                                skip_silence=skip_silence
+                            )
+                            show_model_choice(model_size, estimates, budget_minutes)
                         
-                        # Transcribe
-                        result = model.transcribe(
-                            project['cleaned_audio'],
-                            fp16=False,
-                            language='en',
-                            verbose=False,
-                            temperature=0,
+                        # Waits for a Whisper slot shared with all other sessions,
+                        # then transcribes with the process-wide cached model
+                        result = pipeline.transcribe(
+                            project,
+                            model_size,
+                            session_id=st.session_state.session_id,
+                            on_wait=lambda position, eta: show_queue_status(queue_status, position, eta),
+                            on_start=queue_status.empty,
+                            word_timestamps=word_timestamps,
+                            skip_silence=skip_silence,
+                            on_progress=lambda done, total: queue_status.text(
+                                f"Transcribed {format_duration(done)} of {format_duration(total)}"),
                         )
                         
                         # Get the transcribed text
                         transcribed_text = result["text"]
-                        
-                        # Save the transcription
-                        transcription_path = os.path.join(project['dir'], "transcription.txt")
-                        with open(transcription_path, "w", encoding="utf-8") as f:
-                            f.write(transcribed_text)
-                        
-                        project['transcription'] = transcription_path
                         st.success("Transcription completed!")
+                        if result["skipped_seconds"]:
+                            total_seconds = result["speech_seconds"] + result["skipped_seconds"]
+                            st.caption(f"Skipped {format_duration(result['skipped_seconds'])} of silence "
+                                       f"({100 * result['skipped_seconds'] / total_seconds:.0f}% of {format_duration(total_seconds)}).")
                         
                         # Display transcription
                         st.subheader("Transcription Result")
                         st.text_area("Transcribed Text", transcribed_text, height=200)
                         
+                    except AdmissionRejected as e:
+                        queue_status.empty()
+                        st.error(f"Transcription rejected to protect server memory: {str(e)}")
                     except Exception as e:
                         st.error(f"An error occurred during transcription: {str(e)}")
             
@@ -290,8 +428,7 @@ if st.session_state.current_project_id:
                 edited_text = st.text_area("Edit Transcription", transcribed_text, height=200, key="edit_transcription")
                 
                 if st.button("Save Edited Transcription"):
-                    with open(project['transcription'], 'w', encoding='utf-8') as f:
-                        f.write(edited_text)
+                    pipeline.save_transcription(project, edited_text)
                     st.success("Transcription updated!")
         else:
             st.warning("Please process an audio file first in the 'Audio Processing' tab.")
@@ -300,15 +437,47 @@ if st.session_state.current_project_id:
     with tabs[2]:
         st.header("Voice Cloning")
         
-        if project.get('cleaned_audio') and project.get('transcription') and os.path.exists(project['cleaned_audio']) and os.path.exists(project['transcription']):
-            # Load transcription as reference text
-            with open(project['transcription'], 'r', encoding='utf-8') as f:
-                ref_text = f.read()
+        # Saved voices can be used in any project, without processing audio first
+        has_reference = pipeline.available(project, 'cleaned_audio') and project.get('transcription') and os.path.exists(project['transcription'])
+        saved_voices = {voice['id']: voice for voice in voices.list_voices()}
+        voice_options = (['project'] if has_reference else []) + list(saved_voices)
+        if voice_options:
+            voice_choice = st.selectbox(
+                "Voice",
+                voice_options,
+                format_func=lambda option: "This project's recording" if option == 'project'
+                else f"{saved_voices[option]['name']} ({saved_voices[option]['duration']:.1f}s, saved)",
+                key="voice_choice"
+            )
+        
+        if voice_options:
+            # Reference clip (trimmed if available) and its text
+            if voice_choice == 'project':
+                ref_audio, ref_text = pipeline.reference(project)
+            else:
+                ref_audio, ref_text = voices.reference(voice_choice)
             
             # Display reference text
             st.subheader("Reference Text (from transcription)")
+            if ref_audio == project.get('trimmed_audio'):
+                if ref_text:
+                    st.info("Using the trimmed reference clip and the part of the transcription it covers.")
+                else:
+                    st.info("Using the trimmed reference clip. F5-TTS will transcribe the clip itself.")
             st.text_area("Reference Text", ref_text, height=100, key="ref_text_display", disabled=True)
             
+            # Keep this reference for other projects
+            if voice_choice == 'project':
+                with st.expander("Save to voice library"):
+                    voice_name = st.text_input("Voice name", value=project['name'], key="voice_name_input")
+                    if st.button("Save Voice", key="save_voice_button"):
+                        try:
+                            with st.spinner("Saving voice..."):
+                                voice = pipeline.save_voice(project, voice_name)
+                            st.success(f"Saved voice '{voice['name']}' ({voice['duration']:.1f}s reference).")
+                        except voices.VoiceError as e:
+                            st.error(str(e))
+            
             # Text to generate with cloned voice
             gen_text = st.text_area(
                 "Text to Generate with Cloned Voice", 
@@ -317,6 +486,21 @@ if st.session_state.current_project_id:
                 key="gen_text_input"
             )
             
+            # Speed/quality preset, each with its expected time on this machine
+            clone_estimates = {
+                preset: pipeline.estimate_clone(project, ref_text, gen_text, preset, ref_audio=ref_audio)
+                for preset in F5_PRESETS
+            }
+            clone_preset = st.selectbox(
+                "Quality",
+                list(F5_PRESETS),
+                index=list(F5_PRESETS).index(DEFAULT_F5_PRESET),
+                format_func=lambda preset: f"{preset} ({F5_PRESETS[preset]['nfe_step']} steps, ~{format_duration(clone_estimates[preset])})",
+                key="clone_preset",
+                help="More diffusion steps sound cleaner and take longer; 'draft' is for quick previews."
+            )
+            clone_timeout = pipeline.clone_timeout(clone_estimates[clone_preset])
+            
             # Add debug mode option
             debug_mode = st.checkbox("Debug Mode (Show command details)", key="debug_mode")
             
@@ -325,70 +509,82 @@ if st.session_state.current_project_id:
                 # Create a progress bar
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                # Clicking it reruns the script, which stops the clone at its next progress update
+                st.button("Cancel", key="cancel_clone_button")
                 
                 status_text.text("Initializing voice cloning process...")
                 progress_bar.progress(10)
                 
                 try:
                     # Set output path
-                    output_path = os.path.join(project['dir'], "cloned_voice.wav")
+                    output_path = pipeline.clone_output_path(project)
                     
-                    # Prepare the command
-                    cmd = [
-                        "f5-tts_infer-cli",
-                        "--model", "F5TTS_v1_Base",
-                        "--ref_audio", project['cleaned_audio'],
-                        "--ref_text", ref_text,
-                        "--gen_text", gen_text,
-                        "--output_file", output_path,
-                        "--device", "cpu"  # Force CPU for macOS compatibility
-                    ]
+                    # Prepare the command (CPU for macOS compatibility)
+                    f5_backend = get_backends()[1]
+                    cmd = f5_backend.command(ref_audio, ref_text, gen_text, output_path, preset=clone_preset)
                     
                     # Show command in debug mode
                     if debug_mode:
                         st.code(" ".join(cmd), language="bash")
                         st.write("Running this command directly in terminal might provide more information.")
                     
-                    status_text.text("Running voice cloning process (this may take several minutes)...")
+                    status_text.text("Waiting for a voice cloning slot...")
                     progress_bar.progress(20)
                     
                     # Use subprocess with timeout
                     import subprocess
                     
-                    # Run the process with a timeout
+                    def show_clone_progress(done, total, eta):
+                        if total:
+                            progress_bar.progress(20 + int(75 * done / total))
+                            status_text.text(f"Generating batch {min(done + 1, total)} of {total}, about {format_duration(eta)} left...")
+                        else:
+                            status_text.text(f"Loading the model, about {format_duration(eta)} left...")
+                    
+                    # Run the process with a timeout, limited to this job's share of the CPU
                     try:
-                        process = subprocess.run(
-                            cmd, 
-                            capture_output=True, 
-                            text=True,
-                            timeout=300  # 5 minute timeout
+                        pipeline.clone(
+                            project,
+                            ref_text,
+                            gen_text,
+                            session_id=st.session_state.session_id,
+                            on_wait=lambda position, eta: show_queue_status(status_text, position, eta),
+                            on_start=lambda: status_text.text(f"Running voice cloning process (about {format_duration(clone_estimates[clone_preset])})..."),
+                            backend=f5_backend,
+                            ref_audio=ref_audio,
+                            timeout=clone_timeout,
+                            preset=clone_preset,
+                            on_progress=show_clone_progress
                         )
                         
-                        # Check if process was successful
-                        if process.returncode == 0:
-                            status_text.text("Voice cloning completed!")
-                            progress_bar.progress(100)
-                            project['cloned_audio'] = output_path
-                            st.success("Voice cloning completed successfully!")
-                            
-                            # Display cloned audio
-                            st.subheader("Cloned Voice")
-                            st.audio(output_path)
-                        else:
-                            status_text.text("Process failed")
-                            progress_bar.progress(100)
-                            st.error(f"Voice cloning failed: {process.stderr}")
-                            
-                            if debug_mode:
-                                st.subheader("Error Details")
-                                st.code(process.stderr)
-                                st.subheader("Output")
-                                st.code(process.stdout)
+                        status_text.text("Voice cloning completed!")
+                        progress_bar.progress(100)
+                        st.success("Voice cloning completed successfully!")
+                        
+                        # Display cloned audio
+                        st.subheader("Cloned Voice")
+                        play_audio(project, 'cloned_audio')
+                    
+                    except pipeline.CloneError as e:
+                        status_text.text("Process failed")
+                        progress_bar.progress(100)
+                        st.error(str(e))
+                        
+                        if debug_mode:
+                            st.subheader("Error Details")
+                            st.code(e.stderr)
+                            st.subheader("Output")
+                            st.code(e.stdout)
                     
                     except subprocess.TimeoutExpired:
-                        status_text.text("Process timed out after 5 minutes")
+                        status_text.text(f"Process timed out after {format_duration(clone_timeout)}")
                         progress_bar.progress(100)
                         st.error("Voice cloning process timed out. This might be due to insufficient resources or a problem with the model.")
+                    
+                    except AdmissionRejected as e:
+                        status_text.text("Rejected")
+                        progress_bar.progress(100)
+                        st.error(f"Voice cloning rejected to protect server memory: {str(e)}")
                 
                 except Exception as e:
                     status_text.text("An error occurred")
@@ -444,7 +640,7 @@ if st.session_state.current_project_id:
                             import traceback
                             st.code(traceback.format_exc())
         else:
-            st.warning("Please process an audio file and transcribe it first.")
+            st.warning("Please process an audio file and transcribe it first, or save a voice to the library from another project.")
 
 else:
     st.title("Welcome to VoiceCraft")
@@ -510,6 +706,49 @@ with st.sidebar:
             
             # PyTorch version
             st.write(f"PyTorch Version: {torch.__version__}")
+            
+            # Running inference jobs and their thread budgets
+            governor = get_governor()
+            st.write(f"Inference Threads: {governor.total_threads}")
+            for allocation in governor.active_jobs():
+                st.write(f"- {allocation.stage}: {allocation.threads} threads")
+            
+            # Inference queue per model, with the memory its jobs are expected to need
+            for model_key, counts in get_gate().stats().items():
+                st.write(f"{model_key}: {counts['running']}/{counts['limit']} running "
+                         f"({counts['running_mb']:.0f} MB), {counts['queued']} queued ({counts['queued_mb']:.0f} MB)")
+            
+            # Models held in memory, and those unloaded to make room
+            models = get_model_manager().stats()
+            st.write(f"Loaded Models: {models['resident_mb']:.0f} MB"
+                     + (f" of {models['budget_mb']:.0f} MB budget" if models['budget_mb'] else "")
+                     + f", {models['reloads']} reloads")
+            for model_key, model in sorted(models['loaded'].items()):
+                use = f"in use by {model['in_use']}" if model['in_use'] else f"idle {model['idle_seconds']:.0f}s"
+                st.write(f"- {model_key}: {model['size_mb']:.0f} MB, {use}, {model['uses']} uses, "
+                         f"loaded in {model['load_seconds']:.1f}s" + (", pinned" if model['pinned'] else ""))
+            for model_key, model in sorted(models['unloaded'].items()):
+                st.write(f"- {model_key}: unloaded {model['seconds_ago']:.0f}s ago "
+                         f"({model['unloads']} times), reloads on demand")
+            
+            # Measured model speed on this host (real-time factor: seconds per second of audio)
+            for model_key, fit in get_rtf_table().summary().items():
+                if fit['runs'] and not model_key.endswith(':load'):
+                    st.write(f"{model_key}: RTF {fit['rate']:.2f} + {fit['fixed']:.1f}s over {fit['runs']} runs")
+            
+            # Project storage against the disk budget
+            budget = disk_budget_bytes()
+            st.write(f"Data Directory: {disk_usage(DATA_DIR) / (1024 ** 2):.1f} MB"
+                     + (f" of {budget / (1024 ** 2):.0f} MB budget" if budget else ""))
+            if st.session_state.current_project_id:
+                usage = project_usage(st.session_state.projects[st.session_state.current_project_id]['dir'])
+                st.write(f"This Project: {usage['total'] / (1024 ** 2):.1f} MB "
+                         f"({usage['regenerable'] / (1024 ** 2):.1f} MB regenerable)")
+            
+            # Audio bytes kept in memory for the players
+            media = get_media_cache().stats()
+            st.write(f"Media Cache: {media['bytes'] / (1024 ** 2):.1f} / {media['max_bytes'] / (1024 ** 2):.0f} MB, "
+                     f"{media['hits']} hits, {media['misses']} misses")
         
         except Exception as e:
             st.error(f"Error getting system info: {str(e)}")
@@ -112,6 +112,7 @@ if st.session_state.current_project_id:
             ax.set_ylabel("Amplitude")
             ax.set_title("Original Audio Waveform")
             st.pyplot(fig)
+            plt.close(fig)
             
             # Audio player
             st.audio(original_path)
@@ -153,6 +154,7 @@ if st.session_state.current_project_id:
                     ax.set_ylabel("Amplitude")
                     ax.set_title("Processed Audio Waveform")
                     st.pyplot(fig)
+                    plt.close(fig)
                     
                     # Audio player for cleaned audio
                     st.subheader("Processed Audio")
@@ -169,6 +171,7 @@ if st.session_state.current_project_id:
             ax.set_ylabel("Amplitude")
             ax.set_title("Original Audio Waveform")
             st.pyplot(fig)
+            plt.close(fig)
             
             # Audio player
             st.audio(project['original_audio'])
@@ -182,6 +185,7 @@ if st.session_state.current_project_id:
                 ax.set_ylabel("Amplitude")
                 ax.set_title("Processed Audio Waveform")
                 st.pyplot(fig)
+                plt.close(fig)
                 
                 # Audio player for cleaned audio
                 st.subheader("Processed Audio")
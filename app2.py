@@ -198,6 +198,7 @@ if st.session_state.current_project_id:
             ax.set_ylabel("Amplitude")
             ax.set_title("Original Audio Waveform")
             st.pyplot(fig)
+            plt.close(fig)
             
             # Audio player - REMOVED KEY PARAMETER
             st.audio(original_path, format="audio/wav")
@@ -239,6 +240,7 @@ if st.session_state.current_project_id:
                     ax.set_ylabel("Amplitude")
                     ax.set_title("Processed Audio Waveform")
                     st.pyplot(fig)
+                    plt.close(fig)
                     
                     # Audio player for cleaned audio - REMOVED KEY PARAMETER
                     st.subheader("Processed Audio")
@@ -255,6 +257,7 @@ if st.session_state.current_project_id:
             ax.set_ylabel("Amplitude")
             ax.set_title("Original Audio Waveform")
             st.pyplot(fig)
+            plt.close(fig)
             
             # Audio player - REMOVED KEY PARAMETER
             st.audio(project['original_audio'], format="audio/wav")
@@ -268,6 +271,7 @@ if st.session_state.current_project_id:
                 ax.set_ylabel("Amplitude")
                 ax.set_title("Processed Audio Waveform")
                 st.pyplot(fig)
+                plt.close(fig)
                 
                 # Audio player for cleaned audio - REMOVED KEY PARAMETER
                 st.subheader("Processed Audio")
@@ -393,6 +397,7 @@ if st.session_state.current_project_id:
                         ax.set_ylabel("Amplitude")
                         ax.set_title("Generated Audio Waveform")
                         st.pyplot(fig)
+                        plt.close(fig)
                         
                     except Exception as e:
                         st.error(f"An error occurred during voice cloning: {str(e)}")
@@ -411,6 +416,7 @@ if st.session_state.current_project_id:
                 ax.set_ylabel("Amplitude")
                 ax.set_title("Generated Audio Waveform")
                 st.pyplot(fig, key="existing_cloned_voice_waveform")
+                plt.close(fig)
         else:
             st.warning("Please process an audio file and transcribe it first.")
 else:
@@ -0,0 +1,102 @@
+"""
+Torch spectral gating backend: equivalence with noisereduce and batch throughput.
+
+First checks that ``spectral_gate_torch`` reproduces ``nr.reduce_noise(...,
+stationary=True, prop_decrease=1.0)`` on synthetic noisy speech-like files of
+several lengths (batched together, including one longer than a chunk), both
+with stored thresholds and with thresholds estimated on the fly. Then compares files per second of the sequential
+noisereduce path with the torch backend at batch sizes 1 to 64.
+
+Usage:
+    python benchmarks/bench_denoise.py --files 64 --seconds 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voicecraft.denoise import CHUNK_SIZE, noise_statistics, spectral_gate_torch
+
+SAMPLE_RATE = 16000
+
+# Largest sample difference accepted as "the same output" when both sides
+# gate against the same threshold (float32 rounding)
+TOLERANCE = 1e-5
+
+# When torch estimates the threshold itself, float32 rounding can flip the odd
+# time-frequency bin sitting right at the threshold, so compare by correlation
+MIN_CORRELATION = 0.9999
+
+
+def synthetic_file(seconds, rng):
+    """Gated tone bursts (syllable-like) over stationary noise"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 300) * t) * (np.sin(2 * np.pi * rng.uniform(2, 5) * t) > 0)
+    return (voice + rng.normal(0, 0.03, len(t))).astype(np.float32)
+
+
+def check_equivalence(rng):
+    import noisereduce as nr
+
+    lengths = [0.5, 3, 10, 45, 80]
+    signals = [synthetic_file(seconds, rng) for seconds in lengths]
+    expected = [nr.reduce_noise(y=y, sr=SAMPLE_RATE, stationary=True, prop_decrease=1.0) for y in signals]
+    # Thresholds as a noise profile would store them (noisereduce clips the
+    # noise estimate to the first chunk)
+    thresholds = [noise_statistics(y[:CHUNK_SIZE])[2] for y in signals]
+    with_profile = spectral_gate_torch(signals, SAMPLE_RATE, thresholds=thresholds)
+    estimated = spectral_gate_torch(signals, SAMPLE_RATE)
+
+    print("Equivalence with nr.reduce_noise:")
+    print("   length   profile max|diff|   estimated max|diff|  corr")
+    ok = True
+    for seconds, a, b, c in zip(lengths, expected, with_profile, estimated):
+        profile_diff = float(np.max(np.abs(a - b)))
+        estimated_diff = float(np.max(np.abs(a - c)))
+        corr = float(np.corrcoef(a, c)[0, 1])
+        passed = profile_diff <= TOLERANCE and corr >= MIN_CORRELATION
+        ok = ok and passed
+        print(f"  {seconds:>6}s  {profile_diff:17.2e}  {estimated_diff:20.2e}  {corr:.6f}  "
+              f"{'ok' if passed else 'MISMATCH'}")
+    return ok
+
+
+def throughput(files):
+    import noisereduce as nr
+
+    print(f"\nThroughput on {len(files)} files:")
+    start = time.perf_counter()
+    for y in files:
+        nr.reduce_noise(y=y, sr=SAMPLE_RATE, stationary=True, prop_decrease=1.0)
+    elapsed = time.perf_counter() - start
+    print(f"  noisereduce (sequential)  {len(files) / elapsed:8.2f} files/s")
+
+    batch_size = 1
+    while batch_size <= 64:
+        start = time.perf_counter()
+        for i in range(0, len(files), batch_size):
+            spectral_gate_torch(files[i:i + batch_size], SAMPLE_RATE, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"  torch batch {batch_size:>2}            {len(files) / elapsed:8.2f} files/s")
+        batch_size *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of each throughput file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ok = check_equivalence(rng)
+    throughput([synthetic_file(args.seconds, rng) for _ in range(args.files)])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
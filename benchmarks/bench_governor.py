@@ -0,0 +1,81 @@
+"""
+Throughput of mixed concurrent inference load with and without the governor.
+
+Each job is a child process doing BLAS-heavy numpy work sized like one of the
+pipeline stages, which is how the F5-TTS CLI and most of the Whisper/librosa
+math behave on CPU. Without the governor every job spins up one thread per
+core and they oversubscribe the machine; with it the jobs share the cores.
+
+Usage:
+    python benchmarks/bench_governor.py --rounds 3 --mix transcribe,transcribe,clone
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voicecraft.resources import ResourceGovernor, STAGE_WEIGHTS, available_cores
+
+# Child workload: repeated matrix products, scaled by the stage weight
+WORKLOAD = """
+import sys, numpy as np
+n, reps = int(sys.argv[1]), int(sys.argv[2])
+a = np.random.rand(n, n).astype(np.float32)
+for _ in range(reps):
+    a = (a @ a) / n
+"""
+
+
+def run_job(stage, governor, size, timings):
+    reps = 4 * STAGE_WEIGHTS.get(stage, 1)
+    cmd = [sys.executable, "-c", WORKLOAD, str(size), str(reps)]
+    start = time.perf_counter()
+    if governor is None:
+        subprocess.run(cmd, check=True)
+    else:
+        with governor.stage(stage) as allocation:
+            subprocess.run(cmd, check=True, env=governor.subprocess_env(allocation))
+    timings.append((stage, time.perf_counter() - start))
+
+
+def run_mix(mix, governor, size):
+    timings = []
+    threads = [threading.Thread(target=run_job, args=(stage, governor, size, timings)) for stage in mix]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="transcribe,transcribe,clone", help="comma separated stages run at once")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1024, help="matrix size of the synthetic workload")
+    parser.add_argument("--pin", action="store_true", help="pin governed jobs to CPUs")
+    args = parser.parse_args()
+
+    mix = [stage.strip() for stage in args.mix.split(",") if stage.strip()]
+    print(f"Cores: {available_cores()}  Mix: {mix}  Rounds: {args.rounds}")
+
+    for label, governor in (
+        ("ungoverned", None),
+        ("governed", ResourceGovernor(pin_cpus=args.pin)),
+    ):
+        walls = []
+        for _ in range(args.rounds):
+            wall, _ = run_mix(mix, governor, args.size)
+            walls.append(wall)
+        best = min(walls)
+        print(f"{label:>11}: best {best:.2f}s  mean {sum(walls) / len(walls):.2f}s  "
+              f"throughput {len(mix) / best:.2f} jobs/s")
+
+
+if __name__ == "__main__":
+    main()
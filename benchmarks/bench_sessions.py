@@ -0,0 +1,207 @@
+"""
+How many concurrent app sessions one process can serve before reruns stall.
+
+Each simulated session walks the whole flow: create a project, upload,
+process, transcribe and clone. Whisper and F5-TTS are the deterministic
+stubs (``VOICECRAFT_BACKEND=stub``) with ``--latency`` seconds per call, so
+what is measured is the app around the models: the queueing, the audio
+work and Streamlit's reruns. The session count is stepped up (``--sessions
+1,2,4,8``), and every step reports per-stage latency percentiles, rerun
+times, throughput and how much the process's memory grew.
+
+The ``apptest`` driver runs app.py in-process with Streamlit's AppTest,
+one AppTest per session on its own thread, sharing the module-level gate,
+governor and caches the way sessions of one ``streamlit run`` do. AppTest
+cannot drive a file uploader, so upload and processing go through the
+pipeline calls the app's handlers make, and the page is rerun afterwards.
+The ``pipeline`` driver skips Streamlit entirely and only needs numpy,
+librosa and soundfile.
+
+Usage:
+    python benchmarks/bench_sessions.py --sessions 1,2,4,8 --latency 0.5
+    python benchmarks/bench_sessions.py --driver pipeline --sessions 1,4,16,32
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+STAGES = ("create", "upload", "process", "transcribe", "clone")
+
+
+def make_wav(seconds, sr=16000, seed=0):
+    """Bytes of a WAV with tone bursts over low noise, like speech with pauses"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 180 * t) * (np.sin(2 * np.pi * 0.4 * t) > 0) + 0.01 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes((np.clip(y, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def rss_mb():
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 ** 2)
+
+
+class Recorder:
+    """Latencies and errors of every session in one step"""
+
+    def __init__(self):
+        self.timings = {}
+        self.errors = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def time(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        with self._lock:
+            self.timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def error(self, session, error):
+        with self._lock:
+            self.errors.append(f"session {session}: {error}")
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+
+def pipeline_session(index, recorder, audio, model_size, data_dir):
+    from voicecraft import pipeline
+    from voicecraft.projects import create_project
+
+    session_id = f"load-{index}"
+    project = recorder.time("create", create_project, f"load {index}", data_dir)
+    recorder.time("upload", pipeline.ingest, project, io.BytesIO(audio))
+    recorder.time("process", pipeline.denoise, project, True)
+    recorder.time("transcribe", pipeline.transcribe, project, model_size, session_id=session_id)
+    ref_audio, ref_text = pipeline.reference(project)
+    recorder.time("clone", pipeline.clone, project, ref_text, "A sentence in the cloned voice.",
+                  session_id=session_id, ref_audio=ref_audio, preset="draft")
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def apptest_session(index, recorder, audio, model_size, data_dir, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    from voicecraft import pipeline
+
+    def run(name, element=None):
+        target = at if element is None else element
+        recorder.time(name, target.run, timeout=timeout)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+    at = AppTest.from_file(os.path.join(REPO_DIR, "app.py"), default_timeout=timeout)
+    run("rerun")
+    at.sidebar.text_input[0].input(f"load {index}")
+    run("create", _widget(at.button, "Create Project").click())
+    project_id = at.session_state["current_project_id"]
+    project = at.session_state["projects"][project_id]
+    run("rerun", at.selectbox(key="project_select").select(f"{project['name']} ({project_id})"))
+
+    # What the upload and Process Audio handlers do, on the session's own project dict
+    recorder.time("upload", pipeline.ingest, project, io.BytesIO(audio))
+    recorder.time("process", pipeline.denoise, project, True)
+    run("rerun")
+
+    run("rerun", _widget(at.selectbox, "Select Whisper Model Size").select(model_size))
+    run("transcribe", _widget(at.button, "Transcribe Audio").click())
+    run("clone", at.button(key="clone_voice_button").click())
+    run("rerun")
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def run_step(sessions, args, audio):
+    from voicecraft.admission import AdmissionRejected
+
+    recorder = Recorder()
+
+    def session(index):
+        try:
+            if args.driver == "apptest":
+                apptest_session(index, recorder, audio, args.model_size, args.data_dir, args.timeout)
+            else:
+                pipeline_session(index, recorder, audio, args.model_size, args.data_dir)
+        except AdmissionRejected:
+            # The memory gate turning a session away is a result, not a failure
+            recorder.reject()
+        except Exception as e:
+            recorder.error(index, e)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma separated concurrent session counts")
+    parser.add_argument("--driver", choices=("apptest", "pipeline"), default="apptest")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub Whisper/F5-TTS call")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of the uploaded recording")
+    parser.add_argument("--model-size", default="tiny")
+    parser.add_argument("--min-free-mb", type=int, default=1024,
+                        help="VOICECRAFT_MIN_FREE_MB; the stubs reserve only their audio buffers, no model memory")
+    parser.add_argument("--timeout", type=float, default=300.0, help="longest a single rerun may take")
+    parser.add_argument("--data-dir", default=None, help="defaults to a temporary directory")
+    args = parser.parse_args()
+
+    args.data_dir = args.data_dir or tempfile.mkdtemp(prefix="voicecraft-load-")
+    # Read by voicecraft.config at import, so set before anything imports it
+    os.environ["VOICECRAFT_BACKEND"] = "stub"
+    os.environ["VOICECRAFT_STUB_LATENCY"] = str(args.latency)
+    os.environ["VOICECRAFT_DATA_DIR"] = args.data_dir
+    os.environ["VOICECRAFT_MIN_FREE_MB"] = str(args.min_free_mb)
+    os.environ.setdefault("VOICECRAFT_GATE_LIMITS", "whisper:2,f5tts:1")
+
+    audio = make_wav(args.seconds)
+    counts = [int(count) for count in args.sessions.split(",") if count.strip()]
+    print(f"Driver: {args.driver}  Stub latency: {args.latency}s  Audio: {args.seconds:g}s  "
+          f"Data: {args.data_dir}")
+
+    baseline = rss_mb()
+    for sessions in counts:
+        before = rss_mb()
+        wall, recorder = run_step(sessions, args, audio)
+        after = rss_mb()
+        completed = sessions - len(recorder.errors) - recorder.rejected
+        print(f"\n{sessions} sessions: {wall:.1f}s wall, {completed / wall:.2f} flows/s, "
+              f"{recorder.rejected} rejected by the memory gate, RSS {after:.0f} MB (+{after - before:.0f} this step, +{after - baseline:.0f} total)")
+        for name in STAGES + ("rerun",):
+            values = recorder.timings.get(name, [])
+            if values:
+                print(f"  {name:>10}: p50 {percentile(values, 50):6.2f}s  p95 {percentile(values, 95):6.2f}s  "
+                      f"max {max(values):6.2f}s  (n={len(values)})")
+        for error in recorder.errors[:5]:
+            print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import pytest
+
+from voicecraft import admission
+from voicecraft.admission import AdmissionRejected, InferenceGate
+
+
+@pytest.fixture
+def free_mb(monkeypatch):
+    memory = {"available": 5296.0}
+    monkeypatch.setattr(admission, "_available_memory_mb", lambda: memory["available"])
+    return memory
+
+
+def test_job_waiting_for_the_same_model_is_queued_not_rejected(free_mb):
+    gate = InferenceGate(limits={"f5tts": 1}, min_free_mb=0)
+    first = gate.submit("f5tts", "a", working_set_mb=3178)
+    second = gate.submit("f5tts", "b", working_set_mb=3178)
+    assert first.granted and not second.granted
+    assert gate.position(second) == 1
+
+    gate.release(first)
+    assert second.granted
+
+
+def test_job_is_granted_once_other_models_give_memory_back(free_mb):
+    gate = InferenceGate(limits={"whisper": 1, "f5tts": 1}, min_free_mb=0)
+    clone = gate.submit("f5tts", "a", working_set_mb=3000)
+    transcription = gate.submit("whisper:small", "b", working_set_mb=3000)
+    # The whisper slot is free but the clone still holds the memory
+    assert not transcription.granted
+
+    gate.release(clone)
+    assert transcription.granted
+
+
+def test_job_that_can_never_fit_is_rejected(free_mb):
+    gate = InferenceGate(min_free_mb=1024)
+    with pytest.raises(AdmissionRejected):
+        gate.submit("whisper:large", "a", working_set_mb=5000)
+    assert gate.stats() == {}
+
+
+def test_sessions_are_served_round_robin(free_mb):
+    gate = InferenceGate(limits={"whisper": 1}, min_free_mb=0)
+    a1, a2, a3 = (gate.submit("whisper:tiny", "a") for _ in range(3))
+    b1 = gate.submit("whisper:tiny", "b")
+    assert a1.granted
+    assert [gate.position(t) for t in (a2, b1, a3)] == [1, 2, 3]
+
+    gate.release(a1)
+    assert a2.granted and not b1.granted
+    gate.release(a2)
+    assert b1.granted and not a3.granted
+    gate.release(b1)
+    assert a3.granted
+
+
+def test_cancelled_ticket_leaves_the_queue(free_mb):
+    gate = InferenceGate(limits={"whisper": 1}, min_free_mb=0)
+    running = gate.submit("whisper:tiny", "a")
+    waiting = gate.submit("whisper:tiny", "b")
+    last = gate.submit("whisper:tiny", "c")
+    gate.release(waiting)
+    assert waiting.cancelled
+    assert gate.position(last) == 1
+    gate.release(running)
+    assert last.granted
+
+
+def test_estimated_wait_counts_the_running_job_and_full_rounds(free_mb):
+    gate = InferenceGate(limits={"whisper": 2}, min_free_mb=0)
+    running = [gate.submit("whisper:tiny", session) for session in ("a", "b")]
+    waiting = [gate.submit("whisper:tiny", session) for session in ("c", "d", "e")]
+    gate._queue("whisper:tiny").service_time = 10.0
+    for ticket, started_ago in zip(running, (4.0, 7.0)):
+        ticket.started_at -= started_ago
+
+    assert gate.estimated_wait(running[0]) == 0.0
+    # The first slot frees in ~3 s; two jobs fit in each later round
+    assert [gate.estimated_wait(t) for t in waiting] == pytest.approx([3.0, 3.0, 13.0], abs=0.5)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from voicecraft.analysis import condense, remap_times, select_best_window, speech_regions
+
+SR = 16000
+
+
+def _syllables(seconds, amplitude):
+    # 150 ms tone bursts separated by 100 ms pauses, roughly the rhythm of speech
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * ((t % 0.25) < 0.15) * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _recording():
+    # 30 s of faint noise with quiet speech at 3-7 s, clear speech at
+    # 12-18 s and a loud steady hum at 22-28 s
+    y = 0.001 * np.random.default_rng(0).standard_normal(30 * SR).astype(np.float32)
+    y[3 * SR:7 * SR] += _syllables(4, 0.02)
+    y[12 * SR:18 * SR] += _syllables(6, 0.3)
+    y[22 * SR:28 * SR] += 0.5 * np.sin(2 * np.pi * 60 * np.arange(6 * SR) / SR)
+    return y
+
+
+def test_best_window_lies_in_the_clearest_speech():
+    start, end, score = select_best_window(_recording(), SR, 4.0)
+    assert end - start == 4 * SR
+    assert 12 * SR <= start and end <= 18 * SR
+    assert 0.5 < score <= 1.0
+
+
+def test_file_shorter_than_the_window_is_used_whole():
+    y = _recording()[:2 * SR]
+    assert select_best_window(y, SR, 4.0) == (0, 2 * SR, 1.0)
+
+
+def _speech_with_pauses():
+    # Speech at 2-4 s and 4.5-6 s (a short pause), 10-11 s and 20-23 s
+    y = 0.001 * np.random.default_rng(0).standard_normal(30 * SR).astype(np.float32)
+    for start, end in ((2, 4), (4.5, 6), (10, 11), (20, 23)):
+        y[int(start * SR):int(end * SR)] += _syllables(end - start, 0.3)
+    return y
+
+
+def test_speech_regions_cut_long_silences_only():
+    regions = speech_regions(_speech_with_pauses(), SR) / SR
+    assert len(regions) == 3
+    for (start, end), (speech_start, speech_end) in zip(regions, ((2, 6), (10, 11), (20, 23))):
+        assert speech_start - 0.3 <= start <= speech_start
+        assert speech_end - 0.3 <= end <= speech_end + 0.3
+
+
+def test_times_in_condensed_audio_map_back_to_the_original():
+    y = _speech_with_pauses()
+    regions = speech_regions(y, SR)
+    condensed = condense(y, regions)
+    lengths = (regions[:, 1] - regions[:, 0]) / SR
+    assert len(condensed) == int((regions[:, 1] - regions[:, 0]).sum())
+
+    # Moments spoken at 3.0, 10.5 and 21.0 s, found in the condensed audio
+    originals = np.array([3.0, 10.5, 21.0])
+    joins = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    condensed_times = joins + originals - regions[:, 0] / SR
+    np.testing.assert_allclose(remap_times(condensed_times, regions, SR), originals)
+    np.testing.assert_array_equal(condensed[int(round(condensed_times[1] * SR))], y[int(10.5 * SR)])
+
+    # A time on a join starts the next region or ends the previous one
+    join = joins[1]
+    assert remap_times([join], regions, SR, side="right")[0] == pytest.approx(regions[1, 0] / SR)
+    assert remap_times([join], regions, SR, side="left")[0] == pytest.approx(regions[0, 1] / SR)
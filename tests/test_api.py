@@ -0,0 +1,105 @@
+import http.client
+import io
+import json
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from voicecraft.api import VoiceCraftServer
+from voicecraft.backends import get_backends
+
+
+def _wav(seconds=3.0, sr=16000):
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 220 * t)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes((y * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("VOICECRAFT_API_LOG", "0")
+    server = VoiceCraftServer(("127.0.0.1", 0), str(tmp_path), get_backends("stub"), max_jobs=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=30)
+    if isinstance(body, dict):
+        body = json.dumps(body).encode("utf-8")
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+
+def _wait(server, job):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        status, data = _request(server, "GET", f"/jobs/{job['id']}")
+        job = json.loads(data)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job['id']} did not finish")
+
+
+def test_upload_transcribe_download(server):
+    status, data = _request(server, "POST", "/projects", {"name": "round trip"})
+    assert status == 201
+    project_id = json.loads(data)["id"]
+
+    status, _ = _request(server, "POST", f"/projects/{project_id}/audio", _wav(),
+                         {"Content-Type": "audio/wav"})
+    assert status == 201
+
+    status, data = _request(server, "POST", f"/projects/{project_id}/denoise", {"noise_reduction": False})
+    assert status == 202
+    assert _wait(server, json.loads(data))["status"] == "succeeded"
+
+    status, data = _request(server, "POST", f"/projects/{project_id}/transcribe", {"model_size": "tiny"})
+    assert status == 202
+    job = _wait(server, json.loads(data))
+    assert job["status"] == "succeeded", job
+    text = job["result"]["text"]
+    assert text
+
+    status, data = _request(server, "GET", f"/projects/{project_id}/artifacts/transcription")
+    assert status == 200
+    assert data.decode("utf-8") == text
+
+
+def test_malformed_bodies_get_a_status(server):
+    status, data = _request(server, "POST", "/projects", {"name": "bad bodies"})
+    project_id = json.loads(data)["id"]
+
+    connection = http.client.HTTPConnection(*server.server_address, timeout=30)
+    connection.putrequest("POST", f"/projects/{project_id}/audio")
+    connection.putheader("Content-Length", "ten")
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    connection.close()
+
+    connection = http.client.HTTPConnection(*server.server_address, timeout=30)
+    connection.putrequest("POST", f"/projects/{project_id}/audio")
+    connection.putheader("Transfer-Encoding", "chunked")
+    connection.endheaders()
+    connection.send(b"zz\r\nabc\r\n0\r\n\r\n")
+    response = connection.getresponse()
+    assert response.status == 400
+    connection.close()
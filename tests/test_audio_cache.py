@@ -0,0 +1,19 @@
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from voicecraft import audio_cache
+
+
+@pytest.mark.parametrize("sample_rate,channels", [(44100, 2), (16000, 1), (22050, 1)])
+def test_streamed_decode_matches_librosa(tmp_path, monkeypatch, sample_rate, channels):
+    monkeypatch.setattr(audio_cache, "DECODE_BLOCK_FRAMES", 10000)
+    y = 0.3 * np.random.default_rng(0).standard_normal((sample_rate * 3 + 123, channels))
+    path = str(tmp_path / "audio.flac")
+    sf.write(path, y.astype(np.float32), sample_rate)
+
+    expected, _ = librosa.load(path, sr=16000, mono=True)
+    decoded = np.asarray(audio_cache.model_audio(path, 16000))
+    assert decoded.shape == expected.shape
+    np.testing.assert_allclose(decoded, expected, atol=1e-6)
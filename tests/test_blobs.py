@@ -0,0 +1,67 @@
+import io
+import os
+import threading
+
+from voicecraft import blobs
+
+
+def test_collection_never_takes_a_blob_before_it_is_linked(tmp_path):
+    data_dir = str(tmp_path)
+    errors = []
+    done = threading.Event()
+
+    def collect():
+        while not done.is_set():
+            blobs.collect_garbage(data_dir)
+
+    def ingest(worker):
+        try:
+            for i in range(50):
+                digest, tmp = blobs.receive(io.BytesIO(f"{worker}-{i}".encode() * 100), data_dir)
+                with blobs.locked(data_dir):
+                    blob_path = blobs.add(digest, tmp, data_dir)
+                    blobs.link(blob_path, os.path.join(data_dir, f"{worker}-{i}.bin"))
+        except Exception as e:
+            errors.append(e)
+
+    collector = threading.Thread(target=collect)
+    collector.start()
+    workers = [threading.Thread(target=ingest, args=(w,)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    done.set()
+    collector.join()
+
+    assert not errors
+    assert len([name for name in os.listdir(data_dir) if name.endswith(".bin")]) == 200
+
+
+def test_unlinked_blobs_are_collected(tmp_path):
+    data_dir = str(tmp_path)
+    digest, tmp = blobs.receive(io.BytesIO(b"x" * 1000), data_dir)
+    with blobs.locked(data_dir):
+        blob_path = blobs.add(digest, tmp, data_dir)
+        blobs.link(blob_path, os.path.join(data_dir, "a.bin"))
+    assert blobs.collect_garbage(data_dir) == 0
+    os.remove(os.path.join(data_dir, "a.bin"))
+    assert blobs.collect_garbage(data_dir) == 1000
+    assert blobs.find(digest, data_dir) is None
+
+
+def test_copied_blobs_are_never_collected(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+
+    def no_links(src, dst):
+        raise OSError("hard links not supported")
+
+    digest, tmp = blobs.receive(io.BytesIO(b"x" * 1000), data_dir)
+    with blobs.locked(data_dir):
+        blob_path = blobs.add(digest, tmp, data_dir)
+        with monkeypatch.context() as patch:
+            patch.setattr(os, "link", no_links)
+            blobs.link(blob_path, os.path.join(data_dir, "a.bin"))
+    assert os.stat(blob_path).st_nlink == 1
+    assert blobs.collect_garbage(data_dir) == 0
+    assert blobs.find(digest, data_dir) == blob_path
@@ -0,0 +1,57 @@
+import numpy as np
+
+from voicecraft import pipeline
+from voicecraft.checkpoints import TranscriptionCheckpoint
+
+JOB = {"audio": "abc", "model": "tiny"}
+
+
+def _segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_commits_after_a_torn_tail_survive_a_reload(tmp_path):
+    path = str(tmp_path / "transcription.checkpoint.jsonl")
+    checkpoint = TranscriptionCheckpoint(path, JOB)
+    checkpoint.commit(100, [_segment(0.0, 1.0, " one")])
+    checkpoint.commit(200, [_segment(1.0, 2.0, " two")])
+    # A crash in the middle of writing the third window
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"offset": 300, "segm')
+
+    resumed = TranscriptionCheckpoint(path, JOB)
+    assert resumed.offset == 200
+    resumed.commit(300, [_segment(2.0, 3.0, " three")])
+    resumed.commit(400, [_segment(3.0, 4.0, " four")])
+
+    reloaded = TranscriptionCheckpoint(path, JOB)
+    assert reloaded.offset == 400
+    assert [s["text"] for s in reloaded.segments] == [" one", " two", " three", " four"]
+
+
+def test_checkpoint_for_other_audio_is_replaced(tmp_path):
+    path = str(tmp_path / "transcription.checkpoint.jsonl")
+    TranscriptionCheckpoint(path, JOB).commit(100, [_segment(0.0, 1.0, " one")])
+    other = TranscriptionCheckpoint(path, dict(JOB, audio="def"))
+    assert other.offset == 0 and other.segments == []
+    other.commit(50, [])
+    assert TranscriptionCheckpoint(path, dict(JOB, audio="def")).offset == 50
+
+
+class _ZeroLengthFirstSegment:
+    """Whisper returning an empty-duration first segment in every window"""
+
+    def transcribe(self, audio, model_size, **options):
+        seconds = len(audio) / pipeline.WHISPER_SAMPLE_RATE
+        return {"segments": [{"start": 0.0, "end": 0.0, "text": " a"},
+                             {"start": 0.0, "end": seconds, "text": " b"}]}
+
+
+def test_windows_advance_when_the_cut_would_not(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CHECKPOINT_WINDOW_SECONDS", 1)
+    audio = np.zeros(int(2.5 * pipeline.WHISPER_SAMPLE_RATE), dtype=np.float32)
+    checkpoint = TranscriptionCheckpoint(str(tmp_path / "checkpoint.jsonl"), JOB)
+    result = pipeline._transcribe_windows(audio, "tiny", _ZeroLengthFirstSegment(), checkpoint,
+                                          {"language": "en"})
+    assert checkpoint.offset == len(audio)
+    assert result["text"] == " a b a b a b"
@@ -0,0 +1,13 @@
+import pytest
+
+from voicecraft.backends import get_backends
+from voicecraft.models import MODEL_MEMORY_MB, estimate_job_memory_mb
+
+
+def test_stub_backends_reserve_no_model_memory():
+    whisper_stub, f5_stub = get_backends("stub")
+    audio_mb = estimate_job_memory_mb("whisper:large", 60.0, whisper_stub)
+    assert audio_mb == pytest.approx(60 * 16000 * 4 * 10 / 1024 ** 2)
+    assert estimate_job_memory_mb("whisper:large", 60.0) == pytest.approx(MODEL_MEMORY_MB["whisper:large"] + audio_mb)
+    assert estimate_job_memory_mb("f5tts", backend=f5_stub) == 0
+    assert estimate_job_memory_mb("f5tts") == MODEL_MEMORY_MB["f5tts"]
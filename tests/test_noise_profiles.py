@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from voicecraft import noise_profiles
+
+
+def _noise(seconds=1.0, sr=16000, level=0.01, seed=0):
+    return (level * np.random.default_rng(seed).standard_normal(int(seconds * sr))).astype(np.float32)
+
+
+def test_project_profiles_do_not_shadow_each_other(tmp_path):
+    data_dir = str(tmp_path)
+    a = noise_profiles.capture("office", _noise(level=0.01), 16000, scope="project", project_id="a",
+                               data_dir=data_dir)
+    b = noise_profiles.capture("office", _noise(level=0.2, seed=1), 16000, scope="project", project_id="b",
+                               data_dir=data_dir)
+    assert a["version"] == b["version"] == 1
+
+    listed_a = noise_profiles.list_profiles(data_dir, project_id="a")
+    listed_b = noise_profiles.list_profiles(data_dir, project_id="b")
+    assert [(p["name"], p["project_id"]) for p in listed_a] == [("office", "a")]
+    assert [(p["name"], p["project_id"]) for p in listed_b] == [("office", "b")]
+    assert len(noise_profiles.list_profiles(data_dir)) == 2
+
+    _, threshold_a = noise_profiles.load("office", data_dir=data_dir, project_id="a")
+    _, threshold_b = noise_profiles.load("office", data_dir=data_dir, project_id="b")
+    assert threshold_a.mean() < threshold_b.mean()
+
+
+def test_project_profile_hides_device_profile_of_same_name(tmp_path):
+    data_dir = str(tmp_path)
+    noise_profiles.capture("office", _noise(), 16000, scope="device", data_dir=data_dir)
+    noise_profiles.capture("office", _noise(level=0.2), 16000, scope="project", project_id="a", data_dir=data_dir)
+
+    assert [p["scope"] for p in noise_profiles.list_profiles(data_dir, project_id="a")] == ["project"]
+    assert [p["scope"] for p in noise_profiles.list_profiles(data_dir, project_id="b")] == ["device"]
+    meta, _ = noise_profiles.load("office", data_dir=data_dir, project_id="b")
+    assert meta["scope"] == "device"
+
+    with pytest.raises(noise_profiles.NoiseProfileError):
+        noise_profiles.load("missing", data_dir=data_dir, project_id="a")
@@ -0,0 +1,62 @@
+import io
+import json
+import wave
+
+import numpy as np
+
+from voicecraft import pipeline
+from voicecraft.backends import get_backends
+from voicecraft.projects import artifact_path, create_project
+
+
+def _wav(y=None, sr=16000):
+    if y is None:
+        y = 0.3 * np.sin(2 * np.pi * 220 * np.arange(12 * sr) / sr)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes((y * 32767).astype(np.int16).tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def _transcribed_project(data_dir, y=None, skip_silence=False):
+    project = create_project("reference", str(data_dir))
+    pipeline.ingest(project, _wav(y))
+    pipeline.denoise(project, apply_noise_reduction=False)
+    pipeline.transcribe(project, "tiny", backend=get_backends("stub")[0], skip_silence=skip_silence)
+    return project
+
+
+def test_trimmed_reference_text_comes_from_the_segments(tmp_path):
+    project = _transcribed_project(tmp_path)
+    pipeline.trim_reference(project, 4.0, auto_select=False)
+    ref_audio, ref_text = pipeline.reference(project)
+    assert ref_audio == project["trimmed_audio"]
+    assert ref_text == "Segment 0 of the stub transcript."
+
+
+def test_edited_transcript_is_used_instead_of_stale_segments(tmp_path):
+    project = _transcribed_project(tmp_path)
+    pipeline.trim_reference(project, 4.0, auto_select=False)
+    pipeline.save_transcription(project, "A corrected transcript.")
+    ref_audio, ref_text = pipeline.reference(project)
+    assert ref_audio == project["cleaned_audio"]
+    assert ref_text == "A corrected transcript."
+
+
+def test_segment_times_refer_to_the_original_audio_after_silence_is_cut(tmp_path):
+    sr = 16000
+    t = np.arange(30 * sr) / sr
+    syllables = 0.3 * ((t % 0.25) < 0.15) * np.sin(2 * np.pi * 220 * t)
+    speaking = ((t >= 2) & (t < 6)) | ((t >= 10) & (t < 11)) | ((t >= 20) & (t < 23))
+    y = 0.001 * np.random.default_rng(0).standard_normal(len(t)) + syllables * speaking
+    project = _transcribed_project(tmp_path, y, skip_silence=True)
+
+    with open(artifact_path(project, "segments"), "r", encoding="utf-8") as f:
+        segments = json.load(f)["segments"]
+    # The stub emits a segment per 5 s of the condensed audio (8.9 s of
+    # speech in regions 1.8-6.1, 9.8-11.1 and 19.8-23.1 s)
+    assert [(start, end) for start, end, _ in segments] == [(1.8, 10.5), (10.5, 23.1)]
@@ -0,0 +1,63 @@
+from voicecraft import resources
+from voicecraft.resources import ResourceGovernor
+
+
+def _record_pools(monkeypatch):
+    sizes = {"torch": [], "blas": []}
+    monkeypatch.setattr(resources, "_set_torch_threads", sizes["torch"].append)
+    monkeypatch.setattr(resources, "set_blas_threads", sizes["blas"].append)
+    return sizes
+
+
+def test_running_jobs_are_resplit_when_the_mix_changes(monkeypatch):
+    _record_pools(monkeypatch)
+    governor = ResourceGovernor(total_threads=12)
+    denoise = governor.acquire("denoise")
+    assert denoise.threads == 12
+
+    clone = governor.acquire("clone")
+    assert (denoise.threads, clone.threads) == (3, 9)
+    assert denoise.threads + clone.threads <= governor.total_threads
+
+    governor.release(clone)
+    assert denoise.threads == 12
+
+
+def test_threads_for_predicts_the_share_of_a_new_job(monkeypatch):
+    _record_pools(monkeypatch)
+    governor = ResourceGovernor(total_threads=6)
+    governor.acquire("transcribe")
+    assert governor.threads_for("transcribe") == 3
+    assert governor.threads_for("clone") == 3
+
+
+def test_overlapping_stages_size_pools_from_the_current_allocation(monkeypatch):
+    sizes = _record_pools(monkeypatch)
+    governor = ResourceGovernor(total_threads=8)
+    first = governor.stage("transcribe")
+    second = governor.stage("transcribe")
+    first.__enter__()
+    second.__enter__()
+    # The first job finishes while the second is still running
+    first.__exit__(None, None, None)
+    assert sizes["torch"] == [8, 4, 8]
+    second.__exit__(None, None, None)
+    assert sizes["torch"] == [8, 4, 8, 8]
+    assert sizes["blas"] == sizes["torch"]
+    assert governor.active_jobs() == []
+
+
+def test_every_job_gets_at_least_one_thread(monkeypatch):
+    _record_pools(monkeypatch)
+    governor = ResourceGovernor(total_threads=2)
+    allocations = [governor.acquire("denoise") for _ in range(3)]
+    assert [allocation.threads for allocation in allocations] == [1, 1, 1]
+
+
+def test_subprocess_env_limits_thread_pools(monkeypatch):
+    _record_pools(monkeypatch)
+    governor = ResourceGovernor(total_threads=4)
+    allocation = governor.acquire("clone")
+    env = governor.subprocess_env(allocation, base={"PATH": "/bin"})
+    assert env["PATH"] == "/bin"
+    assert all(env[name] == "4" for name in resources.THREAD_ENV_VARS)
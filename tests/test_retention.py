@@ -0,0 +1,31 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import soundfile as sf
+
+from voicecraft import audio_cache, retention
+from voicecraft.projects import create_project
+
+
+def _age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(time.time_ns() - int(seconds * 1e9), stat.st_mtime_ns))
+
+
+def test_memory_mapped_caches_are_not_evicted(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    project = create_project("retention", data_dir)
+    path = os.path.join(project["dir"], "original_audio.flac")
+    sf.write(path, np.zeros(16000, dtype=np.float32), 16000)
+    cache_path = audio_cache.model_audio(path, 16000).filename
+    _age(cache_path, retention.MIN_IDLE_SECONDS * 2)
+
+    retention.enforce(data_dir, budget=0)
+    assert os.path.exists(cache_path)
+
+    # Once nothing maps it any more it goes like any idle cache
+    monkeypatch.setattr(audio_cache, "_open_arrays", OrderedDict())
+    retention.enforce(data_dir, budget=0)
+    assert not os.path.exists(cache_path)
@@ -0,0 +1,60 @@
+import pytest
+
+from voicecraft import rtf
+from voicecraft.rtf import PRIORS, RtfTable
+
+
+def _table(tmp_path):
+    return RtfTable(str(tmp_path / "host.json"))
+
+
+def test_fit_recovers_fixed_cost_and_rate(tmp_path):
+    table = _table(tmp_path)
+    for work in (10, 60, 30, 120, 5):
+        table.record("whisper:base", work, 2.0 + 0.1 * work)
+    fixed, rate = table.fit("whisper:base")
+    assert fixed == pytest.approx(2.0)
+    assert rate == pytest.approx(0.1)
+    assert table.estimate("whisper:base", 100) == pytest.approx(12.0)
+
+
+def test_fit_follows_the_host_as_it_changes(tmp_path):
+    table = _table(tmp_path)
+    for work in (10, 60, 30) * 3:
+        table.record("whisper:base", work, 1.0 + 0.1 * work)
+    # The host slows down; recent runs outweigh the decayed old ones
+    for work in (10, 60, 30) * 10:
+        table.record("whisper:base", work, 1.0 + 0.3 * work)
+    assert table.fit("whisper:base")[1] == pytest.approx(0.3, rel=0.05)
+
+
+def test_runs_of_one_length_keep_the_prior_fixed_cost(tmp_path):
+    table = _table(tmp_path)
+    for _ in range(5):
+        table.record("whisper:base", 30, 6.0)
+    fixed, rate = table.fit("whisper:base")
+    assert fixed == PRIORS["whisper:base"][0]
+    assert fixed + rate * 30 == pytest.approx(6.0)
+
+
+def test_unmeasured_models_scale_by_the_host_factor(tmp_path):
+    table = _table(tmp_path)
+    assert table.host_factor() == 1.0
+    # This host runs tiny and base at twice the prior rates
+    for key in ("whisper:tiny", "whisper:base"):
+        prior_fixed, prior_rate = PRIORS[key]
+        for work in (10, 60, 30):
+            table.record(key, work, prior_fixed + 2 * prior_rate * work)
+    assert table.host_factor() == pytest.approx(2.0)
+    prior_fixed, prior_rate = PRIORS["whisper:small"]
+    assert table.fit("whisper:small") == pytest.approx((2 * prior_fixed, 2 * prior_rate))
+    # Model loads are not scaled by inference speed
+    assert table.fit("whisper:small:load") == PRIORS["whisper:small:load"]
+
+
+def test_table_is_persisted_per_host(tmp_path, monkeypatch):
+    monkeypatch.setattr(rtf, "_tables", {})
+    table = rtf.get_rtf_table(str(tmp_path))
+    table.record("f5tts", 100, 25.0)
+    assert rtf.get_rtf_table(str(tmp_path)) is table
+    assert RtfTable(table.path).runs("f5tts") == 1
@@ -0,0 +1,75 @@
+import os
+import shutil
+
+from voicecraft.projects import ARTIFACTS, create_project, load_project
+from voicecraft.search import INDEX_FILE, SEARCH_DIR_NAME, SearchIndex
+from voicecraft.transcripts import save_segments
+
+SEGMENTS = [
+    (0.0, 4.0, " The quick brown fox."),
+    (4.0, 9.5, " It jumps over the lazy dog."),
+    (9.5, 12.0, " Then it naps at the café."),
+]
+
+
+def _transcribed_project(data_dir, name="Fox", segments=SEGMENTS):
+    project = create_project(name, data_dir)
+    save_segments(os.path.join(project["dir"], ARTIFACTS["segments"]),
+                  {"segments": [{"start": start, "end": end, "text": text} for start, end, text in segments]})
+    _write_transcript(project, "".join(text for _, _, text in segments))
+    return load_project(project["id"], data_dir)
+
+
+def _write_transcript(project, text):
+    with open(os.path.join(project["dir"], ARTIFACTS["transcription"]), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _index(data_dir):
+    return SearchIndex(os.path.join(data_dir, SEARCH_DIR_NAME, INDEX_FILE))
+
+
+def test_hits_carry_the_segment_times(tmp_path):
+    data_dir = str(tmp_path)
+    project = _transcribed_project(data_dir)
+    index = _index(data_dir)
+    index.index_project(project)
+
+    [hit] = index.search("lazy dog")
+    assert (hit["project_id"], hit["project_name"]) == (project["id"], "Fox")
+    assert (hit["start"], hit["end"]) == (4.0, 9.5)
+    assert hit["snippet"] == "It jumps over the [lazy dog]."
+    # Accents are folded, and quotes or operators in a query are literal
+    assert [hit["start"] for hit in index.search("cafe")] == [9.5]
+    assert index.search('fox" OR "dog') == []
+    # A phrase has to fall within one segment
+    assert index.search("fox it jumps") == []
+
+
+def test_edited_transcript_is_indexed_by_sentence_without_times(tmp_path):
+    data_dir = str(tmp_path)
+    project = _transcribed_project(data_dir)
+    index = _index(data_dir)
+    index.index_project(project)
+
+    _write_transcript(project, "The quick red fox. It jumps over the lazy dog!\nThen it naps.")
+    index.index_project(project)
+    assert index.search("brown fox") == []
+    [hit] = index.search("red fox")
+    assert hit["start"] is None and hit["end"] is None
+    assert len(index.search("naps", project_id=project["id"])) == 1
+
+
+def test_sync_catches_up_with_changes_made_elsewhere(tmp_path):
+    data_dir = str(tmp_path)
+    kept = _transcribed_project(data_dir, "Kept")
+    removed = _transcribed_project(data_dir, "Removed")
+    index = _index(data_dir)
+    assert index.sync(data_dir) == 2
+    assert index.sync(data_dir) == 0
+
+    shutil.rmtree(removed["dir"])
+    _write_transcript(kept, "Something else entirely.")
+    assert index.sync(data_dir) == 2
+    assert [hit["project_name"] for hit in index.search("something else")] == ["Kept"]
+    assert index.search("lazy dog") == []
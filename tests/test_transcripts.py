@@ -0,0 +1,23 @@
+import pytest
+
+from voicecraft.transcripts import TranscriptIndex, matches_text
+
+SEGMENTS = [[0.0, 2.0, " Hello there."], [2.0, 5.0, " General Kenobi."], [5.0, 6.0, " Oh."]]
+
+
+def test_text_between_takes_units_whose_midpoint_is_inside():
+    index = TranscriptIndex(SEGMENTS)
+    assert index.text_between(0.0, 6.0) == "Hello there. General Kenobi. Oh."
+    assert index.text_between(0.9, 3.6) == "Hello there. General Kenobi."
+    assert index.text_between(1.1, 3.4) == ""
+    assert index.text_between(3.0, 2.0) == ""
+    assert TranscriptIndex([]).text_between(0.0, 1.0) == ""
+
+
+@pytest.mark.parametrize("text,matches", [
+    ("Hello there. General Kenobi. Oh.", True),
+    ("Hello there.\nGeneral  Kenobi. Oh.\n", True),
+    ("Hello there. General Grievous. Oh.", False),
+])
+def test_segments_only_match_the_text_whisper_wrote(text, matches):
+    assert matches_text(SEGMENTS, text) == matches
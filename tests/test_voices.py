@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from voicecraft import voices
+from voicecraft.audio_cache import F5_SAMPLE_RATE
+
+
+def _tone(seconds, sr, amplitude=0.01, channels=1):
+    t = np.arange(int(seconds * sr)) / sr
+    y = amplitude * np.sin(2 * np.pi * 220 * t)
+    return np.tile(y, (channels, 1)) if channels > 1 else y
+
+
+def test_reference_is_stored_the_way_f5_tts_consumes_it(tmp_path):
+    data_dir = str(tmp_path)
+    meta = voices.save("Narrator", _tone(20.0, 44100, channels=2), 44100, "  Hello   there", data_dir=data_dir)
+
+    ref_audio, ref_text = voices.reference(meta["id"], data_dir)
+    info = sf.info(ref_audio)
+    assert (info.format, info.subtype, info.channels) == ("WAV", "PCM_16", 1)
+    assert info.samplerate == F5_SAMPLE_RATE
+    assert info.frames == int(voices.MAX_REFERENCE_SECONDS * F5_SAMPLE_RATE)
+    assert meta["duration"] == voices.MAX_REFERENCE_SECONDS
+    assert ref_text == "Hello there. "
+
+    # Raised to F5-TTS's target loudness
+    y, _ = sf.read(ref_audio)
+    assert np.sqrt(np.mean(y * y)) == pytest.approx(voices.TARGET_RMS, rel=0.01)
+
+
+def test_same_reference_gives_the_same_voice(tmp_path):
+    data_dir = str(tmp_path)
+    first = voices.save("A", _tone(3.0, 24000), 24000, "Hello there.", data_dir=data_dir)
+    second = voices.save("B", _tone(3.0, 24000), 24000, "Hello there.", data_dir=data_dir)
+    other = voices.save("C", _tone(3.0, 24000), 24000, "Something else.", data_dir=data_dir)
+    assert first["id"] == second["id"] != other["id"]
+    assert voices.find("B", data_dir) == first["id"]
+    assert [voice["name"] for voice in voices.list_voices(data_dir)] == ["B", "C"]
+
+    voices.delete(other["id"], data_dir)
+    assert voices.find("C", data_dir) is None
+    with pytest.raises(voices.VoiceError):
+        voices.load(other["id"], data_dir)
+
+
+def test_normalize_text_ends_like_f5_tts():
+    assert voices.normalize_text("Hello there.") == "Hello there. "
+    assert voices.normalize_text("Hello\nthere") == "Hello there. "
+    assert voices.normalize_text("你好。") == "你好。"
+    assert voices.normalize_text("   ") == ""
+
+
+def test_short_or_unnamed_references_are_rejected(tmp_path):
+    with pytest.raises(voices.VoiceError):
+        voices.save("Short", _tone(0.5, 24000), 24000, "Hi.", data_dir=str(tmp_path))
+    with pytest.raises(voices.VoiceError):
+        voices.save(" ", _tone(3.0, 24000), 24000, "Hi.", data_dir=str(tmp_path))
+    with pytest.raises(voices.VoiceError):
+        voices.load("../etc", data_dir=str(tmp_path))
@@ -0,0 +1 @@
+"""Shared helpers for the VoiceCraft apps."""
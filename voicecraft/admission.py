@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Default number of jobs allowed to run at once per model family. Keeping
+# these low trades single-user latency for stable throughput under load.
+DEFAULT_LIMITS = {
+    "whisper": 1,
+    "f5tts": 1,
+}
+
+# Service time assumed for a model before any job has finished (seconds)
+DEFAULT_SERVICE_TIME = 30.0
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job cannot be admitted without risking an OOM"""
+
+
+class Ticket:
+    """A session's place in the queue for one model"""
+
+    def __init__(self, model, session_id, working_set_mb):
+        self.model = model
+        self.session_id = session_id
+        self.working_set_mb = working_set_mb
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.cancelled = False
+
+    @property
+    def granted(self):
+        return self.started_at is not None
+
+
+class _ModelQueue:
+    def __init__(self, limit):
+        self.limit = limit
+        self.running = []
+        # Per-session FIFOs served round-robin so one session cannot starve
+        # the others by queueing many jobs.
+        self.sessions = {}
+        self.order = deque()
+        self.service_time = None
+
+    def dispatch_order(self):
+        """Waiting tickets in the order they will be granted"""
+        queues = [list(self.sessions[sid]) for sid in self.order]
+        result = []
+        depth = 0
+        while True:
+            row = [queue[depth] for queue in queues if depth < len(queue)]
+            if not row:
+                return result
+            result.extend(row)
+            depth += 1
+
+
+class InferenceGate:
+    """
+    Global admission control for model inference across sessions.
+
+    Each model family has its own concurrency limit. Jobs beyond the limit
+    wait in a fair queue: every session has its own FIFO and sessions are
+    served round-robin. A queued job is only granted its slot once its memory
+    estimate fits in the free memory (minus a safety reserve) next to the
+    jobs already running, unloading idle models (see ``models.ModelManager``)
+    if that makes room. Jobs that would not fit even with every running job
+    finished are rejected up front.
+    """
+
+    def __init__(self, limits=None, min_free_mb=1024):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.min_free_mb = min_free_mb
+        self._cond = threading.Condition()
+        self._queues = {}
+
+    def _queue(self, model):
+        queue = self._queues.get(model)
+        if queue is None:
+            family = model.split(":", 1)[0]
+            limit = self.limits.get(model, self.limits.get(family, 1))
+            queue = self._queues[model] = _ModelQueue(max(1, limit))
+        return queue
+
+    def _shortfall_mb(self, working_set_mb):
+        """MB missing for a job needing ``working_set_mb``, and the memory available and reserved"""
+        available_mb = _available_memory_mb()
+        if available_mb is None:
+            return 0.0, None, 0.0
+        # Memory already promised to running jobs that may not have allocated it yet
+        reserved_mb = sum(t.working_set_mb for q in self._queues.values() for t in q.running)
+        return working_set_mb + reserved_mb + self.min_free_mb - available_mb, available_mb, reserved_mb
+
+    def _unload_idle(self, needed_mb, model=None, dry_run=False):
+        """Unload idle models to free ``needed_mb``, keeping those running jobs need; returns MB freed"""
+        from voicecraft.models import get_model_manager
+
+        running = {t.model for q in self._queues.values() for t in q.running}
+        running.add(model)
+        queued = {t.model for q in self._queues.values() for pending in q.sessions.values() for t in pending}
+        if dry_run:
+            return get_model_manager().unloadable_mb(protect=running)
+        return get_model_manager().free(needed_mb, protect=running, last=queued)
+
+    def _fits(self, working_set_mb, model=None, dry_run=False):
+        """Whether the job fits next to the running jobs, unloading idle models (unless ``dry_run``) to make it fit"""
+        shortfall_mb = self._shortfall_mb(working_set_mb)[0]
+        if shortfall_mb <= 0:
+            return True
+        return self._unload_idle(shortfall_mb, model, dry_run) >= shortfall_mb
+
+    def _check_memory(self, working_set_mb, model=None):
+        # Memory held by running jobs comes back when they finish, so the job
+        # is only turned away if it would not fit even then
+        _, available_mb, reserved_mb = self._shortfall_mb(working_set_mb)
+        if available_mb is None:
+            return
+        attainable_mb = available_mb + reserved_mb + self._unload_idle(0, model, dry_run=True)
+        if working_set_mb + self.min_free_mb > attainable_mb:
+            raise AdmissionRejected(
+                f"Not enough memory: job needs ~{working_set_mb:.0f} MB, "
+                f"at most {attainable_mb:.0f} MB can be made available"
+            )
+
+    def can_admit(self, working_set_mb, model=None):
+        """Whether a job needing ``working_set_mb`` would fit right now (nothing is unloaded)"""
+        with self._cond:
+            return self._fits(working_set_mb, model, dry_run=True)
+
+    def make_room(self, working_set_mb):
+        """Unload idle models if work outside the gate (e.g. denoising) needs ``working_set_mb``"""
+        with self._cond:
+            shortfall_mb = self._shortfall_mb(working_set_mb)[0]
+            if shortfall_mb > 0:
+                self._unload_idle(shortfall_mb)
+
+    def submit(self, model, session_id, working_set_mb=0):
+        """Queue a job and return its Ticket (may be granted immediately)"""
+        with self._cond:
+            self._check_memory(working_set_mb, model)
+            ticket = Ticket(model, session_id, working_set_mb)
+            queue = self._queue(model)
+            if session_id not in queue.sessions:
+                queue.sessions[session_id] = deque()
+                queue.order.append(session_id)
+            queue.sessions[session_id].append(ticket)
+            self._dispatch(queue)
+            return ticket
+
+    def _dispatch(self, queue):
+        while len(queue.running) < queue.limit and queue.order:
+            session_id = queue.order[0]
+            pending = queue.sessions[session_id]
+            ticket = pending[0]
+            # The next job waits until the running ones leave it enough memory
+            if not self._fits(ticket.working_set_mb, ticket.model):
+                break
+            queue.order.popleft()
+            pending.popleft()
+            if pending:
+                queue.order.append(session_id)
+            else:
+                del queue.sessions[session_id]
+            ticket.started_at = time.monotonic()
+            queue.running.append(ticket)
+        self._cond.notify_all()
+
+    def _dispatch_all(self, first=None):
+        # Memory given back by one model can unblock jobs queued for another
+        queues = list(self._queues.values())
+        if first is not None:
+            queues.remove(first)
+            queues.insert(0, first)
+        for queue in queues:
+            self._dispatch(queue)
+
+    def position(self, ticket):
+        """0 when running, otherwise the number of jobs granted before it plus one"""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            order = self._queue(ticket.model).dispatch_order()
+            return order.index(ticket) + 1 if ticket in order else 0
+
+    def estimated_wait(self, ticket):
+        """Rough seconds until the ticket is granted"""
+        with self._cond:
+            if ticket.granted:
+                return 0.0
+            queue = self._queue(ticket.model)
+            service_time = queue.service_time or DEFAULT_SERVICE_TIME
+            order = queue.dispatch_order()
+            ahead = order.index(ticket) if ticket in order else 0
+            # Time left on the job that frees a slot first, then full rounds
+            now = time.monotonic()
+            remaining = [max(0.0, service_time - (now - t.started_at)) for t in queue.running]
+            first_free = min(remaining) if len(remaining) >= queue.limit else 0.0
+            return first_free + (ahead // queue.limit) * service_time
+
+    def wait(self, ticket, on_wait=None, poll_interval=1.0):
+        """Block until the ticket is granted, calling ``on_wait(position, eta)`` while queued"""
+        while True:
+            with self._cond:
+                if ticket.granted:
+                    return
+                self._cond.wait(poll_interval)
+                if not ticket.granted:
+                    # Memory may have been freed outside the gate meanwhile
+                    self._dispatch(self._queue(ticket.model))
+                if ticket.granted:
+                    return
+            if on_wait is not None:
+                on_wait(self.position(ticket), self.estimated_wait(ticket))
+
+    def release(self, ticket):
+        """Give the ticket's slot back, or drop it from the queue if still waiting"""
+        with self._cond:
+            queue = self._queue(ticket.model)
+            if ticket in queue.running:
+                queue.running.remove(ticket)
+                elapsed = time.monotonic() - ticket.started_at
+                # Exponential moving average of the service time
+                if queue.service_time is None:
+                    queue.service_time = elapsed
+                else:
+                    queue.service_time = 0.7 * queue.service_time + 0.3 * elapsed
+            else:
+                ticket.cancelled = True
+                pending = queue.sessions.get(ticket.session_id)
+                if pending and ticket in pending:
+                    pending.remove(ticket)
+                    if not pending:
+                        del queue.sessions[ticket.session_id]
+                        queue.order.remove(ticket.session_id)
+            self._dispatch_all(first=queue)
+
+    @contextmanager
+    def slot(self, model, session_id, working_set_mb=0, on_wait=None):
+        """Hold one of the model's slots for the duration of the block"""
+        ticket = self.submit(model, session_id, working_set_mb)
+        try:
+            self.wait(ticket, on_wait=on_wait)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Running and queued job counts and working sets per model, for display"""
+        with self._cond:
+            return {
+                model: {
+                    "limit": queue.limit,
+                    "running": len(queue.running),
+                    "queued": sum(len(q) for q in queue.sessions.values()),
+                    "running_mb": sum(t.working_set_mb for t in queue.running),
+                    "queued_mb": sum(t.working_set_mb for q in queue.sessions.values() for t in q),
+                }
+                for model, queue in self._queues.items()
+            }
+
+
+def _available_memory_mb():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.virtual_memory().available / (1024 ** 2)
+
+
+def _parse_limits(value):
+    # "whisper:2,f5tts:1" -> {"whisper": 2, "f5tts": 1}
+    limits = {}
+    for item in value.split(","):
+        if ":" in item:
+            name, count = item.rsplit(":", 1)
+            limits[name.strip()] = int(count)
+    return limits
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_gate():
+    """
+    Process-wide gate shared by every session.
+
+    Configured with ``VOICECRAFT_GATE_LIMITS`` (e.g. ``whisper:2,f5tts:1``)
+    and ``VOICECRAFT_MIN_FREE_MB`` (memory kept free after admitting a job).
+    """
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            limits = _parse_limits(os.environ.get("VOICECRAFT_GATE_LIMITS", ""))
+            min_free_mb = int(os.environ.get("VOICECRAFT_MIN_FREE_MB", "1024"))
+            _gate = InferenceGate(limits=limits, min_free_mb=min_free_mb)
+        return _gate
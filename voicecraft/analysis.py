@@ -0,0 +1,158 @@
+import numpy as np
+
+# Analysis frame length in milliseconds
+FRAME_MS = 20
+
+# Frames this far above the noise floor count as speech
+SPEECH_THRESHOLD_DB = 6.0
+
+# Window (seconds) over which the local noise floor is tracked
+LOCAL_FLOOR_SECONDS = 2.0
+
+# SNR at which a frame scores full marks; louder frames are not better references
+MAX_SNR_DB = 30.0
+
+# Pauses at least this long are cut before transcription; shorter ones stay
+MIN_SILENCE_SECONDS = 1.0
+
+# Audio kept on each side of a speech region, so word edges are not clipped
+SPEECH_PADDING_SECONDS = 0.2
+
+
+def frame_energy(y, sr, frame_ms=FRAME_MS):
+    """Mean power of consecutive non-overlapping frames, shape (n_frames,)"""
+    hop = max(1, int(sr * frame_ms / 1000))
+    n_frames = len(y) // hop
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), hop
+    frames = np.asarray(y[:n_frames * hop], dtype=np.float32).reshape(n_frames, hop)
+    return np.mean(frames * frames, axis=1), hop
+
+
+def power_to_db(power):
+    return 10.0 * np.log10(np.maximum(power, 1e-10))
+
+
+def noise_floor_db(energy_db, percentile=10):
+    """Noise level estimated from the quietest frames"""
+    if len(energy_db) == 0:
+        return -100.0
+    return float(np.percentile(energy_db, percentile))
+
+
+def local_snr_db(energy_db, frame_ms=FRAME_MS, floor_seconds=LOCAL_FLOOR_SECONDS):
+    """
+    Per-frame SNR against the quietest frame nearby.
+
+    Speech keeps dipping into pauses, so its local minimum is the background
+    level; steady noise never dips and ends up with an SNR near zero.
+    """
+    from scipy.ndimage import minimum_filter1d
+    size = max(1, int(floor_seconds * 1000 / frame_ms))
+    local_floor = np.maximum(minimum_filter1d(energy_db, size=size, mode="nearest"), noise_floor_db(energy_db))
+    return energy_db - local_floor
+
+
+def speech_activity(snr_db, threshold_db=SPEECH_THRESHOLD_DB):
+    """Boolean mask of frames that rise clearly above the noise floor"""
+    return snr_db > threshold_db
+
+
+def select_best_window(y, sr, duration, frame_ms=FRAME_MS):
+    """
+    Find the contiguous ``duration``-second window best suited as a cloning reference.
+
+    Every frame is scored by its SNR over the local noise floor (capped at
+    MAX_SNR_DB), with non-speech frames scoring zero. The window with the
+    highest total is found with a cumulative-sum sliding window, so the whole
+    file is scored in O(n). Returns ``(start_sample, end_sample, score)``
+    where score is the mean frame score in [0, 1].
+    """
+    energy, hop = frame_energy(y, sr, frame_ms)
+    window_frames = int(round(duration * 1000 / frame_ms))
+    if len(energy) == 0 or window_frames >= len(energy):
+        return 0, min(len(y), int(duration * sr)), 1.0 if len(energy) else 0.0
+
+    energy_db = power_to_db(energy)
+    snr_db = local_snr_db(energy_db, frame_ms)
+    active = speech_activity(snr_db)
+    snr_db = np.clip(snr_db, 0.0, MAX_SNR_DB)
+    frame_scores = np.where(active, snr_db / MAX_SNR_DB, 0.0)
+
+    # Sliding-window sums of the frame scores
+    cumulative = np.concatenate(([0.0], np.cumsum(frame_scores)))
+    window_sums = cumulative[window_frames:] - cumulative[:-window_frames]
+    best = int(np.argmax(window_sums))
+
+    start_frame = _snap_to_quiet(energy_db, best, window_frames, max_shift=int(250 / frame_ms))
+    start = start_frame * hop
+    end = min(len(y), start + int(duration * sr))
+    return start, end, float(window_sums[best] / window_frames)
+
+
+def _snap_to_quiet(energy_db, start_frame, window_frames, max_shift):
+    # Nudge the window so it starts and ends on quiet frames rather than mid-word
+    lo = max(0, start_frame - max_shift)
+    hi = min(len(energy_db) - window_frames, start_frame + max_shift)
+    if hi <= lo:
+        return start_frame
+    candidates = np.arange(lo, hi + 1)
+    edge_energy = np.maximum(energy_db[candidates], energy_db[candidates + window_frames - 1])
+    return int(candidates[np.argmin(edge_energy)])
+
+
+def speech_regions(y, sr, min_silence=MIN_SILENCE_SECONDS, padding=SPEECH_PADDING_SECONDS, frame_ms=FRAME_MS):
+    """
+    ``(n, 2)`` start and end samples of the parts of ``y`` worth transcribing.
+
+    Frames above the local noise floor are speech; steady background such
+    as hum or hold music never dips, so it does not count. Pauses shorter
+    than ``min_silence`` are kept, and every region is widened by
+    ``padding`` on both sides.
+    """
+    energy, hop = frame_energy(y, sr, frame_ms)
+    if len(energy) == 0:
+        return np.array([[0, len(y)]] if len(y) else np.zeros((0, 2)), dtype=np.int64)
+    active = speech_activity(local_snr_db(power_to_db(energy), frame_ms))
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    if len(starts) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    pad = int(round(padding * 1000 / frame_ms))
+    min_gap = max(int(round(min_silence * 1000 / frame_ms)), 2 * pad + 1)
+    # Merge regions separated by short pauses
+    long_gaps = starts[1:] - ends[:-1] >= min_gap
+    starts = np.concatenate((starts[:1], starts[1:][long_gaps]))
+    ends = np.concatenate((ends[:-1][long_gaps], ends[-1:]))
+
+    starts = np.maximum(starts - pad, 0) * hop
+    ends = np.minimum(ends + pad, len(energy)) * hop
+    # The frames leave out a partial one at the end
+    ends[ends == len(energy) * hop] = len(y)
+    return np.column_stack((starts, ends)).astype(np.int64)
+
+
+def condense(y, regions):
+    """The regions of ``y``, joined end to end"""
+    if len(regions) == 0:
+        return np.zeros(0, dtype=y.dtype)
+    return np.concatenate([y[start:end] for start, end in regions])
+
+
+def remap_times(times, regions, sr, side="right"):
+    """
+    Original-audio seconds of ``times`` (seconds into ``condense(y, regions)``).
+
+    A time exactly at a join belongs to the next region with
+    ``side="right"`` (segment starts) and ends the previous one with
+    ``side="left"`` (segment ends).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(regions) == 0:
+        return times
+    lengths = (regions[:, 1] - regions[:, 0]) / sr
+    condensed_starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    index = np.clip(np.searchsorted(condensed_starts, times, side=side) - 1, 0, len(regions) - 1)
+    offsets = np.clip(times - condensed_starts[index], 0.0, lengths[index])
+    return regions[index, 0] / sr + offsets
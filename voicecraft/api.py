@@ -0,0 +1,688 @@
+"""
+Headless HTTP API for the VoiceCraft pipeline.
+
+Run with ``python -m voicecraft.api --port 8000``. Uses the same project
+directories under ``data/`` and the same cached models as the Streamlit UI.
+
+Endpoints:
+    GET  /health
+    GET  /projects                              list projects
+    POST /projects                              {"name": ...} -> project
+    GET  /projects/<id>                         project and its artifacts
+    POST /projects/<id>/audio                   upload (multipart/form-data or raw body)
+    POST /projects/<id>/denoise                 {"noise_reduction": true, "noise_profile": optional,
+                                                 "profile_version": optional,
+                                                 "backend": "noisereduce"|"torch"} -> job
+    GET  /noise_profiles                        list stored noise profiles
+    POST /projects/<id>/noise_profiles          {"name": ..., "scope": "project"|"device"}
+                                                captures from the silent parts of the upload;
+                                                an audio body with ?name=&scope= captures from
+                                                a noise-only clip instead
+    POST /projects/<id>/transcribe              {"model_size": "base"} -> job; "auto" with
+                                                "budget_seconds" picks the largest model
+                                                expected to finish in time on this host;
+                                                "skip_silence": true decodes only speech
+    POST /projects/<id>/clone                   {"gen_text": ..., "ref_text": optional,
+                                                 "voice": optional saved voice id or name,
+                                                 "preset": "draft"/"fast"/"standard"/"quality"} -> job
+    GET  /voices                                list saved voices
+    GET  /voices/<voice_id>                     a saved voice and its reference text
+    DELETE /voices/<voice_id>                   remove a saved voice
+    POST /projects/<id>/voices                  {"name": ...} saves the project's reference as a voice
+    GET  /projects/<id>/spectrograms/<artifact> spectrogram pyramid of an audio artifact: zoom
+                                                levels and their tile counts
+    GET  /projects/<id>/spectrograms/<artifact>/<level>/<tile>.png
+                                                one tile (TILE_COLUMNS columns, 0-8 kHz)
+    GET  /search?q=<phrase>&limit=&project_id=  transcript segments containing the phrase, each
+                                                with its time and an audio URL seeking to it
+    GET  /jobs/<job_id>                         job status, progress and result
+    POST /jobs/<job_id>/cancel                  stop a queued or running job (clones are killed
+                                                and their partial output removed)
+    GET  /projects/<id>/artifacts/<artifact>    download an artifact as a stream (supports Range
+                                                requests and ETags; ?preview=1 serves the
+                                                compressed preview of an audio artifact)
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import traceback
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from voicecraft import pipeline, spectrogram, voices
+from voicecraft.backends import DEFAULT_F5_PRESET, F5_PRESETS, WhisperBackend, get_backends
+from voicecraft.config import DATA_DIR
+from voicecraft.jobs import JobManager, current_job
+from voicecraft.noise_profiles import NoiseProfileError, list_profiles
+from voicecraft.media import version
+from voicecraft.models import WHISPER_SIZES
+from voicecraft.projects import ARTIFACTS, AUDIO_ARTIFACTS, create_project, list_projects, load_project
+from voicecraft.search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, get_search_index
+from voicecraft.spectrogram import open_pyramid
+from voicecraft.storage import MIME_TYPES, preview_file
+
+CHUNK_SIZE = 64 * 1024
+
+# Largest JSON request body accepted (uploads are streamed and not limited)
+MAX_JSON_BODY = 1024 * 1024
+
+ARTIFACT_TYPES = {
+    **MIME_TYPES,
+    ".txt": "text/plain; charset=utf-8",
+    ".json": "application/json",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _BodyReader:
+    """Reads a request body of known length or chunked transfer encoding"""
+
+    def __init__(self, rfile, length=None, chunked=False):
+        self.rfile = rfile
+        self.remaining = length
+        self.chunked = chunked
+        self.chunk_left = 0
+        self.done = length == 0
+
+    def read(self, size=CHUNK_SIZE):
+        if self.done:
+            return b""
+        if self.chunked:
+            if self.chunk_left == 0:
+                line = self.rfile.readline(65537)
+                try:
+                    self.chunk_left = int(line.split(b";", 1)[0].strip() or b"0", 16)
+                except ValueError:
+                    raise ValueError(f"Malformed chunk size line {line[:40]!r}")
+                if self.chunk_left == 0:
+                    # Skip trailers up to the blank line
+                    while self.rfile.readline(65537).strip():
+                        pass
+                    self.done = True
+                    return b""
+            data = self.rfile.read(min(size, self.chunk_left))
+            self.chunk_left -= len(data)
+            if self.chunk_left == 0:
+                self.rfile.readline(65537)
+            if not data:
+                self.done = True
+            return data
+        data = self.rfile.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        if self.remaining <= 0 or not data:
+            self.done = True
+        return data
+
+
+class _MultipartFile:
+    """
+    File-like view of the first file part of a multipart/form-data body.
+
+    The body is scanned in chunks for the boundary, so the upload is never
+    held in memory as a whole.
+    """
+
+    def __init__(self, body, boundary):
+        self.body = body
+        self.delimiter = b"\r\n--" + boundary
+        self.buffer = b""
+        self.finished = False
+        self.filename = None
+        self._find_file_part(b"--" + boundary)
+
+    def _fill(self):
+        data = self.body.read(CHUNK_SIZE)
+        self.buffer += data
+        return bool(data)
+
+    def _read_until(self, marker, limit=None):
+        while marker not in self.buffer:
+            if limit is not None and len(self.buffer) > limit:
+                raise HTTPError(400, "Malformed multipart body")
+            if not self._fill():
+                raise HTTPError(400, "Unexpected end of multipart body")
+        head, self.buffer = self.buffer.split(marker, 1)
+        return head
+
+    def _find_file_part(self, first_delimiter):
+        self._read_until(first_delimiter, limit=MAX_JSON_BODY)
+        while True:
+            while len(self.buffer) < 2 and self._fill():
+                pass
+            if self.buffer.startswith(b"--"):
+                raise HTTPError(400, "No file part in multipart body")
+            headers = self._read_until(b"\r\n\r\n", limit=MAX_JSON_BODY).decode("utf-8", "replace")
+            match = re.search(r'filename="([^"]*)"', headers)
+            if match:
+                self.filename = match.group(1)
+                return
+            # Plain form field: skip its value
+            self._read_until(self.delimiter, limit=MAX_JSON_BODY)
+
+    def read(self, size=CHUNK_SIZE):
+        if self.finished:
+            return b""
+        while len(self.buffer) < size + len(self.delimiter):
+            if self.delimiter in self.buffer or not self._fill():
+                break
+        index = self.buffer.find(self.delimiter)
+        if index >= 0 and index <= size:
+            data, self.buffer = self.buffer[:index], b""
+            self.finished = True
+            return data
+        # Hold back enough bytes to recognise a delimiter split across reads
+        take = min(size, max(0, len(self.buffer) - len(self.delimiter) + 1))
+        if take == 0 and index < 0:
+            raise HTTPError(400, "Unexpected end of multipart body")
+        data, self.buffer = self.buffer[:take], self.buffer[take:]
+        return data
+
+
+class VoiceCraftServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data_dir=DATA_DIR, backends=None, max_jobs=4):
+        super().__init__(address, RequestHandler)
+        self.data_dir = data_dir
+        self.whisper_backend, self.f5_backend = backends or get_backends()
+        self.jobs = JobManager(max_workers=max_jobs)
+
+    def server_close(self):
+        super().server_close()
+        self.jobs.shutdown()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "VoiceCraft"
+
+    routes = [
+        ("GET", r"/health", "health"),
+        ("GET", r"/projects", "list_projects"),
+        ("POST", r"/projects", "create_project"),
+        ("GET", r"/projects/(?P<project_id>[^/]+)", "get_project"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/audio", "upload_audio"),
+        ("PUT", r"/projects/(?P<project_id>[^/]+)/audio", "upload_audio"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/denoise", "denoise"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/transcribe", "transcribe"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/clone", "clone"),
+        ("GET", r"/projects/(?P<project_id>[^/]+)/artifacts/(?P<artifact>[^/]+)", "download"),
+        ("GET", r"/projects/(?P<project_id>[^/]+)/spectrograms/(?P<artifact>[^/]+)", "get_spectrogram"),
+        ("GET", r"/projects/(?P<project_id>[^/]+)/spectrograms/(?P<artifact>[^/]+)/(?P<level>\d+)/(?P<index>\d+)\.png",
+         "get_spectrogram_tile"),
+        ("GET", r"/search", "search"),
+        ("GET", r"/jobs/(?P<job_id>[^/]+)", "get_job"),
+        ("POST", r"/jobs/(?P<job_id>[^/]+)/cancel", "cancel_job"),
+        ("GET", r"/noise_profiles", "list_noise_profiles"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/noise_profiles", "capture_noise_profile"),
+        ("GET", r"/voices", "list_voices"),
+        ("GET", r"/voices/(?P<voice_id>[^/]+)", "get_voice"),
+        ("DELETE", r"/voices/(?P<voice_id>[^/]+)", "delete_voice"),
+        ("POST", r"/projects/(?P<project_id>[^/]+)/voices", "save_voice"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        if os.environ.get("VOICECRAFT_API_LOG", "1") == "1":
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        path = self.path.split("?", 1)[0].rstrip("/") or "/"
+        try:
+            for route_method, pattern, name in self.routes:
+                match = re.fullmatch(pattern, path)
+                if match and route_method == method:
+                    getattr(self, name)(**match.groupdict())
+                    return
+            raise HTTPError(404, "Not found")
+        except HTTPError as e:
+            self._send_error(e.status, e.message)
+        except ValueError as e:
+            # Malformed requests: bad Content-Length, chunk sizes or unreadable uploads
+            self._send_error(400, str(e))
+        except Exception as e:
+            self.log_error("%s %s failed:\n%s", method, path, traceback.format_exc())
+            self._send_error(500, f"Internal error: {e}")
+
+    def _send_error(self, status, message):
+        # The rest of a rejected request body is not read, so the connection cannot be reused
+        self.close_connection = True
+        try:
+            self._send_json({"error": message}, status=status)
+        except OSError:
+            pass
+
+    # Helpers
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = self.headers.get("Content-Length")
+        chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        if length is None and not chunked:
+            raise HTTPError(411, "Content-Length or chunked transfer encoding required")
+        if length is not None:
+            try:
+                length = int(length)
+            except ValueError:
+                raise HTTPError(400, f"Invalid Content-Length {length!r}")
+            if length < 0:
+                raise HTTPError(400, f"Invalid Content-Length {length}")
+        return _BodyReader(self.rfile, length, chunked)
+
+    def _json_body(self):
+        if self.headers.get("Content-Length") in (None, "0") and "chunked" not in self.headers.get("Transfer-Encoding", ""):
+            return {}
+        body = self._body()
+        data = b""
+        while len(data) <= MAX_JSON_BODY:
+            chunk = body.read()
+            if not chunk:
+                break
+            data += chunk
+        if len(data) > MAX_JSON_BODY:
+            raise HTTPError(413, "Request body too large")
+        try:
+            payload = json.loads(data or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Invalid JSON body")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "JSON body must be an object")
+        return payload
+
+    def _query(self):
+        return {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+
+    def _upload_stream(self, body):
+        # Multipart bodies are unwrapped to the first file part; anything else is the file itself
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            match = re.search(r'boundary="?([^";]+)"?', content_type)
+            if not match:
+                raise HTTPError(400, "Missing multipart boundary")
+            return _MultipartFile(body, match.group(1).encode("latin-1"))
+        return body
+
+    def _project(self, project_id):
+        project = load_project(project_id, self.server.data_dir)
+        if project is None:
+            raise HTTPError(404, f"Project {project_id} not found")
+        return project
+
+    def _session_id(self):
+        return self.headers.get("X-Session-Id") or self.client_address[0]
+
+    def _project_json(self, project):
+        artifacts = {
+            key: f"/projects/{project['id']}/artifacts/{key}"
+            for key in ARTIFACTS if pipeline.available(project, key)
+        }
+        return {"id": project["id"], "name": project["name"], "artifacts": artifacts}
+
+    def _submit(self, kind, project, fn, *args, **kwargs):
+        job = self.server.jobs.submit(kind, project["id"], fn, *args, **kwargs)
+        self._send_json(job.to_dict(), status=202)
+
+    # Endpoints
+
+    def health(self):
+        self._send_json({"status": "ok"})
+
+    def list_projects(self):
+        projects = list_projects(self.server.data_dir)
+        self._send_json({"projects": [self._project_json(p) for p in projects.values()]})
+
+    def create_project(self):
+        name = str(self._json_body().get("name") or "").strip()
+        if not name:
+            raise HTTPError(400, "Please provide a project name")
+        project = create_project(name, self.server.data_dir)
+        self._send_json(self._project_json(project), status=201)
+
+    def get_project(self, project_id):
+        self._send_json(self._project_json(self._project(project_id)))
+
+    def upload_audio(self, project_id):
+        project = self._project(project_id)
+        pipeline.ingest(project, self._upload_stream(self._body()))
+        self._send_json(self._project_json(project), status=201)
+
+    def denoise(self, project_id):
+        project = self._project(project_id)
+        if not project.get("original_audio"):
+            raise HTTPError(409, "Upload an audio file first")
+        payload = self._json_body()
+        apply_noise_reduction = bool(payload.get("noise_reduction", True))
+        noise_profile = payload.get("noise_profile")
+        profile_version = payload.get("profile_version")
+        backend = payload.get("backend", "noisereduce")
+        if backend not in pipeline.DENOISE_BACKENDS:
+            raise HTTPError(400, f"Unknown denoise backend {backend}")
+
+        def run():
+            pipeline.denoise(project, apply_noise_reduction, noise_profile, profile_version, backend)
+            return self._project_json(project)
+
+        self._submit("denoise", project, run)
+
+    def transcribe(self, project_id):
+        project = self._project(project_id)
+        if not pipeline.available(project, "cleaned_audio"):
+            raise HTTPError(409, "Process the audio first")
+        payload = self._json_body()
+        model_size = payload.get("model_size", "base")
+        if model_size not in ("auto",) + WHISPER_SIZES:
+            raise HTTPError(400, f"Unknown model size {model_size}")
+        budget_seconds = payload.get("budget_seconds")
+        if model_size == "auto" and not isinstance(budget_seconds, (int, float)):
+            raise HTTPError(400, "model_size 'auto' needs budget_seconds")
+        skip_silence = bool(payload.get("skip_silence", False))
+        session_id = self._session_id()
+
+        def run():
+            size = model_size
+            estimates = None
+            if size == "auto":
+                size, estimates = pipeline.choose_whisper_model(project, budget_seconds, session_id=session_id,
+                                                                backend=self.server.whisper_backend,
+                                                                skip_silence=skip_silence)
+            result = pipeline.transcribe(project, size, session_id=session_id,
+                                         backend=self.server.whisper_backend, skip_silence=skip_silence)
+            extra = {"model_size": size, "estimates": estimates} if estimates else {}
+            return {"text": result["text"], "skipped_seconds": result["skipped_seconds"], **extra,
+                    **self._project_json(project)}
+
+        self._submit("transcribe", project, run)
+
+    def clone(self, project_id):
+        project = self._project(project_id)
+        payload = self._json_body()
+        gen_text = str(payload.get("gen_text") or "").strip()
+        if not gen_text:
+            raise HTTPError(400, "Please provide gen_text")
+        preset = str(payload.get("preset") or DEFAULT_F5_PRESET)
+        if preset not in F5_PRESETS:
+            raise HTTPError(400, f"preset must be one of {', '.join(F5_PRESETS)}")
+        ref_text = payload.get("ref_text")
+        if payload.get("voice"):
+            # A saved voice needs nothing from the project but somewhere to write to
+            voice_id = voices.find(str(payload["voice"]), self.server.data_dir)
+            if voice_id is None:
+                raise HTTPError(404, f"Voice {payload['voice']} not found")
+            ref_audio, voice_text = voices.reference(voice_id, self.server.data_dir)
+            ref_text = voice_text if ref_text is None else ref_text
+        elif not pipeline.available(project, "cleaned_audio"):
+            raise HTTPError(409, "Process the audio first")
+        elif ref_text is None:
+            if not project.get("transcription"):
+                raise HTTPError(409, "Transcribe the audio first or pass ref_text")
+            ref_audio, ref_text = pipeline.reference(project)
+        else:
+            ref_audio = None
+        session_id = self._session_id()
+
+        def run():
+            job = current_job()
+
+            def on_progress(done, total, eta):
+                job.progress = {"done": done, "total": total, "eta_seconds": round(eta, 1)}
+
+            pipeline.clone(project, ref_text, gen_text, session_id=session_id,
+                           backend=self.server.f5_backend, ref_audio=ref_audio, preset=preset,
+                           on_progress=on_progress, cancel=job.cancel_event)
+            return {"preset": preset, **self._project_json(project)}
+
+        self._submit("clone", project, run)
+
+    def list_noise_profiles(self):
+        project_id = self._query().get("project_id")
+        self._send_json({"profiles": list_profiles(self.server.data_dir, project_id=project_id)})
+
+    def capture_noise_profile(self, project_id):
+        project = self._project(project_id)
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            payload = self._json_body()
+            noise_audio = None
+        else:
+            payload = self._query()
+            # Decoders need a seekable file, so spool the clip to disk first
+            noise_audio = tempfile.NamedTemporaryFile(suffix=".audio")
+            shutil.copyfileobj(self._upload_stream(self._body()), noise_audio, CHUNK_SIZE)
+            noise_audio.flush()
+        name = str(payload.get("name") or "").strip()
+        scope = payload.get("scope", "project")
+        if not name:
+            raise HTTPError(400, "Please provide a profile name")
+        if scope not in ("project", "device"):
+            raise HTTPError(400, "scope must be 'project' or 'device'")
+        if noise_audio is None and not project.get("original_audio"):
+            raise HTTPError(409, "Upload an audio file first or send a noise-only clip")
+        try:
+            meta = pipeline.capture_noise_profile(
+                project, name, scope, noise_audio.name if noise_audio is not None else None
+            )
+        except NoiseProfileError as e:
+            raise HTTPError(400, str(e))
+        finally:
+            if noise_audio is not None:
+                noise_audio.close()
+        self._send_json(meta, status=201)
+
+    def list_voices(self):
+        self._send_json({"voices": voices.list_voices(self.server.data_dir)})
+
+    def _voice(self, voice_id):
+        try:
+            meta = voices.load(voice_id, self.server.data_dir)
+        except voices.VoiceError as e:
+            raise HTTPError(404, str(e))
+        meta.pop("reference")
+        return meta
+
+    def get_voice(self, voice_id):
+        self._send_json(self._voice(voice_id))
+
+    def delete_voice(self, voice_id):
+        self._voice(voice_id)
+        voices.delete(voice_id, self.server.data_dir)
+        self._send_json({"deleted": voice_id})
+
+    def save_voice(self, project_id):
+        project = self._project(project_id)
+        name = str(self._json_body().get("name") or "").strip()
+        if not name:
+            raise HTTPError(400, "Please provide a voice name")
+        if not pipeline.available(project, "cleaned_audio") or not project.get("transcription"):
+            raise HTTPError(409, "Process and transcribe the audio first")
+        try:
+            meta = pipeline.save_voice(project, name)
+        except voices.VoiceError as e:
+            raise HTTPError(400, str(e))
+        self._send_json(meta, status=201)
+
+    def search(self):
+        query = self._query()
+        try:
+            limit = min(int(query.get("limit", DEFAULT_SEARCH_LIMIT)), 200)
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer")
+        hits = get_search_index(self.server.data_dir).search(query.get("q", ""), limit, query.get("project_id"))
+        for hit in hits:
+            project = load_project(hit["project_id"], self.server.data_dir)
+            artifact = "cleaned_audio" if project and pipeline.available(project, "cleaned_audio") else "original_audio"
+            # Media fragment: browsers start playback at the hit
+            audio_url = f"/projects/{hit['project_id']}/artifacts/{artifact}?preview=1"
+            hit["audio_url"] = audio_url + (f"#t={hit['start']:.2f}" if hit["start"] is not None else "")
+        self._send_json({"query": query.get("q", ""), "hits": hits})
+
+    def get_job(self, job_id):
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"Job {job_id} not found")
+        self._send_json(job.to_dict())
+
+    def cancel_job(self, job_id):
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"Job {job_id} not found")
+        job.cancel()
+        self._send_json(job.to_dict(), status=202)
+
+    def _spectrogram(self, project_id, artifact):
+        project = self._project(project_id)
+        if artifact not in AUDIO_ARTIFACTS or not pipeline.available(project, artifact):
+            raise HTTPError(404, f"Artifact {artifact} not found")
+        return open_pyramid(pipeline.ensure(project, artifact))
+
+    def get_spectrogram(self, project_id, artifact):
+        pyramid = self._spectrogram(project_id, artifact)
+        self._send_json({
+            "duration": pyramid.duration,
+            "max_frequency": spectrogram.SAMPLE_RATE / 2,
+            "bins": spectrogram.BINS,
+            "tile_columns": spectrogram.TILE_COLUMNS,
+            "db_range": [spectrogram.FLOOR_DB, spectrogram.CEILING_DB],
+            "version": version(pyramid.file),
+            "levels": [
+                {"level": level, "columns": size, "column_seconds": pyramid.column_seconds(level),
+                 "tiles": pyramid.tiles(level)}
+                for level, size in enumerate(pyramid.sizes)
+            ],
+        })
+
+    def get_spectrogram_tile(self, project_id, artifact, level, index):
+        pyramid = self._spectrogram(project_id, artifact)
+        try:
+            tile = pyramid.tile(int(level), int(index))
+        except IndexError as e:
+            raise HTTPError(404, str(e))
+        body = spectrogram.png(tile.T)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        # Tiles change only with the artifact; clients add ?v=<version> to cache them
+        self.send_header("Cache-Control", "private, max-age=31536000, immutable" if "v" in self._query() else "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def download(self, project_id, artifact):
+        project = self._project(project_id)
+        # Evicted intermediates are regenerated on demand
+        if artifact not in ARTIFACTS or not pipeline.available(project, artifact):
+            raise HTTPError(404, f"Artifact {artifact} not found")
+        pipeline.ensure(project, artifact)
+        query = self._query()
+        preview = query.get("preview") == "1" and artifact in AUDIO_ARTIFACTS
+        path = preview_file(project[artifact]) if preview else project[artifact]
+
+        etag = f'"{version(path)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        byte_range = _byte_range(self.headers.get("Range"), size)
+        self.send_response(206 if byte_range else 200)
+        if byte_range:
+            start, end = byte_range
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Type", ARTIFACT_TYPES.get(os.path.splitext(path)[1], "application/octet-stream"))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        # Versioned URLs (?v=) never change content, so browsers may keep them
+        self.send_header("Cache-Control", "private, max-age=31536000, immutable" if "v" in query else "no-cache")
+        disposition = "inline" if preview else "attachment"
+        self.send_header("Content-Disposition", f'{disposition}; filename="{os.path.basename(path)}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+def _byte_range(header, size):
+    """``(start, end)`` of a single-range ``Range: bytes=`` header, or None to send the whole file"""
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header or "")
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPError(416, f"Range not satisfiable for {size} bytes")
+    return start, end
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VoiceCraft HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=["real", "stub"], default=None,
+                        help="model backends (default: VOICECRAFT_BACKEND or real)")
+    parser.add_argument("--preload", default="",
+                        help="comma separated Whisper sizes to load at startup, e.g. base,small")
+    parser.add_argument("--max-jobs", type=int, default=4, help="jobs running at once")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    backends = get_backends(args.backend)
+    server = VoiceCraftServer((args.host, args.port), args.data_dir, backends, args.max_jobs)
+
+    # Warm the Whisper workers so the first request does not pay the load
+    if args.preload and isinstance(backends[0], WhisperBackend):
+        from voicecraft.models import get_whisper_model
+        for size in args.preload.split(","):
+            print(f"Loading Whisper {size} model...")
+            get_whisper_model(size.strip(), pin=True)
+
+    print(f"VoiceCraft API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Sample rates the models consume
+WHISPER_SAMPLE_RATE = 16000
+F5_SAMPLE_RATE = 24000
+
+# Cached versions live next to the artifact they were made from
+CACHE_DIR_NAME = ".cache"
+
+# Memory-mapped arrays kept open across calls and sessions
+MAX_OPEN_ARRAYS = 32
+
+# Frames decoded and resampled at a time, so a long recording is never in memory whole
+DECODE_BLOCK_FRAMES = 1 << 20
+
+_open_arrays = OrderedDict()
+_lock = threading.Lock()
+
+
+def mark_used(path):
+    """
+    Record that ``path`` was just used, for least-recently-used eviction.
+
+    Sets the access time explicitly (mounts often skip atime updates) and
+    keeps the modification time, which cache entries are keyed by.
+    """
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except OSError:
+        pass
+
+
+def _cache_stem(path, tag):
+    # The source's mtime and size are part of the name, so a rewritten
+    # artifact never matches an old cache entry
+    stat = os.stat(path)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    name = f"{os.path.basename(path)}.{tag}.{stat.st_mtime_ns}-{stat.st_size}"
+    return cache_dir, name
+
+
+def _version(stem):
+    return stem.rsplit(".", 1)[1]
+
+
+def _remove_stale(cache_dir, path, current):
+    # Drop everything derived from older versions of the artifact, whatever it is
+    pattern = re.compile(re.escape(os.path.basename(path)) + r"\.[^.]+\.(\d+-\d+)\.")
+    for name in os.listdir(cache_dir):
+        match = pattern.match(name)
+        if match and match.group(1) != current and ".tmp." not in name:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def _decode(path, sr):
+    import librosa
+    y, _ = librosa.load(path, sr=sr, mono=True)
+    return y.astype(np.float32, copy=False)
+
+
+def _write_pcm(path, sr, tmp_path):
+    """
+    Decode ``path`` into a ``.npy`` of mono float32 PCM at ``sr``, block by block.
+
+    Gives the samples librosa.load would (channel mean, then soxr's HQ
+    resampler), without holding the file in memory. Formats libsndfile
+    cannot read (M4A, ...) are decoded whole by librosa through ffmpeg.
+    """
+    import soundfile as sf
+    import soxr
+
+    try:
+        source = sf.SoundFile(path)
+    except RuntimeError:
+        np.save(tmp_path, _decode(path, sr))
+        return
+    with source:
+        # librosa fixes the resampled length the same way; anything short of it stays zero
+        length = int(math.ceil(source.frames * sr / source.samplerate))
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(length,))
+        stream = None
+        if source.samplerate != sr:
+            stream = soxr.ResampleStream(source.samplerate, sr, 1, dtype="float32", quality="HQ")
+        written = 0
+        for block in source.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype="float32", always_2d=True):
+            chunk = block.mean(axis=1)
+            if stream is not None:
+                chunk = stream.resample_chunk(chunk)
+            take = min(len(chunk), length - written)
+            out[written:written + take] = chunk[:take]
+            written += take
+        if stream is not None:
+            tail = stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            take = min(len(tail), length - written)
+            out[written:written + take] = tail[:take]
+        out.flush()
+        del out
+
+
+def model_audio(path, sr):
+    """
+    Mono float32 PCM of ``path`` at ``sr``, decoded and resampled only once.
+
+    The first call writes a ``.npy`` next to the artifact; later calls (from
+    any session) memory-map it, so repeated transcriptions skip the decode,
+    the resample and Whisper's ffmpeg subprocess.
+    """
+    cache_dir, stem = _cache_stem(path, sr)
+    cache_path = os.path.join(cache_dir, stem + ".npy")
+    with _lock:
+        array = _open_arrays.get(cache_path)
+        if array is not None:
+            _open_arrays.move_to_end(cache_path)
+    if array is not None:
+        mark_used(cache_path)
+        return array
+
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = os.path.join(cache_dir, f"{stem}.{threading.get_ident()}.tmp.npy")
+        _write_pcm(path, sr, tmp_path)
+        os.replace(tmp_path, cache_path)
+        _remove_stale(cache_dir, path, _version(stem))
+
+    array = np.load(cache_path, mmap_mode="r")
+    mark_used(cache_path)
+    with _lock:
+        _open_arrays[cache_path] = array
+        while len(_open_arrays) > MAX_OPEN_ARRAYS:
+            _open_arrays.popitem(last=False)
+    return array
+
+
+def open_files():
+    """Cache files this process has memory-mapped right now"""
+    with _lock:
+        return {os.path.abspath(path) for path in _open_arrays}
+
+
+def cached_file(path, tag, extension, write):
+    """
+    Path of a file derived from ``path``, made by ``write(tmp_path)`` only once.
+
+    ``tag`` tells apart the different files derived from one artifact (a
+    sample rate, "preview", ...). Rewriting the artifact invalidates them,
+    and they are deleted the next time anything is derived from it.
+    """
+    cache_dir, stem = _cache_stem(path, tag)
+    cache_path = os.path.join(cache_dir, stem + extension)
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = os.path.join(cache_dir, f"{stem}.{threading.get_ident()}.tmp{extension}")
+        write(tmp_path)
+        os.replace(tmp_path, cache_path)
+        _remove_stale(cache_dir, path, _version(stem))
+    else:
+        mark_used(cache_path)
+    return cache_path
+
+
+def model_audio_file(path, sr):
+    """
+    Path of a mono 16-bit WAV copy of ``path`` at ``sr``, written only once.
+
+    For tools that only take file paths (the F5-TTS CLI): handing them audio
+    already at their native rate makes their own resampling a no-op.
+    """
+    import soundfile as sf
+
+    # Files already in that form (saved voices) are used as they are
+    info = sf.info(path)
+    if info.format == "WAV" and info.subtype == "PCM_16" and info.channels == 1 and info.samplerate == sr:
+        return path
+
+    def write(tmp_path):
+        sf.write(tmp_path, np.asarray(model_audio(path, sr)), sr, format="WAV", subtype="PCM_16")
+
+    return cached_file(path, sr, ".wav", write)
@@ -0,0 +1,240 @@
+import math
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+import wave
+
+import numpy as np
+
+from voicecraft.config import BACKEND
+
+
+class WhisperBackend:
+    """Transcribes with a cached OpenAI Whisper model"""
+
+    def transcribe(self, audio, model_size, **options):
+        from voicecraft.models import whisper_model
+        # Held while decoding so the model is not unloaded under the job
+        with whisper_model(model_size) as model:
+            return model.transcribe(audio, **options)
+
+
+# F5-TTS inference settings by speed/quality. Synthesis time grows with
+# nfe_step (one model pass per step); "standard" is the CLI's default.
+F5_PRESETS = {
+    "draft": {"nfe_step": 8, "cfg_strength": 2.0, "speed": 1.0},
+    "fast": {"nfe_step": 16, "cfg_strength": 2.0, "speed": 1.0},
+    "standard": {"nfe_step": 32, "cfg_strength": 2.0, "speed": 1.0},
+    "quality": {"nfe_step": 64, "cfg_strength": 2.0, "speed": 1.0},
+}
+
+DEFAULT_F5_PRESET = "standard"
+
+# tqdm's "3/8 [" counter, which F5-TTS prints as it finishes each text batch
+_BATCH_PROGRESS = re.compile(r"(\d+)/(\d+) \[")
+
+# How often a running clone reports progress and checks for cancellation
+PROGRESS_INTERVAL = 0.5
+
+
+class CloneCancelled(Exception):
+    """The clone was cancelled before it finished"""
+
+
+def _kill_tree(process):
+    # F5-TTS runs in its own process group, so this also stops its workers
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+    process.wait()
+
+
+def _read_stream(stream, chunks, on_line):
+    # tqdm redraws its bar with "\r", so lines end at either terminator
+    pending = b""
+    for chunk in iter(lambda: stream.read1(4096), b""):
+        chunks.append(chunk)
+        *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+        for line in lines:
+            on_line(line.decode("utf-8", "replace"))
+    stream.close()
+
+
+def run_with_progress(cmd, timeout, env=None, on_progress=None, cancel=None):
+    """
+    Run ``cmd`` like ``subprocess.run``, reading its output as it is written.
+
+    Every PROGRESS_INTERVAL seconds ``on_progress(done, total)`` gets the
+    latest batch counter the process printed (``total`` is None until the
+    first one). Setting the ``cancel`` event raises CloneCancelled. On
+    cancellation, timeout or any exception raised by ``on_progress`` the
+    whole process tree is killed.
+    """
+    progress = [0, None]
+
+    def on_line(line):
+        match = _BATCH_PROGRESS.search(line)
+        if match:
+            progress[:] = [int(match.group(1)), int(match.group(2))]
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                               start_new_session=os.name == "posix")
+    stdout, stderr = [], []
+    readers = [threading.Thread(target=_read_stream, args=(stream, chunks, on_line), daemon=True)
+               for stream, chunks in ((process.stdout, stdout), (process.stderr, stderr))]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                process.wait(PROGRESS_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel is not None and cancel.is_set():
+                raise CloneCancelled("Voice cloning was cancelled")
+            if time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            if on_progress is not None:
+                on_progress(*progress)
+    finally:
+        # Also reaps anything the process left running, which would keep the pipes open
+        _kill_tree(process)
+        for reader in readers:
+            reader.join()
+    output = b"".join(stdout).decode("utf-8", "replace")
+    errors = b"".join(stderr).decode("utf-8", "replace")
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout=output, stderr=errors)
+
+
+class F5CliBackend:
+    """Clones a voice by running the ``f5-tts_infer-cli`` command"""
+
+    def command(self, ref_audio, ref_text, gen_text, output_path, device="cpu", preset=DEFAULT_F5_PRESET):
+        settings = F5_PRESETS[preset]
+        return [
+            "f5-tts_infer-cli",
+            "--model", "F5TTS_v1_Base",
+            "--ref_audio", ref_audio,
+            "--ref_text", ref_text,
+            "--gen_text", gen_text,
+            "--output_file", output_path,
+            "--device", device,
+            "--nfe_step", str(settings["nfe_step"]),
+            "--cfg_strength", str(settings["cfg_strength"]),
+            "--speed", str(settings["speed"]),
+        ]
+
+    def clone(self, ref_audio, ref_text, gen_text, output_path, timeout=300, env=None, preset=DEFAULT_F5_PRESET,
+              on_progress=None, cancel=None):
+        cmd = self.command(ref_audio, ref_text, gen_text, output_path, preset=preset)
+        return run_with_progress(cmd, timeout, env=env, on_progress=on_progress, cancel=cancel)
+
+
+class StubWhisperBackend:
+    """
+    Deterministic stand-in for Whisper, for tests and load runs.
+
+    Sleeps ``latency`` seconds per call and returns a fixed transcript with
+    one segment per 5 seconds of audio.
+    """
+
+    # No model is held in memory, so the admission gate reserves none
+    loads_models = False
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def transcribe(self, audio, model_size, **options):
+        time.sleep(self.latency)
+        duration = _audio_duration(audio)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + 5.0)
+            segments.append({"id": len(segments), "start": start, "end": end,
+                             "text": f" Segment {len(segments)} of the stub transcript."})
+            start = end
+        text = "".join(segment["text"] for segment in segments)
+        return {"text": text, "segments": segments, "language": options.get("language", "en")}
+
+
+# Text the stub "generates" per reported batch
+STUB_BATCH_CHARS = 200
+
+
+class StubF5Backend:
+    """
+    Deterministic stand-in for the F5-TTS CLI.
+
+    Sleeps ``latency`` seconds (scaled by the preset's steps relative to
+    "standard"), reporting one batch per STUB_BATCH_CHARS of text, and
+    writes a 24 kHz tone whose length follows the generated text, so
+    downstream code sees a real WAV file.
+    """
+
+    loads_models = False
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def command(self, ref_audio, ref_text, gen_text, output_path, device="cpu", preset=DEFAULT_F5_PRESET):
+        return ["stub-f5-tts", "--ref_audio", ref_audio, "--gen_text", gen_text, "--output_file", output_path,
+                "--nfe_step", str(F5_PRESETS[preset]["nfe_step"])]
+
+    def clone(self, ref_audio, ref_text, gen_text, output_path, timeout=300, env=None, preset=DEFAULT_F5_PRESET,
+              on_progress=None, cancel=None):
+        cmd = self.command(ref_audio, ref_text, gen_text, output_path, preset=preset)
+        latency = self.latency * F5_PRESETS[preset]["nfe_step"] / F5_PRESETS[DEFAULT_F5_PRESET]["nfe_step"]
+        batches = max(1, math.ceil(len(gen_text) / STUB_BATCH_CHARS))
+        deadline = time.monotonic() + timeout
+        for done in range(batches):
+            if on_progress is not None:
+                on_progress(done, batches)
+            end = time.monotonic() + latency / batches
+            while time.monotonic() < end:
+                if cancel is not None and cancel.is_set():
+                    raise CloneCancelled("Voice cloning was cancelled")
+                if time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                time.sleep(min(0.05, max(0.0, end - time.monotonic())))
+        sample_rate = 24000
+        seconds = max(0.5, 0.06 * len(gen_text) / F5_PRESETS[preset]["speed"])
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        tone = (0.2 * np.sin(2 * math.pi * 220.0 * t) * 32767).astype(np.int16)
+        with wave.open(output_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            f.writeframes(tone.tobytes())
+        return subprocess.CompletedProcess(cmd, 0, stdout="stub clone done\n", stderr="")
+
+
+def _audio_duration(audio):
+    # Arrays are 16 kHz PCM (what Whisper takes); paths are read from the header
+    if isinstance(audio, np.ndarray):
+        return len(audio) / 16000
+    import soundfile as sf
+    return sf.info(audio).duration
+
+
+def get_backends(kind=None):
+    """
+    Return ``(whisper_backend, f5_backend)`` for the configured backend kind.
+
+    ``VOICECRAFT_BACKEND=stub`` selects the stubs; ``VOICECRAFT_STUB_LATENCY``
+    sets their per-call latency in seconds.
+    """
+    kind = kind or BACKEND
+    if kind == "stub":
+        latency = float(os.environ.get("VOICECRAFT_STUB_LATENCY", "0"))
+        return StubWhisperBackend(latency), StubF5Backend(latency)
+    return WhisperBackend(), F5CliBackend()
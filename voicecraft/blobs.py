@@ -0,0 +1,137 @@
+"""
+Content-addressed store for uploaded audio.
+
+Uploads are hashed while they are streamed to disk and kept once per
+content under ``<data_dir>/.blobs``; projects get a hard link to the blob,
+so the same recording uploaded to several projects takes the space of one.
+A blob whose link count drops to one is no longer used by any project.
+Adding a blob and linking it happen under the store's lock, which garbage
+collection takes too, so a blob is never collected before its first link.
+Where the filesystem cannot hard link, projects get copies instead; link
+counts then say nothing about use, so the store stops collecting garbage.
+"""
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from voicecraft import storage
+
+BLOBS_DIR_NAME = ".blobs"
+
+# Locked by every process sharing the data directory (where flock exists)
+LOCK_FILE = ".lock"
+
+# Present once a blob had to be copied into a project instead of linked
+COPIES_FILE = ".copies"
+
+CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+
+
+def blobs_dir(data_dir):
+    return os.path.join(data_dir, BLOBS_DIR_NAME)
+
+
+def _blob_stem(digest, data_dir):
+    return os.path.join(blobs_dir(data_dir), digest[:2], digest)
+
+
+def find(digest, data_dir):
+    """Stored blob for ``digest``, or None"""
+    return storage.stored_audio(_blob_stem(digest, data_dir))
+
+
+@contextlib.contextmanager
+def locked(data_dir):
+    """Hold the store's lock: no blob is added or collected meanwhile, by this or another process"""
+    os.makedirs(blobs_dir(data_dir), exist_ok=True)
+    with _lock, open(os.path.join(blobs_dir(data_dir), LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def receive(stream, data_dir, chunk_size=CHUNK_SIZE):
+    """
+    Stream an upload to a temporary file in the store; returns ``(sha256, tmp_path)``.
+
+    The content is hashed while it is written, so it is read only once.
+    Pass the result to ``add`` to store it.
+    """
+    os.makedirs(blobs_dir(data_dir), exist_ok=True)
+    tmp_path = os.path.join(blobs_dir(data_dir), f"upload.{os.getpid()}-{threading.get_ident()}.tmp")
+    digest = hashlib.sha256()
+    with open(tmp_path, "wb") as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest(), tmp_path
+
+
+def add(digest, tmp_path, data_dir):
+    """
+    Store a received upload unless its content is already there; returns the blob's path.
+
+    Call with the store ``locked`` and link the blob before releasing it,
+    or garbage collection may delete it first.
+    """
+    blob_path = find(digest, data_dir)
+    if blob_path is not None:
+        os.remove(tmp_path)
+        return blob_path
+    stem = _blob_stem(digest, data_dir)
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    # Stored like any audio artifact: PCM WAV becomes FLAC, other formats stay as they are
+    return storage.store_file(tmp_path, stem + ".wav")
+
+
+def link(blob_path, path):
+    """
+    Make ``path`` a hard link to ``blob_path`` (a copy where links are not supported).
+
+    Call with the store ``locked``.
+    """
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        os.link(blob_path, tmp_path)
+    except OSError:
+        # The blob keeps a link count of one, which garbage collection would
+        # take for unused, so collection is turned off for the store
+        root = os.path.dirname(os.path.dirname(blob_path))
+        open(os.path.join(root, COPIES_FILE), "a").close()
+        shutil.copyfile(blob_path, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def collect_garbage(data_dir):
+    """Delete blobs no project links to any more; returns bytes freed (none once blobs were copied)"""
+    freed = 0
+    root = blobs_dir(data_dir)
+    if not os.path.isdir(root):
+        return freed
+    with locked(data_dir):
+        if os.path.exists(os.path.join(root, COPIES_FILE)):
+            return freed
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.startswith(".") or ".tmp" in filename:
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                if stat.st_nlink == 1:
+                    os.remove(path)
+                    freed += stat.st_size
+    return freed
@@ -0,0 +1,85 @@
+"""
+Resumable long transcriptions.
+
+A checkpoint is a JSON-lines file in the project directory. The first line
+identifies the job (the audio's content hash and the decoding options);
+every later line commits one decoded window: the sample offset the next
+window starts from and the segments before it, with absolute times. Lines
+are flushed to disk as they are written, so a crash loses at most the
+window being decoded. A torn last line is cut off when the checkpoint is
+loaded, and a checkpoint for different audio or options is discarded.
+"""
+import hashlib
+import json
+import os
+
+FORMAT_VERSION = 1
+
+
+def audio_key(audio):
+    """Content hash of a PCM array, unchanged when an evicted file is regenerated"""
+    return hashlib.sha256(memoryview(audio).cast("B")).hexdigest()[:16]
+
+
+class TranscriptionCheckpoint:
+    """Committed windows of one transcription job"""
+
+    def __init__(self, path, job):
+        self.path = path
+        self.job = dict(job, v=FORMAT_VERSION)
+        self.offset = 0
+        self.segments = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        # Every complete line ends with a newline, so the last element is "" or a torn line
+        lines = data.split(b"\n")
+        try:
+            if len(lines) < 2 or json.loads(lines[0]) != self.job:
+                return
+        except ValueError:
+            return
+        valid = len(lines[0]) + 1
+        for line in lines[1:-1]:
+            try:
+                window = json.loads(line)
+            except ValueError:
+                break
+            self.offset = window["offset"]
+            self.segments.extend(window["segments"])
+            valid += len(line) + 1
+        if valid < len(data):
+            # Cut the torn tail, or the next commit would be appended to it and lost with it
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+                os.fsync(f.fileno())
+
+    def _append(self, record, mode="a"):
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit(self, offset, segments):
+        """Record ``segments`` as final and the next window as starting at ``offset``"""
+        if self.offset == 0 and not self.segments:
+            # First commit of this job replaces whatever checkpoint was there
+            self._append(self.job, mode="w")
+        self._append({"offset": offset, "segments": segments})
+        self.offset = offset
+        self.segments.extend(segments)
+
+    def prompt(self, chars=200):
+        """End of the committed text, to give the next window its context"""
+        return "".join(segment["text"] for segment in self.segments)[-chars:].strip()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,20 @@
+import os
+
+# Root of the repository (the directory holding app.py)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Project artifacts live here, one sub-directory per project
+DATA_DIR = os.environ.get("VOICECRAFT_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+# "real" runs Whisper and the F5-TTS CLI, "stub" uses fast fake backends
+BACKEND = os.environ.get("VOICECRAFT_BACKEND", "real")
+
+# Codec audio artifacts are stored with: "flac" (lossless, default) or "wav"
+AUDIO_CODEC = os.environ.get("VOICECRAFT_AUDIO_CODEC", "flac")
+
+# Lossy codec of the previews the UI plays: "opus" (default), "vorbis" or "none"
+PREVIEW_CODEC = os.environ.get("VOICECRAFT_PREVIEW_CODEC", "opus")
+
+# Base URL of the HTTP API as the browser sees it (e.g. http://localhost:8000).
+# When set, the app's players stream audio from it with range requests.
+MEDIA_URL = os.environ.get("VOICECRAFT_MEDIA_URL", "").rstrip("/")
@@ -0,0 +1,206 @@
+import numpy as np
+
+# Same defaults as noisereduce.reduce_noise(stationary=True), so a stored
+# profile gives the same result as letting noisereduce estimate the noise
+N_FFT = 1024
+N_STD_THRESH = 1.5
+FREQ_MASK_SMOOTH_HZ = 500
+TIME_MASK_SMOOTH_MS = 50
+CHUNK_SIZE = 600000
+PADDING = 30000
+
+
+def _hop_length(n_fft):
+    return n_fft // 4
+
+
+def amp_to_db(x):
+    """Amplitude to dB, floored 80 dB below the peak (as noisereduce does)"""
+    x_db = 20.0 * np.log10(np.maximum(x, 1e-20))
+    return np.maximum(x_db, x_db.max() - 80.0)
+
+
+def noise_statistics(y_noise, n_fft=N_FFT, n_std_thresh=N_STD_THRESH):
+    """
+    Per-frequency noise statistics of a noise-only signal.
+
+    Returns ``(mean_db, std_db, threshold_db)``, each of shape
+    ``(n_fft // 2 + 1,)``. Bins of the signal below ``threshold_db`` are
+    treated as noise.
+    """
+    from librosa import stft
+
+    noise_db = amp_to_db(np.abs(stft(np.asarray(y_noise, dtype=np.float32), n_fft=n_fft,
+                                     hop_length=_hop_length(n_fft), win_length=n_fft)))
+    mean_db = np.mean(noise_db, axis=1)
+    std_db = np.std(noise_db, axis=1)
+    return mean_db, std_db, mean_db + std_db * n_std_thresh
+
+
+def smoothing_filter(sr, n_fft=N_FFT, freq_mask_smooth_hz=FREQ_MASK_SMOOTH_HZ,
+                     time_mask_smooth_ms=TIME_MASK_SMOOTH_MS):
+    """Triangular 2-D kernel used to soften the gating mask"""
+    n_grad_freq = max(1, int(freq_mask_smooth_hz / (sr / (n_fft / 2))))
+    n_grad_time = max(1, int(time_mask_smooth_ms / ((_hop_length(n_fft) / sr) * 1000)))
+
+    def ramp(n):
+        return np.concatenate([np.linspace(0, 1, n + 1, endpoint=False), np.linspace(1, 0, n + 2)])[1:-1]
+
+    kernel = np.outer(ramp(n_grad_freq), ramp(n_grad_time))
+    return kernel / np.sum(kernel)
+
+
+def resample_threshold(threshold_db, from_sr, to_sr, n_fft=N_FFT):
+    """Map a threshold computed at ``from_sr`` onto the frequency bins of ``to_sr``"""
+    if from_sr == to_sr:
+        return threshold_db
+    from_freqs = np.linspace(0, from_sr / 2, len(threshold_db))
+    to_freqs = np.linspace(0, to_sr / 2, n_fft // 2 + 1)
+    return np.interp(to_freqs, from_freqs, threshold_db)
+
+
+def _gate_chunk(chunk, threshold_db, prop_decrease, kernel, n_fft):
+    from librosa import istft, stft
+    from scipy.signal import fftconvolve
+
+    hop_length = _hop_length(n_fft)
+    sig_stft = stft(chunk, n_fft=n_fft, hop_length=hop_length, win_length=n_fft)
+    sig_db = amp_to_db(np.abs(sig_stft))
+
+    # Keep bins above the noise threshold, attenuate the rest
+    mask = (sig_db > threshold_db[:, None]) * prop_decrease + (1.0 - prop_decrease)
+    mask = fftconvolve(mask, kernel, mode="same")
+
+    denoised = istft(sig_stft * mask, hop_length=hop_length, win_length=n_fft)
+    out = np.zeros(len(chunk), dtype=chunk.dtype)
+    out[:len(denoised)] = denoised[:len(chunk)]
+    return out
+
+
+def spectral_gate(y, sr, threshold_db, prop_decrease=1.0, n_fft=N_FFT,
+                  chunk_size=CHUNK_SIZE, padding=PADDING):
+    """
+    Stationary spectral gating against a precomputed noise threshold.
+
+    Works through the signal in padded chunks like noisereduce, so memory
+    stays bounded on long files. No noise estimation happens here; that is
+    what lets a stored noise profile skip the estimation pass.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    kernel = smoothing_filter(sr, n_fft)
+    out = np.zeros_like(y)
+    for start in range(0, len(y), chunk_size):
+        end = min(len(y), start + chunk_size)
+        lo = max(0, start - padding)
+        hi = min(len(y), end + padding)
+        # Zero-pad chunks at the file edges to the same padded length
+        chunk = np.zeros(end - start + 2 * padding, dtype=np.float32)
+        offset = padding - (start - lo)
+        chunk[offset:offset + hi - lo] = y[lo:hi]
+        filtered = _gate_chunk(chunk, threshold_db, prop_decrease, kernel, n_fft)
+        out[start:end] = filtered[padding:padding + end - start]
+    return out
+
+
+def _torch_stft(rows, n_fft):
+    import torch
+    window = torch.hann_window(n_fft, dtype=rows.dtype)
+    return torch.stft(rows, n_fft=n_fft, hop_length=_hop_length(n_fft), win_length=n_fft, window=window,
+                      center=True, pad_mode="constant", return_complex=True)
+
+
+def _torch_amp_to_db(magnitude, valid_frames=None):
+    import torch
+    db = 20.0 * torch.log10(torch.clamp(magnitude, min=1e-20))
+    peak_source = db
+    if valid_frames is not None:
+        # Only frames covering real samples count towards the peak
+        peak_source = db.masked_fill(~valid_frames[:, None, :], float("-inf"))
+    peak = peak_source.amax(dim=(1, 2), keepdim=True)
+    return torch.maximum(db, peak - 80.0)
+
+
+def _torch_noise_thresholds(noises, n_fft, n_std_thresh):
+    """Per-signal noise thresholds in one batched STFT, ignoring the zero padding"""
+    import torch
+    hop_length = _hop_length(n_fft)
+    longest = max(len(n) for n in noises)
+    rows = torch.zeros((len(noises), longest), dtype=torch.float32)
+    for i, noise in enumerate(noises):
+        rows[i, :len(noise)] = torch.from_numpy(np.asarray(noise, dtype=np.float32))
+    spec = _torch_stft(rows, n_fft).abs()
+    # With zero (constant) centre padding, the first 1 + n // hop frames of a
+    # right-padded row are exactly the frames of the unpadded signal
+    counts = torch.tensor([1 + len(n) // hop_length for n in noises])
+    valid = torch.arange(spec.shape[-1])[None, :] < counts[:, None]
+    db = _torch_amp_to_db(spec, valid)
+    weights = valid[:, None, :].to(db.dtype)
+    n = counts[:, None].to(db.dtype)
+    mean = (db * weights).sum(dim=-1) / n
+    std = torch.sqrt((((db - mean[..., None]) ** 2) * weights).sum(dim=-1) / n)
+    return mean + std * n_std_thresh
+
+
+def spectral_gate_torch(signals, sr, thresholds=None, prop_decrease=1.0, n_fft=N_FFT,
+                        chunk_size=CHUNK_SIZE, padding=PADDING, batch_size=64):
+    """
+    Batched stationary spectral gating with torch on CPU.
+
+    Same algorithm and chunking as ``spectral_gate``/noisereduce, but every
+    padded chunk of every signal becomes one row of a tensor batch, and each
+    batch of up to ``batch_size`` rows goes through a single STFT, mask,
+    smoothing convolution and inverse STFT. ``thresholds`` holds one noise
+    threshold per signal (e.g. from a noise profile); ``None`` entries are
+    estimated from the signal itself like ``nr.reduce_noise``.
+    Returns a list of denoised float32 arrays.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    signals = [np.asarray(y, dtype=np.float32) for y in signals]
+    thresholds = list(thresholds) if thresholds is not None else [None] * len(signals)
+
+    with torch.no_grad():
+        # Noise thresholds for the signals without a stored profile
+        missing = [i for i, t in enumerate(thresholds) if t is None]
+        if missing:
+            estimated = _torch_noise_thresholds([signals[i][:chunk_size] for i in missing], n_fft, N_STD_THRESH)
+            for row, i in enumerate(missing):
+                thresholds[i] = estimated[row]
+        thresholds = torch.stack([torch.as_tensor(np.asarray(t), dtype=torch.float32) for t in thresholds])
+
+        # One row per padded chunk. Rows are right-padded with zeros to the
+        # longest row of their batch, which leaves the frames that matter
+        # unchanged; sorting by length keeps that padding small.
+        chunks = []
+        for i, y in enumerate(signals):
+            for start in range(0, max(1, len(y)), chunk_size):
+                chunks.append((i, start, min(len(y), start + chunk_size)))
+        chunks.sort(key=lambda chunk: chunk[2] - chunk[1])
+
+        kernel = torch.from_numpy(smoothing_filter(sr, n_fft).astype(np.float32))[None, None]
+        kernel_padding = (kernel.shape[-2] // 2, kernel.shape[-1] // 2)
+        window = torch.hann_window(n_fft)
+        outputs = [np.zeros_like(y) for y in signals]
+
+        for batch_start in range(0, len(chunks), batch_size):
+            batch = chunks[batch_start:batch_start + batch_size]
+            row_length = max(end - start for _, start, end in batch) + 2 * padding
+            rows = torch.zeros((len(batch), row_length), dtype=torch.float32)
+            for r, (i, start, end) in enumerate(batch):
+                lo = max(0, start - padding)
+                hi = min(len(signals[i]), end + padding)
+                offset = padding - (start - lo)
+                rows[r, offset:offset + hi - lo] = torch.from_numpy(signals[i][lo:hi])
+
+            spec = _torch_stft(rows, n_fft)
+            db = _torch_amp_to_db(spec.abs())
+            row_thresholds = thresholds[[i for i, _, _ in batch]]
+            mask = (db > row_thresholds[:, :, None]).to(torch.float32) * prop_decrease + (1.0 - prop_decrease)
+            mask = F.conv2d(mask[:, None], kernel, padding=kernel_padding)[:, 0]
+            denoised = torch.istft(spec * mask, n_fft=n_fft, hop_length=_hop_length(n_fft), win_length=n_fft,
+                                   window=window, center=True, length=row_length)
+
+            for r, (i, start, end) in enumerate(batch):
+                outputs[i][start:end] = denoised[r, padding:padding + end - start].numpy()
+        return outputs
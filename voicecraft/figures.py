@@ -0,0 +1,63 @@
+"""
+Waveform images of audio artifacts, rendered once.
+
+Images are cached as PNG (or SVG) files in the artifact's ``.cache``
+directory, keyed by the artifact's version and the display settings, and
+replaced when the artifact is rewritten. Rendering uses a standalone
+``Figure`` rather than pyplot, so nothing is left in pyplot's global figure
+registry and long-running servers keep flat memory. Spectrograms come from
+the out-of-core pyramid in ``spectrogram`` instead.
+"""
+import hashlib
+
+import numpy as np
+
+from voicecraft.audio_cache import cached_file
+
+FIGURE_SIZE = (10, 2)
+DPI = 100
+
+
+def _settings_tag(kind, settings):
+    digest = hashlib.sha1(repr(sorted(settings.items())).encode("utf-8")).hexdigest()[:12]
+    return f"{kind}-{digest}"
+
+
+def _new_figure(size, dpi):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _envelope(y, columns):
+    """Min/max of ``y`` per pixel column, interleaved; draws like the full signal"""
+    if len(y) <= 2 * columns:
+        return np.arange(len(y)), y
+    edges = np.linspace(0, len(y), columns + 1).astype(int)
+    lows = np.minimum.reduceat(y, edges[:-1])
+    highs = np.maximum.reduceat(y, edges[:-1])
+    x = np.repeat(edges[:-1], 2)
+    return x, np.column_stack([lows, highs]).reshape(-1)
+
+
+def waveform_image(path, title, color="blue", size=FIGURE_SIZE, dpi=DPI, fmt="png"):
+    """Path of the cached waveform image of ``path``"""
+    settings = {"title": title, "color": color, "size": tuple(size), "dpi": dpi}
+
+    def render(tmp_path):
+        import librosa
+
+        y, sr = librosa.load(path, sr=None)
+        x, envelope = _envelope(y, int(size[0] * dpi))
+        fig, ax = _new_figure(size, dpi)
+        ax.plot(x / sr, envelope, color=color, alpha=0.7)
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel("Amplitude")
+        ax.set_title(title)
+        fig.savefig(tmp_path, format=fmt, bbox_inches="tight")
+
+    return cached_file(path, _settings_tag("waveform", settings), f".{fmt}", render)
+
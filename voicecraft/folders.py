@@ -0,0 +1,276 @@
+"""
+The research notebook's folder workflow as a library.
+
+``FYP_test_01.ipynb`` works on numbered folders (``<root>/1``, ``<root>/2``,
+...) that hold ``N.<ext>``, ``N_cleaned.<ext>``, ``N_transcription.txt``
+and ``N_cloned_voice.wav``. The same functions live here without Colab or
+widgets, every output is written atomically (temporary file, then rename),
+and ``process_folders`` runs many folders at once in a bounded pool of
+worker processes, each loading its models once.
+
+    python -m voicecraft.folders /srv/recordings --workers 4 \\
+        --stages clean,transcribe,clone --gen-text "Hello there"
+"""
+import argparse
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from voicecraft.backends import WhisperBackend, get_backends
+from voicecraft.resources import THREAD_ENV_VARS, available_cores, set_blas_threads
+
+STAGES = ("clean", "transcribe", "clone")
+
+# Backends of this worker process, set up once by _init_worker
+_worker = {}
+
+
+class FolderError(Exception):
+    """A folder is missing the input a stage needs"""
+
+
+def _tmp_path(path):
+    # Same directory (so the rename is atomic) and same extension (so the format is kept)
+    root, extension = os.path.splitext(path)
+    return f"{root}.{os.getpid()}-{threading.get_ident()}.tmp{extension}"
+
+
+def _write_text(path, text):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def get_folder_list(root):
+    """Numbered folders under ``root``, in numeric order"""
+    if not os.path.isdir(root):
+        return []
+    return sorted((item for item in os.listdir(root) if item.isdigit() and os.path.isdir(os.path.join(root, item))),
+                  key=int)
+
+
+def create_next_folder(root):
+    """Create the next free numbered folder; returns ``(folder_number, folder_path)``"""
+    os.makedirs(root, exist_ok=True)
+    folder_num = len(get_folder_list(root)) + 1
+    # Another worker or process may take a number first, so retry until one is free
+    while True:
+        folder_path = os.path.join(root, str(folder_num))
+        try:
+            os.makedirs(folder_path)
+            return folder_num, folder_path
+        except FileExistsError:
+            folder_num += 1
+
+
+def add_recording(root, source_path):
+    """Copy a recording into a new numbered folder as ``N.<ext>``; returns its folder number"""
+    folder_num, folder_path = create_next_folder(root)
+    target = os.path.join(folder_path, f"{folder_num}{os.path.splitext(source_path)[1]}")
+    tmp_path = _tmp_path(target)
+    shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, target)
+    return folder_num
+
+
+def _find(folder_path, prefix):
+    for name in sorted(os.listdir(folder_path)):
+        if name.startswith(prefix) and ".tmp" not in name:
+            return os.path.join(folder_path, name)
+    return None
+
+
+def _recording(folder_path, folder_number):
+    for name in sorted(os.listdir(folder_path)):
+        stem, extension = os.path.splitext(name)
+        if stem == str(folder_number) and extension:
+            return os.path.join(folder_path, name)
+    return None
+
+
+def clean_audio(input_path, output_path, apply_noise_reduction=True):
+    """Write ``output_path`` from ``input_path``, with stationary noise reduction if asked"""
+    import librosa
+    import noisereduce as nr
+    import soundfile as sf
+
+    # Load the audio file
+    audio_data, sample_rate = librosa.load(input_path, sr=None)
+
+    if apply_noise_reduction:
+        audio_data = nr.reduce_noise(y=audio_data, sr=sample_rate, stationary=True, prop_decrease=1.0)
+
+    tmp_path = _tmp_path(output_path)
+    sf.write(tmp_path, audio_data, sample_rate)
+    os.replace(tmp_path, output_path)
+    if apply_noise_reduction:
+        return "Noise reduction completed!"
+    return "File copied without noise reduction."
+
+
+def clean_folder(folder_number, root, apply_noise_reduction=True):
+    """Clean ``N.<ext>`` of a folder into ``N_cleaned.<ext>`` (WAV if soundfile cannot write the format)"""
+    import soundfile as sf
+
+    folder_path = os.path.join(root, str(folder_number))
+    input_path = _recording(folder_path, folder_number)
+    if input_path is None:
+        raise FolderError(f"No recording found in folder {folder_number}")
+    extension = os.path.splitext(input_path)[1]
+    if extension.lstrip(".").upper() not in sf.available_formats():
+        extension = ".wav"
+    output_path = os.path.join(folder_path, f"{folder_number}_cleaned{extension}")
+    return clean_audio(input_path, output_path, apply_noise_reduction)
+
+
+def transcribe_folder(folder_number, root, model_size="base", backend=None):
+    """Transcribe the folder's cleaned audio into ``N_transcription.txt``; returns the text"""
+    if backend is None:
+        backend = _worker.get("whisper") or get_backends()[0]
+    folder_path = os.path.join(root, str(folder_number))
+    audio_path = _find(folder_path, f"{folder_number}_cleaned")
+    if audio_path is None:
+        raise FolderError(f"No cleaned audio file found in folder {folder_number}")
+
+    result = backend.transcribe(audio_path, model_size, fp16=False, language='en', verbose=False,
+                                temperature=0, beam_size=1)
+    _write_text(os.path.join(folder_path, f"{folder_number}_transcription.txt"), result["text"])
+    return result["text"]
+
+
+def clone_voice(folder_number, root, gen_text, backend=None, timeout=600, env=None):
+    """Generate ``gen_text`` in the folder's voice into ``N_cloned_voice.wav``; returns its path"""
+    if backend is None:
+        backend = _worker.get("f5") or get_backends()[1]
+    folder_path = os.path.join(root, str(folder_number))
+    ref_audio_path = _find(folder_path, f"{folder_number}_cleaned")
+    if ref_audio_path is None:
+        raise FolderError(f"No cleaned audio file found in folder {folder_number}")
+    transcription_path = os.path.join(folder_path, f"{folder_number}_transcription.txt")
+    if not os.path.exists(transcription_path):
+        raise FolderError(f"No transcription file found in folder {folder_number}")
+    with open(transcription_path, "r", encoding="utf-8") as f:
+        ref_text = f.read().strip()
+    if not ref_text:
+        raise FolderError(f"Transcription file is empty in folder {folder_number}")
+
+    output_path = os.path.join(folder_path, f"{folder_number}_cloned_voice.wav")
+    tmp_path = _tmp_path(output_path)
+    process = backend.clone(ref_audio_path, ref_text, gen_text, tmp_path, timeout=timeout,
+                            env=env if env is not None else _worker.get("env"))
+    if process.returncode != 0 or not os.path.exists(tmp_path):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise FolderError(f"Voice cloning failed for folder {folder_number}: {process.stderr}")
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _init_worker(backend_kind, stages, model_size, threads):
+    # Each worker gets its share of the cores. numpy was imported with this
+    # module, so its BLAS pool already exists and is resized in place; the
+    # variables size the pools of the processes the worker starts (F5-TTS).
+    os.environ.update({var: str(threads) for var in THREAD_ENV_VARS})
+    set_blas_threads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    whisper_backend, f5_backend = get_backends(backend_kind)
+    _worker.update(whisper=whisper_backend, f5=f5_backend, env=dict(os.environ))
+    if "transcribe" in stages and isinstance(whisper_backend, WhisperBackend):
+        # Load the model once per worker, not once per folder
+        from voicecraft.models import get_whisper_model
+        get_whisper_model(model_size)
+
+
+def _process_folder(folder_number, root, stages, apply_noise_reduction, model_size, gen_text):
+    result = {"folder": folder_number}
+    try:
+        if "clean" in stages:
+            result["clean"] = clean_folder(folder_number, root, apply_noise_reduction)
+        if "transcribe" in stages:
+            result["transcribe"] = transcribe_folder(folder_number, root, model_size)
+        if "clone" in stages:
+            result["clone"] = clone_voice(folder_number, root, gen_text)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def process_folders(root, stages=STAGES, folders=None, workers=2, apply_noise_reduction=True,
+                    model_size="base", gen_text=None, backend_kind=None, on_result=None):
+    """
+    Run ``stages`` over many numbered folders with at most ``workers`` processes.
+
+    Stages run in order within a folder; folders run concurrently. A folder
+    that fails is reported and does not stop the others. Returns one result
+    dict per folder (stage outputs, or ``error``), in folder order.
+    ``on_result(result)`` is called as each folder finishes.
+    """
+    stages = tuple(stages)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    if "clone" in stages and not gen_text:
+        raise ValueError("gen_text is required for the clone stage")
+    folders = [str(f) for f in (folders if folders is not None else get_folder_list(root))]
+    workers = max(1, min(workers, len(folders) or 1))
+    threads = max(1, available_cores() // workers)
+
+    import multiprocessing
+    results = {}
+    # spawn: forking a process that already holds torch/OpenMP threads can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(backend_kind, stages, model_size, threads)) as pool:
+        futures = [
+            pool.submit(_process_folder, folder, root, stages, apply_noise_reduction, model_size, gen_text)
+            for folder in folders
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["folder"]] = result
+            if on_result is not None:
+                on_result(result)
+    return [results[folder] for folder in folders]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process numbered recording folders in parallel")
+    parser.add_argument("root", help="directory holding the numbered folders")
+    parser.add_argument("--stages", default="clean,transcribe", help="comma separated: clean,transcribe,clone")
+    parser.add_argument("--folders", default="", help="comma separated folder numbers (default: all)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--no-noise-reduction", action="store_true")
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--gen-text", default=None, help="text to generate for the clone stage")
+    parser.add_argument("--backend", choices=["real", "stub"], default=None)
+    args = parser.parse_args()
+
+    def report(result):
+        status = f"error: {result['error']}" if "error" in result else "done"
+        print(f"folder {result['folder']}: {status}", flush=True)
+
+    results = process_folders(
+        args.root,
+        stages=[s.strip() for s in args.stages.split(",") if s.strip()],
+        folders=[f.strip() for f in args.folders.split(",") if f.strip()] or None,
+        workers=args.workers,
+        apply_noise_reduction=not args.no_noise_reduction,
+        model_size=args.model_size,
+        gen_text=args.gen_text,
+        backend_kind=args.backend,
+        on_result=report,
+    )
+    failed = sum("error" in r for r in results)
+    print(f"{len(results) - failed} folders done, {failed} failed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+_current = threading.local()
+
+
+def current_job():
+    """The Job whose function is running on this thread, or None"""
+    return getattr(_current, "job", None)
+
+
+class Job:
+    """A long-running pipeline stage submitted through the API"""
+
+    def __init__(self, kind, project_id):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.project_id = project_id
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Set by cancel(); stages that can stop early watch it
+        self.cancel_event = threading.Event()
+        # Latest progress the running stage reported, e.g. {"done": 1, "total": 3}
+        self.progress = None
+
+    def cancel(self):
+        """Ask the job to stop; it ends as "cancelled" if it has not finished"""
+        self.cancel_event.set()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "project_id": self.project_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps their status for polling"""
+
+    def __init__(self, max_workers=4, keep=1000):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voicecraft-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._keep = keep
+
+    def submit(self, kind, project_id, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)``; its return value becomes the job result"""
+        job = Job(kind, project_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        _current.job = job
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e) or traceback.format_exc(limit=1)
+            job.status = "cancelled" if job.cancel_event.is_set() else "failed"
+        finally:
+            _current.job = None
+            job.finished_at = time.time()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once more than `keep` are tracked
+        if len(self._jobs) <= self._keep:
+            return
+        finished = sorted((j for j in self._jobs.values() if j.finished_at), key=lambda j: j.finished_at)
+        for job in finished[:len(self._jobs) - self._keep]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
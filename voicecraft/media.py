@@ -0,0 +1,95 @@
+"""
+Audio delivery for players.
+
+Players get the compressed preview of an artifact, either as a versioned URL
+on the HTTP API (when VOICECRAFT_MEDIA_URL is set; the browser streams it
+with range requests and caches it) or as bytes from a process-wide LRU, so a
+rerun of the app does not read the artifact from disk again.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from voicecraft.config import MEDIA_URL
+from voicecraft.storage import mime_type, preview_file
+
+# Total size of the encoded bytes kept in memory
+DEFAULT_CACHE_MB = 256
+
+
+def version(path):
+    """Changes whenever the file at ``path`` is rewritten (used as ETag and cache buster)"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+class MediaCache:
+    """
+    LRU of file contents keyed by path and version, bounded by total bytes.
+
+    Files larger than the whole budget are read but not kept.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        key = (os.path.abspath(path), version(path))
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return data
+            self._misses += 1
+
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) > self.max_bytes:
+            return data
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": self._hits, "misses": self._misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache():
+    """Process-wide media cache, sized by VOICECRAFT_MEDIA_CACHE_MB"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_mb = float(os.environ.get("VOICECRAFT_MEDIA_CACHE_MB", DEFAULT_CACHE_MB))
+            _cache = MediaCache(int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def player_source(project, key):
+    """
+    ``(source, mime_type)`` for playing the artifact ``key`` of ``project``.
+
+    ``source`` is a URL on the HTTP API when MEDIA_URL is configured,
+    otherwise the preview's bytes.
+    """
+    path = preview_file(project[key])
+    if MEDIA_URL:
+        return f"{MEDIA_URL}/projects/{project['id']}/artifacts/{key}?preview=1&v={version(path)}", mime_type(path)
+    return get_media_cache().get(path), mime_type(path)
@@ -0,0 +1,295 @@
+"""
+Models held in memory by this process, and what they cost.
+
+Whisper models are loaded once and shared by every session. The manager
+records each one's resident size (its parameters and buffers) and unloads
+idle ones when memory is needed: when the admission gate would otherwise
+turn a job away, before a denoise of a long file, or to stay within
+``VOICECRAFT_MODEL_BUDGET_MB``. An unloaded model is reloaded from Whisper's
+download cache the next time a job asks for it.
+
+F5-TTS runs as a child process per clone, so it is never resident here;
+the gate reserves its working set while a clone runs.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Approximate resident memory (MB) of each model on CPU in fp32, used to
+# decide whether a job can be admitted without pushing the host into OOM.
+MODEL_MEMORY_MB = {
+    "whisper:tiny": 400,
+    "whisper:base": 600,
+    "whisper:small": 1400,
+    "whisper:medium": 3500,
+    "whisper:large": 6500,
+    "f5tts": 2500,
+}
+
+# Whisper sizes, smallest (fastest) first
+WHISPER_SIZES = ("tiny", "base", "small", "medium", "large")
+
+
+def _load_whisper(model_size):
+    import whisper
+    return whisper.load_model(model_size)
+
+
+# Loader of each model family that can be held in memory
+LOADERS = {
+    "whisper": _load_whisper,
+}
+
+
+def _resident_mb(model, default_mb):
+    # Parameters and buffers are what a loaded model keeps in memory
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except AttributeError:
+        return default_mb
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors) / (1024 ** 2)
+
+
+def _release_memory():
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class ResidentModel:
+    """A loaded model and how it is being used"""
+
+    def __init__(self, key, model, size_mb, load_seconds):
+        self.key = key
+        self.model = model
+        self.size_mb = size_mb
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+        self.users = 0
+        self.uses = 0
+
+
+class ModelManager:
+    """
+    Loads models on demand and unloads idle ones by priority.
+
+    A model is idle while no job is using it. Idle models are unloaded in
+    order: those no queued job is waiting for first, then unpinned before
+    pinned (preloaded), then least recently used first. Models in use are
+    never unloaded. ``budget_mb`` optionally caps the total resident size.
+    """
+
+    def __init__(self, budget_mb=None, loaders=None):
+        self.budget_mb = budget_mb
+        self.loaders = dict(LOADERS)
+        self.loaders.update(loaders or {})
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._models = {}
+        # Preloaded models, which keep their priority across unloads
+        self._pinned = set()
+        # key -> (times unloaded, monotonic time of the last unload)
+        self._unloaded = {}
+        self._reloads = {}
+
+    def _load(self, key):
+        family, _, name = key.partition(":")
+        loader = self.loaders.get(family)
+        if loader is None:
+            raise ValueError(f"No loader for model {key!r}")
+        estimate_mb = MODEL_MEMORY_MB.get(key, 1000)
+        if self.budget_mb is not None:
+            over_mb = self.resident_mb() + estimate_mb - self.budget_mb
+            if over_mb > 0:
+                self.free(over_mb, protect={key})
+        started = time.monotonic()
+        model = loader(name)
+        return ResidentModel(key, model, _resident_mb(model, estimate_mb), time.monotonic() - started)
+
+    def acquire(self, key):
+        """
+        The model for ``key``, loaded if needed and marked in use until ``release``.
+
+        Concurrent callers asking for the same model wait for the first load
+        instead of each reading the checkpoint into memory.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                resident = self._models.get(key)
+                if resident is not None:
+                    resident.users += 1
+                    resident.uses += 1
+                    resident.last_used = time.monotonic()
+                    return resident.model
+            resident = self._load(key)
+            with self._lock:
+                resident.users = resident.uses = 1
+                self._models[key] = resident
+                if key in self._unloaded:
+                    self._reloads[key] = self._reloads.get(key, 0) + 1
+                return resident.model
+
+    def release(self, key):
+        with self._lock:
+            resident = self._models.get(key)
+            if resident is not None:
+                resident.users -= 1
+                resident.last_used = time.monotonic()
+
+    @contextmanager
+    def use(self, key):
+        """Hold the model in memory for the duration of the block"""
+        model = self.acquire(key)
+        try:
+            yield model
+        finally:
+            self.release(key)
+
+    def get(self, key, pin=False):
+        """Load the model if needed without holding it; ``pin`` makes it the last to be unloaded"""
+        if pin:
+            with self._lock:
+                self._pinned.add(key)
+        model = self.acquire(key)
+        self.release(key)
+        return model
+
+    def loaded(self, key):
+        with self._lock:
+            return key in self._models
+
+    def loaded_keys(self):
+        with self._lock:
+            return sorted(self._models)
+
+    def resident_mb(self):
+        with self._lock:
+            return sum(resident.size_mb for resident in self._models.values())
+
+    def _unload_order(self, protect, last):
+        idle = [resident for resident in self._models.values()
+                if resident.users == 0 and resident.key not in protect]
+        return sorted(idle, key=lambda resident: (
+            resident.key in last, resident.key in self._pinned, resident.last_used
+        ))
+
+    def unloadable_mb(self, protect=()):
+        """Memory that unloading every idle model outside ``protect`` would free"""
+        with self._lock:
+            return sum(resident.size_mb for resident in self._unload_order(set(protect), set()))
+
+    def free(self, needed_mb, protect=(), last=()):
+        """
+        Unload idle models until ``needed_mb`` is freed; returns the MB freed.
+
+        Models in ``protect`` are kept, and those in ``last`` (wanted by
+        queued jobs) are only unloaded when nothing else is left.
+        """
+        freed_mb = 0.0
+        with self._lock:
+            for resident in self._unload_order(set(protect), set(last)):
+                if freed_mb >= needed_mb:
+                    break
+                self._drop(resident)
+                freed_mb += resident.size_mb
+        if freed_mb:
+            _release_memory()
+        return freed_mb
+
+    def _drop(self, resident):
+        del self._models[resident.key]
+        count, _ = self._unloaded.get(resident.key, (0, None))
+        self._unloaded[resident.key] = (count + 1, time.monotonic())
+
+    def unload(self, key):
+        """Unload one model if it is idle; returns whether it was"""
+        with self._lock:
+            resident = self._models.get(key)
+            if resident is None or resident.users:
+                return False
+            self._drop(resident)
+        _release_memory()
+        return True
+
+    def stats(self):
+        """Loaded and unloaded models with their sizes and use, for display"""
+        now = time.monotonic()
+        with self._lock:
+            loaded = {
+                key: {
+                    "size_mb": resident.size_mb,
+                    "in_use": resident.users,
+                    "idle_seconds": 0.0 if resident.users else now - resident.last_used,
+                    "uses": resident.uses,
+                    "load_seconds": resident.load_seconds,
+                    "pinned": key in self._pinned,
+                }
+                for key, resident in self._models.items()
+            }
+            unloaded = {
+                key: {"unloads": count, "seconds_ago": now - at, "reloads": self._reloads.get(key, 0)}
+                for key, (count, at) in self._unloaded.items() if key not in self._models
+            }
+            reloads = sum(self._reloads.values())
+        return {
+            "loaded": loaded,
+            "unloaded": unloaded,
+            "resident_mb": sum(model["size_mb"] for model in loaded.values()),
+            "budget_mb": self.budget_mb,
+            "reloads": reloads,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager():
+    """
+    Process-wide model manager shared by every session.
+
+    ``VOICECRAFT_MODEL_BUDGET_MB`` caps the memory of loaded models
+    (default: no cap beyond what the admission gate needs free).
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            budget_mb = float(os.environ.get("VOICECRAFT_MODEL_BUDGET_MB", "0")) or None
+            _manager = ModelManager(budget_mb=budget_mb)
+        return _manager
+
+
+def get_whisper_model(model_size, pin=False):
+    """Load a Whisper model once per process and share it across sessions"""
+    return get_model_manager().get(f"whisper:{model_size}", pin=pin)
+
+
+def whisper_model(model_size):
+    """Context manager holding a Whisper model in memory while a job uses it"""
+    return get_model_manager().use(f"whisper:{model_size}")
+
+
+def loaded_whisper_models():
+    """Sizes of the Whisper models currently held in memory"""
+    return [key.split(":", 1)[1] for key in get_model_manager().loaded_keys() if key.startswith("whisper:")]
+
+
+def estimate_job_memory_mb(model_key, audio_seconds=0.0, backend=None):
+    """
+    Rough peak memory of one inference job: the model plus audio buffers.
+
+    The model is left out when it is already loaded, or when ``backend``
+    loads none (the stubs set ``loads_models = False``).
+    """
+    loaded = (not getattr(backend, "loads_models", True)
+              or model_key.startswith("whisper:") and get_model_manager().loaded(model_key))
+    model_mb = 0 if loaded else MODEL_MEMORY_MB.get(model_key, 1000)
+    # 16 kHz float32 PCM plus features and intermediate buffers, ~10x the raw audio
+    audio_mb = audio_seconds * 16000 * 4 * 10 / (1024 ** 2)
+    return model_mb + audio_mb
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from voicecraft.analysis import frame_energy, noise_floor_db, power_to_db
+from voicecraft.config import DATA_DIR
+from voicecraft.denoise import N_FFT, noise_statistics
+
+# Shared across projects; the leading dot keeps it out of the project list
+PROFILES_DIR_NAME = ".noise_profiles"
+
+# Project-scoped profiles live in <profiles dir>/.projects/<project_id>/<name>,
+# so two projects can each have their own "office". The leading dot cannot
+# start a profile name, so it never collides with a device profile.
+PROJECTS_DIR_NAME = ".projects"
+
+# Frames within this many dB of the noise floor count as silence
+SILENCE_MARGIN_DB = 3.0
+
+# Shortest amount of silence a profile can be captured from (seconds)
+MIN_NOISE_SECONDS = 0.5
+
+_lock = threading.Lock()
+_cache = {}
+
+
+class NoiseProfileError(Exception):
+    """Raised when a noise profile cannot be captured or found"""
+
+
+def profiles_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, PROFILES_DIR_NAME)
+
+
+def _scope_dir(data_dir, project_id=None):
+    if project_id is None:
+        return profiles_dir(data_dir)
+    if not re.fullmatch(r"[\w-]{1,64}", str(project_id)):
+        raise NoiseProfileError(f"Invalid project id {project_id!r}")
+    return os.path.join(profiles_dir(data_dir), PROJECTS_DIR_NAME, str(project_id))
+
+
+def _profile_dir(name, data_dir, project_id=None):
+    if not re.fullmatch(r"[\w .-]{1,64}", name) or name.strip(". ") != name.strip():
+        raise NoiseProfileError(f"Invalid profile name {name!r}")
+    return os.path.join(_scope_dir(data_dir, project_id), name.strip())
+
+
+def _owner(name, data_dir, project_id):
+    """Project id whose profile ``name`` is meant: the project's own one shadows a device profile"""
+    if project_id is not None and list_versions(name, data_dir, project_id):
+        return project_id
+    return None
+
+
+def silent_regions(y, sr, frame_ms=20):
+    """Samples of ``y`` from frames that sit at the noise floor, concatenated"""
+    energy, hop = frame_energy(y, sr, frame_ms)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=np.float32)
+    energy_db = power_to_db(energy)
+    quiet = energy_db <= noise_floor_db(energy_db) + SILENCE_MARGIN_DB
+    frames = np.asarray(y[:len(energy) * hop], dtype=np.float32).reshape(len(energy), hop)
+    return frames[quiet].reshape(-1)
+
+
+def capture(name, y_noise, sr, scope="project", project_id=None, source="clip", data_dir=DATA_DIR):
+    """
+    Store the noise statistics of ``y_noise`` as the next version of profile ``name``.
+
+    ``scope`` is ``"project"`` (tied to ``project_id``) or ``"device"``
+    (shared by every project recorded with the same mic and room).
+    Returns the profile's metadata.
+    """
+    if len(y_noise) < MIN_NOISE_SECONDS * sr:
+        raise NoiseProfileError(
+            f"Need at least {MIN_NOISE_SECONDS}s of noise, got {len(y_noise) / sr:.2f}s"
+        )
+    mean_db, std_db, threshold_db = noise_statistics(y_noise)
+    owner = project_id if scope == "project" else None
+    profile_dir = _profile_dir(name, data_dir, owner)
+
+    with _lock:
+        os.makedirs(profile_dir, exist_ok=True)
+        version = max(list_versions(name, data_dir, owner) or [0]) + 1
+        meta = {
+            "name": name.strip(),
+            "version": version,
+            "scope": scope,
+            "project_id": project_id,
+            "source": source,
+            "sample_rate": int(sr),
+            "n_fft": N_FFT,
+            "noise_seconds": round(len(y_noise) / sr, 2),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        base = os.path.join(profile_dir, f"v{version}")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        # The .npz appears last, so a listed version is always complete
+        np.savez(base + ".tmp.npz", mean_db=mean_db, std_db=std_db, threshold_db=threshold_db)
+        os.replace(base + ".tmp.npz", base + ".npz")
+    return meta
+
+
+def capture_from_silence(name, y, sr, **kwargs):
+    """Capture a profile from the automatically detected silent parts of a recording"""
+    return capture(name, silent_regions(y, sr), sr, source="silence", **kwargs)
+
+
+def list_versions(name, data_dir=DATA_DIR, project_id=None):
+    """Complete versions of a device profile, or of ``project_id``'s own profile"""
+    profile_dir = _profile_dir(name, data_dir, project_id)
+    if not os.path.isdir(profile_dir):
+        return []
+    versions = [int(m.group(1)) for f in os.listdir(profile_dir) if (m := re.fullmatch(r"v(\d+)\.npz", f))]
+    return sorted(versions)
+
+
+def list_profiles(data_dir=DATA_DIR, project_id=None):
+    """
+    Latest metadata of every profile, sorted by name.
+
+    With ``project_id`` only device profiles and that project's profiles
+    are returned; a project profile hides a device profile of the same name.
+    Without it, every project's profiles are listed as well.
+    """
+    profiles = {}
+    owners = [None]
+    projects_root = os.path.join(profiles_dir(data_dir), PROJECTS_DIR_NAME)
+    if project_id is not None:
+        owners.append(project_id)
+    elif os.path.isdir(projects_root):
+        owners.extend(sorted(os.listdir(projects_root)))
+    for owner in owners:
+        root = _scope_dir(data_dir, owner)
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root)):
+            if name.startswith("."):
+                continue
+            versions = list_versions(name, data_dir, owner)
+            if not versions:
+                continue
+            with open(os.path.join(root, name, f"v{versions[-1]}.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            meta["versions"] = versions
+            profiles[(name, owner) if project_id is None else name] = meta
+    return [profiles[key] for key in sorted(profiles)]
+
+
+def load(name, version=None, data_dir=DATA_DIR, project_id=None):
+    """
+    ``(meta, threshold_db)`` of a profile version (latest if ``version`` is None).
+
+    With ``project_id`` that project's own profile of this name is used
+    when it has one, otherwise the device profile.
+    """
+    project_id = _owner(name, data_dir, project_id)
+    versions = list_versions(name, data_dir, project_id)
+    if not versions:
+        raise NoiseProfileError(f"Noise profile {name!r} not found")
+    version = versions[-1] if version is None else int(version)
+    if version not in versions:
+        raise NoiseProfileError(f"Noise profile {name!r} has no version {version}")
+
+    base = os.path.join(_profile_dir(name, data_dir, project_id), f"v{version}")
+    key = (base, os.path.getmtime(base + ".npz"))
+    with _lock:
+        cached = _cache.get(key)
+    if cached is None:
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(base + ".npz") as data:
+            cached = (meta, data["threshold_db"])
+        with _lock:
+            _cache[key] = cached
+    return cached
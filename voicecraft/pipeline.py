@@ -0,0 +1,795 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from voicecraft import blobs, noise_profiles, retention, storage, voices
+from voicecraft.admission import get_gate
+from voicecraft.audio_cache import (F5_SAMPLE_RATE, WHISPER_SAMPLE_RATE, cached_file, mark_used, model_audio,
+                                    model_audio_file)
+from voicecraft.backends import DEFAULT_F5_PRESET, F5_PRESETS, CloneCancelled, WhisperBackend, get_backends
+from voicecraft.checkpoints import TranscriptionCheckpoint, audio_key
+from voicecraft.denoise import resample_threshold, spectral_gate, spectral_gate_torch
+from voicecraft.models import WHISPER_SIZES, estimate_job_memory_mb, get_whisper_model, loaded_whisper_models
+from voicecraft.projects import ARTIFACTS, artifact_path
+from voicecraft.resources import get_governor
+from voicecraft.rtf import get_rtf_table
+from voicecraft.search import get_search_index
+from voicecraft.transcripts import get_index, matches_text, save_segments
+
+CHUNK_SIZE = 1024 * 1024
+
+# Available noise reduction implementations
+DENOISE_BACKENDS = ("noisereduce", "torch")
+
+# Sidecar recording where the trimmed clip sits in the cleaned audio
+TRIM_WINDOW_FILE = "trimmed_audio.json"
+
+# Sidecar recording which upload the original audio is
+ORIGINAL_SOURCE_FILE = "original_audio.json"
+
+# Settings the cleaned audio was made with, so it can be regenerated after eviction
+CLEANED_RECIPE_FILE = "cleaned_audio.json"
+
+# Noise reduction keeps the output next to the input (float64) and works
+# through it in chunks with STFT buffers of about this size
+DENOISE_BYTES_PER_SAMPLE = 12
+DENOISE_CHUNK_MB = 64
+
+# Audio the tiny Whisper model is timed on when a host has no measurements yet
+CALIBRATION_SECONDS = 30
+
+# Audio longer than this is transcribed in windows of this length, each
+# committed to a checkpoint so a restarted job resumes where it stopped
+CHECKPOINT_WINDOW_SECONDS = 300
+
+TRANSCRIPTION_CHECKPOINT_FILE = "transcription.checkpoint.jsonl"
+
+# Content hashes of the audio Whisper decodes, by cleaned audio version and
+# skip_silence, so checking for a resumable checkpoint does not rehash it
+_audio_keys = {}
+_audio_keys_lock = threading.Lock()
+MAX_AUDIO_KEYS = 256
+
+# Speech regions of the last transcription that skipped silence (original-time seconds)
+SPEECH_MAP_FILE = "speech_map.json"
+
+# Clone deadline: this multiple of the estimate plus a margin, never below the minimum
+CLONE_TIMEOUT_FACTOR = 2.0
+CLONE_TIMEOUT_MARGIN = 30
+MIN_CLONE_TIMEOUT = 60
+
+# Speaking rate assumed when there is no reference text to measure it (UTF-8 bytes per second)
+DEFAULT_TEXT_RATE = 15.0
+
+# F5-TTS splits long texts so each batch with the reference fits in this many seconds
+F5_MAX_BATCH_SECONDS = 22.0
+
+# F5-TTS writes WAV here; it is then stored with the artifact codec
+CLONE_OUTPUT_FILE = "cloned_voice.tmp.wav"
+
+
+class CloneError(RuntimeError):
+    """The voice cloning process exited with an error"""
+
+    def __init__(self, message, stdout="", stderr=""):
+        super().__init__(message)
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def _data_dir(project):
+    # Shared stores (noise profiles, ...) live in the data root holding the project
+    return os.path.dirname(os.path.abspath(project["dir"]))
+
+
+def ingest(project, stream, chunk_size=CHUNK_SIZE):
+    """
+    Store an uploaded file-like object as the project's original audio.
+
+    The upload is hashed while it is streamed into the shared blob store
+    and the project gets a link to the blob. Uploading the same content
+    again leaves the project untouched (so every cache built from it stays
+    valid), and the same file in several projects is stored once.
+    """
+    data_dir = _data_dir(project)
+    digest, tmp_path = blobs.receive(stream, data_dir, chunk_size)
+    # Stored and linked under the store's lock, so garbage collection cannot take the blob in between
+    with blobs.locked(data_dir):
+        blob_path = blobs.add(digest, tmp_path, data_dir)
+        if project.get("original_audio") and original_digest(project) == digest:
+            return project["original_audio"]
+        stem = os.path.join(project["dir"], ARTIFACTS["original_audio"])
+        original_path = os.path.splitext(stem)[0] + os.path.splitext(blob_path)[1]
+        blobs.link(blob_path, original_path)
+    storage.remove_audio(stem, keep=original_path)
+    with open(os.path.join(project["dir"], ORIGINAL_SOURCE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"sha256": digest}, f)
+    project["original_audio"] = original_path
+    retention.check_budget(data_dir)
+    return original_path
+
+
+def original_digest(project):
+    """SHA-256 of the upload the project's original audio came from, or None"""
+    source = _read_sidecar(project, ORIGINAL_SOURCE_FILE)
+    return source.get("sha256") if source else None
+
+
+def _read_sidecar(project, filename):
+    path = os.path.join(project["dir"], filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _profile_threshold(project, noise_profile, profile_version, sample_rate):
+    """Profile threshold at ``sample_rate`` and the profile version it came from"""
+    meta, threshold_db = noise_profiles.load(noise_profile, profile_version, data_dir=_data_dir(project),
+                                             project_id=project["id"])
+    return resample_threshold(threshold_db, meta["sample_rate"], sample_rate), meta["version"]
+
+
+def _write_cleaned(project, audio_data, sample_rate, recipe, keep_trim=False):
+    cleaned_path = storage.write_audio(artifact_path(project, "cleaned_audio"), audio_data, sample_rate)
+    with open(os.path.join(project["dir"], CLEANED_RECIPE_FILE), "w", encoding="utf-8") as f:
+        json.dump(recipe, f)
+    project["cleaned_audio"] = cleaned_path
+
+    # A reference clip cut from the previous cleaned audio is now stale
+    # (a regenerated cleaned audio is the same, so its clip stays valid)
+    if not keep_trim:
+        storage.remove_audio(artifact_path(project, "trimmed_audio"))
+        window_path = os.path.join(project["dir"], TRIM_WINDOW_FILE)
+        if os.path.exists(window_path):
+            os.remove(window_path)
+        project["trimmed_audio"] = None
+    retention.check_budget(_data_dir(project))
+    return cleaned_path
+
+
+def denoise(project, apply_noise_reduction=True, noise_profile=None, profile_version=None,
+            backend="noisereduce"):
+    """
+    Write the project's cleaned audio, optionally with noise reduction.
+
+    With ``noise_profile`` the stored profile's threshold is applied directly
+    instead of estimating the noise from this file. ``backend`` is one of
+    DENOISE_BACKENDS; "torch" runs the same spectral gate as batched torch
+    STFTs over the file's chunks.
+    """
+    return _denoise(project, apply_noise_reduction, noise_profile, profile_version, backend)
+
+
+def _denoise(project, apply_noise_reduction, noise_profile, profile_version, backend, keep_trim=False):
+    import librosa
+    import noisereduce as nr
+
+    if backend not in DENOISE_BACKENDS:
+        raise ValueError(f"Unknown denoise backend {backend!r}")
+
+    # Load the audio file
+    audio_data, sample_rate = librosa.load(project["original_audio"], sr=None)
+
+    if apply_noise_reduction:
+        threshold_db = None
+        if noise_profile:
+            threshold_db, profile_version = _profile_threshold(project, noise_profile, profile_version,
+                                                               sample_rate)
+
+        # A long file's buffers can need more than is free while models sit idle
+        get_gate().make_room(len(audio_data) * DENOISE_BYTES_PER_SAMPLE / (1024 ** 2) + DENOISE_CHUNK_MB)
+
+        # Perform noise reduction within this job's thread budget
+        with get_governor().stage("denoise"):
+            if backend == "torch":
+                audio_data = spectral_gate_torch([audio_data], sample_rate, [threshold_db])[0]
+            elif threshold_db is not None:
+                audio_data = spectral_gate(audio_data, sample_rate, threshold_db, prop_decrease=1.0)
+            else:
+                audio_data = nr.reduce_noise(
+                    y=audio_data,
+                    sr=sample_rate,
+                    stationary=True,
+                    prop_decrease=1.0
+                )
+
+    recipe = {
+        "apply_noise_reduction": apply_noise_reduction,
+        "noise_profile": noise_profile,
+        "profile_version": profile_version,
+        "backend": backend,
+    }
+    return _write_cleaned(project, audio_data, sample_rate, recipe, keep_trim)
+
+
+def denoise_many(projects, noise_profile=None, profile_version=None, batch_size=64):
+    """
+    Denoise several projects in shared torch batches.
+
+    Files are grouped by sample rate and every group goes through
+    ``spectral_gate_torch`` together. Returns the cleaned paths in order.
+    """
+    import librosa
+
+    loaded = [librosa.load(project["original_audio"], sr=None) for project in projects]
+    by_rate = {}
+    for index, (_, sample_rate) in enumerate(loaded):
+        by_rate.setdefault(sample_rate, []).append(index)
+
+    cleaned = [None] * len(projects)
+    for sample_rate, indices in by_rate.items():
+        thresholds, versions = [], []
+        for i in indices:
+            threshold_db, version = (_profile_threshold(projects[i], noise_profile, profile_version, sample_rate)
+                                     if noise_profile else (None, None))
+            thresholds.append(threshold_db)
+            versions.append(version)
+        with get_governor().stage("denoise"):
+            outputs = spectral_gate_torch([loaded[i][0] for i in indices], sample_rate, thresholds,
+                                          batch_size=batch_size)
+        for i, version, audio_data in zip(indices, versions, outputs):
+            recipe = {"apply_noise_reduction": True, "noise_profile": noise_profile,
+                      "profile_version": version, "backend": "torch"}
+            cleaned[i] = _write_cleaned(projects[i], audio_data, sample_rate, recipe)
+    return cleaned
+
+
+def capture_noise_profile(project, name, scope="project", noise_audio=None):
+    """
+    Capture a noise profile for later denoising runs.
+
+    From ``noise_audio`` (path or seekable file of a noise-only recording)
+    when given, otherwise from the silent parts of the project's original audio.
+    """
+    import librosa
+
+    if noise_audio is not None:
+        y, sr = librosa.load(noise_audio, sr=None)
+        return noise_profiles.capture(name, y, sr, scope=scope, project_id=project["id"],
+                                      data_dir=_data_dir(project))
+    y, sr = librosa.load(project["original_audio"], sr=None)
+    return noise_profiles.capture_from_silence(name, y, sr, scope=scope, project_id=project["id"],
+                                               data_dir=_data_dir(project))
+
+
+def trim_reference(project, duration, auto_select=True):
+    """
+    Write a ``duration``-second cloning reference clip from the cleaned audio.
+
+    With ``auto_select`` the cleanest, most speech-dense window of the whole
+    file is chosen; otherwise the first ``duration`` seconds are kept.
+    Returns ``(start_seconds, end_seconds)`` of the clip in the cleaned audio.
+    """
+    import librosa
+    from voicecraft.analysis import select_best_window
+
+    y, sr = librosa.load(ensure(project, "cleaned_audio"), sr=None)
+    if auto_select:
+        start, end, _ = select_best_window(y, sr, duration)
+    else:
+        start, end = 0, min(len(y), int(duration * sr))
+
+    trimmed_path = storage.write_audio(artifact_path(project, "trimmed_audio"), y[start:end], sr)
+    with open(os.path.join(project["dir"], TRIM_WINDOW_FILE), "w", encoding="utf-8") as f:
+        json.dump({"start": start / sr, "end": end / sr, "start_sample": int(start), "end_sample": int(end)}, f)
+    project["trimmed_audio"] = trimmed_path
+    retention.check_budget(_data_dir(project))
+    return start / sr, end / sr
+
+
+def trimmed_window(project):
+    """``(start, end)`` seconds of the trimmed clip in the cleaned audio, or None"""
+    window = _read_sidecar(project, TRIM_WINDOW_FILE)
+    if window is None:
+        return None
+    return window["start"], window["end"]
+
+
+def available(project, key):
+    """Whether an artifact exists or can be regenerated by ``ensure``"""
+    if project.get(key) and os.path.exists(project[key]):
+        return True
+    if key == "cleaned_audio":
+        return bool(project.get("original_audio")) and _read_sidecar(project, CLEANED_RECIPE_FILE) is not None
+    if key == "trimmed_audio":
+        return trimmed_window(project) is not None and available(project, "cleaned_audio")
+    return False
+
+
+def ensure(project, key):
+    """
+    Path of an artifact, regenerating it first if it was evicted.
+
+    The cleaned audio is remade from the original with the settings it was
+    made with, and the trimmed clip is cut again from the cleaned audio.
+    Returns None when the artifact does not exist and cannot be remade.
+    """
+    import librosa
+
+    path = artifact_path(project, key)
+    if os.path.exists(path):
+        mark_used(path)
+        project[key] = path
+        return path
+
+    if key == "cleaned_audio" and available(project, key):
+        recipe = _read_sidecar(project, CLEANED_RECIPE_FILE)
+        return _denoise(project, keep_trim=True, **recipe)
+    if key == "trimmed_audio" and available(project, key):
+        window = _read_sidecar(project, TRIM_WINDOW_FILE)
+        y, sr = librosa.load(ensure(project, "cleaned_audio"), sr=None)
+        start = window.get("start_sample", round(window["start"] * sr))
+        end = window.get("end_sample", round(window["end"] * sr))
+        project[key] = storage.write_audio(path, y[start:end], sr)
+        return project[key]
+    return None
+
+
+def speech_audio(project, skip_silence=False):
+    """
+    ``(pcm, regions)``: the 16 kHz cleaned audio Whisper decodes.
+
+    With ``skip_silence`` the non-speech parts are cut out and ``regions``
+    holds the ``(start, end)`` samples of what was kept (see
+    ``analysis.speech_regions``); otherwise it is None.
+    """
+    path = ensure(project, "cleaned_audio")
+    audio = model_audio(path, WHISPER_SAMPLE_RATE)
+    if not skip_silence:
+        return audio, None
+    from voicecraft.analysis import condense, speech_regions
+
+    # Both are cached next to the cleaned audio, once per version of it
+    def write_regions(tmp_path):
+        np.save(tmp_path, speech_regions(audio, WHISPER_SAMPLE_RATE))
+
+    regions = np.load(cached_file(path, "speech-regions", ".npy", write_regions))
+
+    def write_speech(tmp_path):
+        np.save(tmp_path, condense(audio, regions))
+
+    return np.load(cached_file(path, f"speech-{WHISPER_SAMPLE_RATE}", ".npy", write_speech), mmap_mode="r"), regions
+
+
+def _remap_result(result, regions):
+    """Move a result's segment and word times from the condensed audio back to the original"""
+    from voicecraft.analysis import remap_times
+
+    def remap(items):
+        starts = remap_times([item["start"] for item in items], regions, WHISPER_SAMPLE_RATE, side="right")
+        ends = remap_times([item["end"] for item in items], regions, WHISPER_SAMPLE_RATE, side="left")
+        for item, start, end in zip(items, starts, ends):
+            item["start"], item["end"] = float(start), float(max(start, end))
+
+    segments = result.get("segments", [])
+    remap(segments)
+    for segment in segments:
+        if segment.get("words"):
+            remap(segment["words"])
+
+
+def _save_speech_map(project, regions, total_samples):
+    path = os.path.join(project["dir"], SPEECH_MAP_FILE)
+    if regions is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    speech = int((regions[:, 1] - regions[:, 0]).sum())
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "regions": [[round(start / WHISPER_SAMPLE_RATE, 3), round(end / WHISPER_SAMPLE_RATE, 3)]
+                        for start, end in regions.tolist()],
+            "speech_seconds": speech / WHISPER_SAMPLE_RATE,
+            "total_seconds": total_samples / WHISPER_SAMPLE_RATE,
+        }, f)
+
+
+def _audio_key(project, audio, skip_silence):
+    stat = os.stat(artifact_path(project, "cleaned_audio"))
+    version = (project["dir"], stat.st_mtime_ns, stat.st_size, skip_silence)
+    with _audio_keys_lock:
+        key = _audio_keys.get(version)
+    if key is None:
+        key = audio_key(audio)
+        with _audio_keys_lock:
+            if len(_audio_keys) >= MAX_AUDIO_KEYS:
+                _audio_keys.clear()
+            _audio_keys[version] = key
+    return key
+
+
+def _transcription_checkpoint(project, audio, model_size, word_timestamps, skip_silence):
+    job = {"audio": _audio_key(project, audio, skip_silence), "model_size": model_size,
+           "word_timestamps": word_timestamps}
+    return TranscriptionCheckpoint(os.path.join(project["dir"], TRANSCRIPTION_CHECKPOINT_FILE), job)
+
+
+def resumable_transcription(project, model_size="base", word_timestamps=False, skip_silence=False):
+    """
+    Seconds of the cleaned audio an interrupted transcription already committed (0 if none).
+
+    Cheap enough for every rerun: it never regenerates evicted audio, and
+    the audio's hash is computed once per version.
+    """
+    if not os.path.exists(os.path.join(project["dir"], TRANSCRIPTION_CHECKPOINT_FILE)) \
+            or not os.path.exists(artifact_path(project, "cleaned_audio")):
+        return 0.0
+    audio, regions = speech_audio(project, skip_silence)
+    seconds = _transcription_checkpoint(project, audio, model_size, word_timestamps,
+                                        skip_silence).offset / WHISPER_SAMPLE_RATE
+    if regions is not None and seconds:
+        from voicecraft.analysis import remap_times
+        seconds = float(remap_times([seconds], regions, WHISPER_SAMPLE_RATE, side="left")[0])
+    return seconds
+
+
+def _transcribe_windows(audio, model_size, backend, checkpoint, options, on_progress=None):
+    """
+    Whisper result for ``audio``, decoded from ``checkpoint.offset`` on in windows.
+
+    The last segment of a window may be cut off, so it is decoded again at
+    the start of the next window; every other segment is committed with
+    the text before it as the next window's prompt.
+    """
+    window = CHECKPOINT_WINDOW_SECONDS * WHISPER_SAMPLE_RATE
+    while checkpoint.offset < len(audio):
+        start = checkpoint.offset
+        end = min(len(audio), start + window)
+        prompt = checkpoint.prompt()
+        result = backend.transcribe(audio[start:end], model_size, initial_prompt=prompt or None, **options)
+        segments = [s for s in result.get("segments", []) if s["text"].strip()]
+        if end < len(audio) and len(segments) > 1:
+            cut = start + int(round(segments[-2]["end"] * WHISPER_SAMPLE_RATE))
+            # Zero-length leading segments would leave the offset where it was and loop
+            # forever; the whole window is committed then
+            if start < cut < end:
+                segments, end = segments[:-1], cut
+        shift = start / WHISPER_SAMPLE_RATE
+        checkpoint.commit(end, [
+            {
+                "start": shift + s["start"], "end": shift + s["end"], "text": s["text"],
+                **({"words": [dict(w, start=shift + w["start"], end=shift + w["end"]) for w in s["words"]]}
+                   if s.get("words") else {}),
+            }
+            for s in segments
+        ])
+        if on_progress is not None:
+            on_progress(end / WHISPER_SAMPLE_RATE, len(audio) / WHISPER_SAMPLE_RATE)
+    segments = [dict(segment, id=i) for i, segment in enumerate(checkpoint.segments)]
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": options["language"]}
+
+
+def transcribe(project, model_size="base", session_id="default", on_wait=None, on_start=None, backend=None,
+               word_timestamps=False, on_progress=None, skip_silence=False):
+    """
+    Transcribe the cleaned audio and return the Whisper result.
+
+    Saves the text to transcription.txt and the segment (and, with
+    ``word_timestamps``, word) timings to transcription.json so text for any
+    part of the audio can be looked up later without another ASR pass.
+
+    Audio longer than CHECKPOINT_WINDOW_SECONDS is decoded window by window
+    into a checkpoint; after a crash or restart the same call resumes from
+    the last committed window. ``on_progress(done_seconds, total_seconds)``
+    is called after each window.
+
+    With ``skip_silence`` only the speech regions are decoded, joined end to
+    end, and the result's times are mapped back to the original audio. The
+    regions are saved to speech_map.json, and the result gains
+    ``speech_seconds`` and ``skipped_seconds``.
+
+    ``on_wait(position, eta)`` is called while queued for a model slot and
+    ``on_start()`` once the job starts running.
+    """
+    if backend is None:
+        backend = get_backends()[0]
+
+    # 16 kHz mono PCM, decoded once and shared by every later transcription
+    audio, regions = speech_audio(project, skip_silence)
+    total_samples = len(audio) if regions is None else len(model_audio(project["cleaned_audio"], WHISPER_SAMPLE_RATE))
+
+    # Wait for a Whisper slot shared with all other sessions
+    model_key = f"whisper:{model_size}"
+    working_set_mb = estimate_job_memory_mb(model_key, len(audio) / WHISPER_SAMPLE_RATE, backend)
+    with get_gate().slot(model_key, session_id, working_set_mb=working_set_mb, on_wait=on_wait), \
+            get_governor().stage("transcribe"):
+        if on_start is not None:
+            on_start()
+        rtf_table = get_rtf_table(_data_dir(project))
+        if isinstance(backend, WhisperBackend) and model_size not in loaded_whisper_models():
+            # Timed on its own, so later estimates add it only when the model is not loaded
+            started = time.monotonic()
+            get_whisper_model(model_size)
+            rtf_table.record(f"{model_key}:load", 1, time.monotonic() - started)
+        options = dict(fp16=False, language='en', verbose=False, temperature=0, word_timestamps=word_timestamps)
+        started = time.monotonic()
+        if len(audio) == 0:
+            # Nothing but silence
+            checkpoint = None
+            result = {"text": "", "segments": [], "language": options["language"]}
+            transcribed = 0
+        elif len(audio) > CHECKPOINT_WINDOW_SECONDS * WHISPER_SAMPLE_RATE:
+            checkpoint = _transcription_checkpoint(project, audio, model_size, word_timestamps, skip_silence)
+            resumed_at = checkpoint.offset
+            result = _transcribe_windows(audio, model_size, backend, checkpoint, options, on_progress)
+            # Only the audio decoded in this run counts towards the measured speed
+            transcribed = (len(audio) - resumed_at) / WHISPER_SAMPLE_RATE
+        else:
+            checkpoint = None
+            result = backend.transcribe(audio, model_size, **options)
+            transcribed = len(audio) / WHISPER_SAMPLE_RATE
+        rtf_table.record(model_key, transcribed, time.monotonic() - started)
+
+    if regions is not None:
+        _remap_result(result, regions)
+    result["speech_seconds"] = len(audio) / WHISPER_SAMPLE_RATE
+    result["skipped_seconds"] = (total_samples - len(audio)) / WHISPER_SAMPLE_RATE
+    _save_speech_map(project, regions, total_samples)
+
+    # Save the transcription
+    transcription_path = artifact_path(project, "transcription")
+    with open(transcription_path, "w", encoding="utf-8") as f:
+        f.write(result["text"])
+    project["transcription"] = transcription_path
+
+    segments_path = artifact_path(project, "segments")
+    save_segments(segments_path, result)
+    project["segments"] = segments_path
+    if checkpoint is not None:
+        checkpoint.remove()
+    get_search_index(_data_dir(project)).index_project(project)
+    retention.check_budget(_data_dir(project))
+    return result
+
+
+def save_transcription(project, text):
+    """Replace the transcript with an edited ``text`` and reindex it for search"""
+    transcription_path = artifact_path(project, "transcription")
+    with open(transcription_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    project["transcription"] = transcription_path
+    get_search_index(_data_dir(project)).index_project(project)
+
+
+def estimate_transcription(project, model_size, audio_seconds=None, skip_silence=False):
+    """Seconds a transcription with ``model_size`` should take on this host, loading the model included"""
+    if audio_seconds is None:
+        audio_seconds = len(speech_audio(project, skip_silence)[0]) / WHISPER_SAMPLE_RATE
+    rtf_table = get_rtf_table(_data_dir(project))
+    model_key = f"whisper:{model_size}"
+    seconds = rtf_table.estimate(model_key, audio_seconds)
+    if model_size not in loaded_whisper_models():
+        seconds += rtf_table.estimate(f"{model_key}:load", 1)
+    return seconds
+
+
+def calibrate_whisper(project, session_id="default", backend=None, seconds=CALIBRATION_SECONDS):
+    """
+    Time the tiny model on the first ``seconds`` of the project's cleaned audio.
+
+    Gives a host with no measurements yet a real speed to scale every other
+    model's estimate by. Runs at most once per host in practice, since
+    every later transcription keeps the table up to date.
+    """
+    if backend is None:
+        backend = get_backends()[0]
+    audio = model_audio(ensure(project, "cleaned_audio"), WHISPER_SAMPLE_RATE)[:int(seconds * WHISPER_SAMPLE_RATE)]
+    model_key = "whisper:tiny"
+    rtf_table = get_rtf_table(_data_dir(project))
+    with get_gate().slot(model_key, session_id, working_set_mb=estimate_job_memory_mb(model_key, seconds, backend)), \
+            get_governor().stage("transcribe"):
+        if isinstance(backend, WhisperBackend) and "tiny" not in loaded_whisper_models():
+            started = time.monotonic()
+            get_whisper_model("tiny")
+            rtf_table.record(f"{model_key}:load", 1, time.monotonic() - started)
+        started = time.monotonic()
+        backend.transcribe(audio, "tiny", fp16=False, language='en', verbose=False, temperature=0)
+        rtf_table.record(model_key, len(audio) / WHISPER_SAMPLE_RATE, time.monotonic() - started)
+
+
+def choose_whisper_model(project, budget_seconds, session_id="default", backend=None, skip_silence=False):
+    """
+    Largest Whisper size expected to transcribe the project within ``budget_seconds``.
+
+    Returns ``(model_size, estimates)`` with the estimated seconds of every
+    size that would be admitted now, counting memory idle models would give
+    up. Falls back to the
+    fastest size when none fits. Calibrates first when no Whisper run was
+    ever measured on this host.
+    """
+    if backend is None:
+        backend = get_backends()[0]
+    rtf_table = get_rtf_table(_data_dir(project))
+    if not any(rtf_table.runs(f"whisper:{size}") for size in WHISPER_SIZES):
+        calibrate_whisper(project, session_id, backend)
+    audio_seconds = len(speech_audio(project, skip_silence)[0]) / WHISPER_SAMPLE_RATE
+    sizes = [
+        size for size in WHISPER_SIZES
+        if size == WHISPER_SIZES[0]
+        or get_gate().can_admit(estimate_job_memory_mb(f"whisper:{size}", audio_seconds, backend), f"whisper:{size}")
+    ]
+    estimates = {size: estimate_transcription(project, size, audio_seconds) for size in sizes}
+    fitting = [size for size in sizes if estimates[size] <= budget_seconds]
+    return (fitting[-1] if fitting else sizes[0]), estimates
+
+
+def _timed_segments(project):
+    """
+    Path of the stored segment timings, or None when there are none.
+
+    Whisper's segments stop describing the transcript once it is edited by
+    hand, so an edited transcript counts as having no timings.
+    """
+    segments_path = artifact_path(project, "segments")
+    if not os.path.exists(segments_path):
+        return None
+    with open(segments_path, "r", encoding="utf-8") as f:
+        segments = json.load(f).get("segments", [])
+    with open(project["transcription"], "r", encoding="utf-8") as f:
+        text = f.read()
+    return segments_path if matches_text(segments, text) else None
+
+
+def reference(project):
+    """
+    Reference clip and reference text to clone from.
+
+    Prefers the trimmed clip when one exists; its text is looked up from the
+    stored segment timings. Without timings (transcripts from before they
+    were stored) the text is left empty so F5-TTS transcribes the clip itself.
+    A transcript edited since it was timed cannot be cut to the clip, so the
+    whole cleaned audio is used with the edited text.
+    """
+    window = trimmed_window(project)
+    if window is not None:
+        segments_path = _timed_segments(project)
+        if segments_path is not None:
+            return ensure(project, "trimmed_audio"), get_index(segments_path).text_between(*window)
+        if not os.path.exists(artifact_path(project, "segments")):
+            return ensure(project, "trimmed_audio"), ""
+    with open(project["transcription"], "r", encoding="utf-8") as f:
+        return ensure(project, "cleaned_audio"), f.read()
+
+
+def save_voice(project, name):
+    """
+    Save the project's cloning reference to the voice library; returns the voice's metadata.
+
+    Uses the same clip and text as ``reference``. A clip longer than
+    ``voices.MAX_REFERENCE_SECONDS`` is narrowed to its best window, whose
+    text is looked up in the stored segment timings.
+    """
+    import librosa
+    from voicecraft.analysis import select_best_window
+
+    ref_audio, ref_text = reference(project)
+    y, sr = librosa.load(ref_audio, sr=None)
+    if len(y) > voices.MAX_REFERENCE_SECONDS * sr:
+        segments_path = _timed_segments(project)
+        if segments_path is None:
+            raise voices.VoiceError(
+                f"The reference is longer than {voices.MAX_REFERENCE_SECONDS:g}s and the transcript has no "
+                "timings that match it; transcribe again so the text of a shorter window can be looked up"
+            )
+        start, end, _ = select_best_window(y, sr, voices.MAX_REFERENCE_SECONDS)
+        window = trimmed_window(project)
+        offset = window[0] if window is not None and ref_audio == project.get("trimmed_audio") else 0.0
+        ref_text = get_index(segments_path).text_between(offset + start / sr, offset + end / sr)
+        y = y[start:end]
+    source = {"project_id": project["id"], "sha256": original_digest(project)}
+    return voices.save(name, y, sr, ref_text, source=source, data_dir=_data_dir(project))
+
+
+def clone_work(ref_seconds, ref_text, gen_text, preset=DEFAULT_F5_PRESET):
+    """
+    Work of one F5-TTS run: seconds of audio the model runs over, times its steps.
+
+    Mirrors how F5-TTS sizes its output (the reference's speaking rate
+    applied to the generated text) and batches long texts (each batch is
+    generated after its own copy of the reference).
+    """
+    import math
+
+    settings = F5_PRESETS[preset]
+    ref_seconds = min(ref_seconds, voices.MAX_REFERENCE_SECONDS)
+    ref_bytes = len(ref_text.encode("utf-8")) or ref_seconds * DEFAULT_TEXT_RATE
+    gen_bytes = len(gen_text.encode("utf-8"))
+    bytes_per_second = ref_bytes / max(ref_seconds, 0.1)
+    gen_seconds = gen_bytes / bytes_per_second / settings["speed"]
+    batch_bytes = bytes_per_second * max(1.0, F5_MAX_BATCH_SECONDS - ref_seconds) * settings["speed"]
+    batches = max(1, math.ceil(gen_bytes / batch_bytes))
+    return (batches * ref_seconds + gen_seconds) * settings["nfe_step"]
+
+
+def estimate_clone(project, ref_text, gen_text, preset=DEFAULT_F5_PRESET, ref_audio=None):
+    """Seconds a clone with ``preset`` should take on this host"""
+    import soundfile as sf
+
+    ref_seconds = sf.info(ref_audio or ensure(project, "cleaned_audio")).duration
+    return get_rtf_table(_data_dir(project)).estimate("f5tts", clone_work(ref_seconds, ref_text, gen_text, preset))
+
+
+def clone_timeout(estimate):
+    """Deadline for a clone expected to take ``estimate`` seconds"""
+    return max(MIN_CLONE_TIMEOUT, CLONE_TIMEOUT_FACTOR * estimate + CLONE_TIMEOUT_MARGIN)
+
+
+def _remove_output(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def clone_output_path(project):
+    """File the cloning process writes to before the result is stored"""
+    return os.path.join(project["dir"], CLONE_OUTPUT_FILE)
+
+
+def clone(project, ref_text, gen_text, session_id="default", on_wait=None, on_start=None, backend=None,
+          ref_audio=None, timeout=None, preset=DEFAULT_F5_PRESET, on_progress=None, cancel=None):
+    """
+    Generate ``gen_text`` in the project's voice and return the finished process.
+
+    ``preset`` is one of F5_PRESETS. Without ``timeout`` the deadline is
+    derived from the run's estimate on this host (``clone_timeout``).
+    While it runs, ``on_progress(done, total, eta_seconds)`` is called
+    about twice a second with F5-TTS's finished text batches (``total`` is
+    None until it starts generating). Raises CloneError if the cloning
+    process fails, subprocess.TimeoutExpired if it runs past the deadline
+    and CloneCancelled once the ``cancel`` event is set; partial output is
+    removed in every case.
+    """
+    import soundfile as sf
+
+    if backend is None:
+        backend = get_backends()[1]
+    # Reference already at F5-TTS's 24 kHz, so it is not resampled on every clone
+    ref_audio = model_audio_file(ref_audio or ensure(project, "cleaned_audio"), F5_SAMPLE_RATE)
+    output_path = clone_output_path(project)
+    rtf_table = get_rtf_table(_data_dir(project))
+    work = clone_work(sf.info(ref_audio).duration, ref_text, gen_text, preset)
+    estimate = rtf_table.estimate("f5tts", work)
+    if timeout is None:
+        timeout = clone_timeout(estimate)
+
+    governor = get_governor()
+    with get_gate().slot("f5tts", session_id, working_set_mb=estimate_job_memory_mb("f5tts", backend=backend),
+                         on_wait=on_wait), governor.stage("clone") as allocation:
+        if on_start is not None:
+            on_start()
+        started = time.monotonic()
+        batches_started = []
+
+        def report(done, total):
+            now = time.monotonic()
+            if total and not batches_started:
+                batches_started.append(now)
+            if done:
+                # The remaining batches take as long as the finished ones did
+                eta = (now - batches_started[0]) / done * (total - done)
+            else:
+                eta = max(0.0, estimate - (now - started))
+            on_progress(done, total, eta)
+
+        try:
+            process = backend.clone(ref_audio, ref_text, gen_text, output_path, timeout=timeout,
+                                    env=governor.subprocess_env(allocation), preset=preset,
+                                    on_progress=report if on_progress is not None else None, cancel=cancel)
+        except BaseException:
+            # A cancelled or timed out run may have written part of the file
+            _remove_output(output_path)
+            raise
+        elapsed = time.monotonic() - started
+
+    if process.returncode != 0 or not os.path.exists(output_path):
+        _remove_output(output_path)
+        raise CloneError(f"Voice cloning failed: {process.stderr}", process.stdout, process.stderr)
+    rtf_table.record("f5tts", work, elapsed)
+    project["cloned_audio"] = storage.store_file(output_path, os.path.join(project["dir"], ARTIFACTS["cloned_audio"]))
+    retention.check_budget(_data_dir(project))
+    return process
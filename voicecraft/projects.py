@@ -0,0 +1,95 @@
+import os
+from datetime import datetime
+
+from voicecraft.config import DATA_DIR
+from voicecraft.storage import stored_audio, target_path
+
+# File name of each artifact inside a project directory
+ARTIFACTS = {
+    "original_audio": "original_audio.wav",
+    "cleaned_audio": "cleaned_audio.wav",
+    "trimmed_audio": "trimmed_audio.wav",
+    "transcription": "transcription.txt",
+    "segments": "transcription.json",
+    "cloned_audio": "cloned_voice.wav",
+}
+
+# Stored with the configured codec (see voicecraft.storage), so the
+# extension on disk can differ from the name above
+AUDIO_ARTIFACTS = ("original_audio", "cleaned_audio", "trimmed_audio", "cloned_audio")
+
+NAME_FILE = "project_name.txt"
+
+
+def artifact_path(project, key):
+    """
+    Path of an artifact in the project directory (whether or not it exists yet).
+
+    For audio this is the stored file if there is one, otherwise the file a
+    new one would be written to.
+    """
+    path = os.path.join(project["dir"], ARTIFACTS[key])
+    if key in AUDIO_ARTIFACTS:
+        return stored_audio(path) or target_path(path)
+    return path
+
+
+def _project_from_dir(project_id, project_dir):
+    name_file = os.path.join(project_dir, NAME_FILE)
+    if os.path.exists(name_file):
+        with open(name_file, "r", encoding="utf-8") as f:
+            project_name = f.read().strip()
+    else:
+        project_name = f"Project {project_id}"
+
+    project = {"id": project_id, "name": project_name, "dir": project_dir}
+    for key, filename in ARTIFACTS.items():
+        path = os.path.join(project_dir, filename)
+        if key in AUDIO_ARTIFACTS:
+            project[key] = stored_audio(path)
+        else:
+            project[key] = path if os.path.exists(path) else None
+    return project
+
+
+def create_project(name, data_dir=DATA_DIR):
+    """Create a new project directory and return its project dict"""
+    base_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    project_id = base_id
+    suffix = 1
+    # Two projects created within the same second get a numeric suffix
+    while True:
+        project_dir = os.path.join(data_dir, project_id)
+        try:
+            os.makedirs(project_dir)
+            break
+        except FileExistsError:
+            suffix += 1
+            project_id = f"{base_id}-{suffix}"
+
+    with open(os.path.join(project_dir, NAME_FILE), "w", encoding="utf-8") as f:
+        f.write(name)
+    return _project_from_dir(project_id, project_dir)
+
+
+def load_project(project_id, data_dir=DATA_DIR):
+    """Project dict for an existing project, or None if it does not exist"""
+    # Project ids are directory names; refuse anything that could escape data_dir
+    if not project_id or os.path.basename(project_id) != project_id or project_id.startswith("."):
+        return None
+    project_dir = os.path.join(data_dir, project_id)
+    if not os.path.isdir(project_dir):
+        return None
+    return _project_from_dir(project_id, project_dir)
+
+
+def list_projects(data_dir=DATA_DIR):
+    """All projects on disk, keyed by project id"""
+    projects = {}
+    if not os.path.isdir(data_dir):
+        return projects
+    for project_id in sorted(os.listdir(data_dir)):
+        project = load_project(project_id, data_dir)
+        if project is not None:
+            projects[project_id] = project
+    return projects
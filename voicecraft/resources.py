@@ -0,0 +1,190 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+# Relative CPU weight of each pipeline stage. Heavier stages get a larger
+# share of the cores when several jobs run at the same time.
+STAGE_WEIGHTS = {
+    "denoise": 1,
+    "transcribe": 2,
+    "clone": 3,
+}
+
+# Environment variables read by OpenMP, MKL, OpenBLAS and friends. These are
+# what a child process (e.g. the F5-TTS CLI) looks at when it starts.
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def available_cores():
+    """Number of CPUs this process is allowed to run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class Allocation:
+    """Threads (and optionally CPUs) granted to one running job"""
+
+    def __init__(self, job_id, stage, threads, cpus=None):
+        self.job_id = job_id
+        self.stage = stage
+        self.threads = threads
+        self.cpus = cpus
+
+    def __repr__(self):
+        return f"Allocation(stage={self.stage!r}, threads={self.threads}, cpus={self.cpus})"
+
+
+class ResourceGovernor:
+    """
+    Hands out intra-op thread counts to concurrent inference jobs.
+
+    Every job enters through ``stage()``. Whenever a job starts or finishes
+    the cores are split again across all running jobs by stage weight, so the
+    shares add up to the available cores (each job gets at least one thread,
+    so more jobs than cores oversubscribe). A child process keeps the thread
+    count it was started with. With ``pin_cpus`` enabled each job is also
+    pinned to the least loaded CPUs; child processes started from inside the
+    stage inherit that affinity.
+    """
+
+    def __init__(self, total_threads=None, pin_cpus=False):
+        self.total_threads = max(1, total_threads or available_cores())
+        self.pin_cpus = pin_cpus and hasattr(os, "sched_setaffinity")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 0
+        if self.pin_cpus:
+            cpus = sorted(os.sched_getaffinity(0))
+            self._cpu_load = {cpu: 0 for cpu in cpus}
+        else:
+            self._cpu_load = {}
+
+    def threads_for(self, stage):
+        """Thread count a new job of ``stage`` would get right now"""
+        with self._lock:
+            return self._share(stage)
+
+    def _share(self, stage):
+        weight = STAGE_WEIGHTS.get(stage, 1)
+        total_weight = weight + sum(STAGE_WEIGHTS.get(job.stage, 1) for job in self._jobs.values())
+        return max(1, (self.total_threads * weight) // total_weight)
+
+    def _pick_cpus(self, threads):
+        # Least loaded CPUs first; ties broken by CPU number for stable pinning
+        ranked = sorted(self._cpu_load, key=lambda cpu: (self._cpu_load[cpu], cpu))
+        cpus = tuple(sorted(ranked[:threads]))
+        for cpu in cpus:
+            self._cpu_load[cpu] += 1
+        return cpus
+
+    def acquire(self, stage):
+        """Register a job and return its Allocation"""
+        with self._lock:
+            threads = self._share(stage)
+            cpus = self._pick_cpus(threads) if self.pin_cpus else None
+            job_id = self._next_id
+            self._next_id += 1
+            allocation = Allocation(job_id, stage, threads, cpus)
+            self._jobs[job_id] = allocation
+            self._rebalance()
+            return allocation
+
+    def release(self, allocation):
+        """Unregister a finished job"""
+        with self._lock:
+            if self._jobs.pop(allocation.job_id, None) is None:
+                return
+            if allocation.cpus:
+                for cpu in allocation.cpus:
+                    self._cpu_load[cpu] -= 1
+            self._rebalance()
+
+    def _rebalance(self):
+        # Shrink or grow the share of every running job to fit the new mix
+        total_weight = sum(STAGE_WEIGHTS.get(job.stage, 1) for job in self._jobs.values())
+        for job in self._jobs.values():
+            job.threads = max(1, (self.total_threads * STAGE_WEIGHTS.get(job.stage, 1)) // total_weight)
+        # torch's intra-op pool and the BLAS pools (numpy, librosa,
+        # noisereduce) are process-wide, so they are sized from the current
+        # allocation: an even split of the cores across the jobs running now.
+        per_job = max(1, self.total_threads // max(1, len(self._jobs)))
+        _set_torch_threads(per_job)
+        set_blas_threads(per_job)
+
+    def active_jobs(self):
+        """Snapshot of running allocations, for display"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def subprocess_env(self, allocation, base=None):
+        """Environment for a child process limited to the job's threads"""
+        env = dict(os.environ if base is None else base)
+        for name in THREAD_ENV_VARS:
+            env[name] = str(allocation.threads)
+        return env
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Run a block of work as one governed job.
+
+        Entering and leaving the block resizes torch's intra-op pool for the
+        jobs then running and, when pinning is enabled, the calling thread is
+        bound to its CPUs.
+        """
+        allocation = self.acquire(stage)
+        previous_cpus = None
+        try:
+            if allocation.cpus:
+                previous_cpus = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, allocation.cpus)
+            yield allocation
+        finally:
+            if previous_cpus is not None:
+                os.sched_setaffinity(0, previous_cpus)
+            self.release(allocation)
+
+
+def _set_torch_threads(threads):
+    # Only touch torch if the app already imported it
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def set_blas_threads(threads):
+    """Resize the BLAS/OpenMP pools numpy and friends already started (needs threadpoolctl)"""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=threads)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """
+    Process-wide governor shared by every session.
+
+    Configured with ``VOICECRAFT_MAX_THREADS`` (defaults to all available
+    cores) and ``VOICECRAFT_PIN_CPUS=1`` to enable CPU affinity pinning.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            total = int(os.environ.get("VOICECRAFT_MAX_THREADS", "0")) or None
+            pin = os.environ.get("VOICECRAFT_PIN_CPUS", "0") == "1"
+            _governor = ResourceGovernor(total_threads=total, pin_cpus=pin)
+        return _governor
@@ -0,0 +1,167 @@
+"""
+Disk budget for the data directory.
+
+Only files that can be made again are ever deleted: cleaned audio that has
+a recipe sidecar, trimmed clips that have a trim window, and everything in
+the projects' ``.cache`` directories (model-ready audio, previews, images).
+Uploads, cloned voices, transcripts and sidecars are never touched.
+Evicted files are regenerated by ``pipeline.ensure`` or the caches the next
+time they are needed. Least recently used files go first, and caches this
+process has memory-mapped are skipped.
+
+Run ``python -m voicecraft.retention [data_dir]`` for a usage report, and
+add ``--enforce`` to evict down to VOICECRAFT_DISK_BUDGET_MB.
+"""
+import argparse
+import os
+import threading
+import time
+
+from voicecraft import audio_cache, blobs, spectrogram
+from voicecraft.audio_cache import CACHE_DIR_NAME
+from voicecraft.config import DATA_DIR
+from voicecraft.projects import ARTIFACTS, list_projects
+from voicecraft.storage import stored_audio
+
+# Sidecars that make an intermediate regenerable (mirrors voicecraft.pipeline)
+REGENERABLE = {
+    "cleaned_audio": "cleaned_audio.json",
+    "trimmed_audio": "trimmed_audio.json",
+}
+
+# Files used more recently than this are never evicted (a job may be reading them)
+MIN_IDLE_SECONDS = 120
+
+# Budget checks after pipeline writes run at most this often
+CHECK_INTERVAL_SECONDS = 30
+
+_lock = threading.Lock()
+_check_lock = threading.Lock()
+_last_check = 0.0
+
+
+def disk_budget_bytes():
+    """Budget from VOICECRAFT_DISK_BUDGET_MB, or None when unlimited"""
+    budget_mb = float(os.environ.get("VOICECRAFT_DISK_BUDGET_MB", 0) or 0)
+    return int(budget_mb * 1024 * 1024) if budget_mb > 0 else None
+
+
+def _walk(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                yield path, os.stat(path)
+            except OSError:
+                continue
+
+
+def _evictable(project_dir):
+    """``(path, stat)`` of every regenerable file in a project"""
+    for key, sidecar in REGENERABLE.items():
+        path = stored_audio(os.path.join(project_dir, ARTIFACTS[key]))
+        if path is not None and os.path.exists(os.path.join(project_dir, sidecar)):
+            yield path, os.stat(path)
+    cache_dir = os.path.join(project_dir, CACHE_DIR_NAME)
+    for path, stat in _walk(cache_dir):
+        if ".tmp." not in os.path.basename(path):
+            yield path, stat
+
+
+def project_usage(project_dir):
+    """
+    Bytes used by a project: ``total``, ``regenerable`` (evictable
+    intermediates and caches) and ``shared`` (uploads also linked from the
+    blob store or other projects, so not freed by deleting this project).
+    """
+    usage = {"total": 0, "regenerable": 0, "shared": 0}
+    for path, stat in _walk(project_dir):
+        usage["total"] += stat.st_size
+        if stat.st_nlink > 1:
+            usage["shared"] += stat.st_size
+    usage["regenerable"] = sum(stat.st_size for _, stat in _evictable(project_dir))
+    return usage
+
+
+def disk_usage(data_dir=DATA_DIR):
+    """Bytes on disk under ``data_dir``, counting hard-linked files once"""
+    seen = set()
+    total = 0
+    for _, stat in _walk(data_dir):
+        if (stat.st_dev, stat.st_ino) not in seen:
+            seen.add((stat.st_dev, stat.st_ino))
+            total += stat.st_size
+    return total
+
+
+def enforce(data_dir=DATA_DIR, budget=None):
+    """
+    Evict least recently used intermediates until ``data_dir`` fits ``budget`` bytes.
+
+    Returns the bytes freed. Stops early when nothing evictable is left.
+    """
+    budget = disk_budget_bytes() if budget is None else budget
+    if budget is None:
+        return 0
+    with _lock:
+        freed = blobs.collect_garbage(data_dir)
+        excess = disk_usage(data_dir) - budget
+        if excess <= 0:
+            return freed
+
+        now = time.time()
+        # Memory-mapped caches are still being read however old their atime
+        in_use = audio_cache.open_files() | spectrogram.open_files()
+        candidates = [
+            (stat.st_atime, path, stat.st_size)
+            for project in list_projects(data_dir).values()
+            for path, stat in _evictable(project["dir"])
+            if now - stat.st_atime >= MIN_IDLE_SECONDS and os.path.abspath(path) not in in_use
+        ]
+        for _, path, size in sorted(candidates):
+            if excess <= 0:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            excess -= size
+            freed += size
+    return freed
+
+
+def check_budget(data_dir=DATA_DIR):
+    """Enforce the configured budget, at most once per CHECK_INTERVAL_SECONDS"""
+    global _last_check
+    if disk_budget_bytes() is None:
+        return 0
+    with _check_lock:
+        if time.monotonic() - _last_check < CHECK_INTERVAL_SECONDS:
+            return 0
+        _last_check = time.monotonic()
+    return enforce(data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk usage per project and budget enforcement")
+    parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    parser.add_argument("--enforce", action="store_true", help="evict intermediates down to the budget")
+    parser.add_argument("--budget-mb", type=float, default=None,
+                        help="budget to enforce (default: VOICECRAFT_DISK_BUDGET_MB)")
+    args = parser.parse_args()
+
+    if args.enforce:
+        budget = int(args.budget_mb * 1024 * 1024) if args.budget_mb else None
+        print(f"Freed {enforce(args.data_dir, budget) / 1e6:.1f} MB")
+
+    for project_id, project in list_projects(args.data_dir).items():
+        usage = project_usage(project["dir"])
+        print(f"{project_id}  {project['name']}: {usage['total'] / 1e6:.1f} MB "
+              f"({usage['regenerable'] / 1e6:.1f} MB regenerable, {usage['shared'] / 1e6:.1f} MB shared)")
+    budget = disk_budget_bytes()
+    print(f"Total on disk: {disk_usage(args.data_dir) / 1e6:.1f} MB"
+          + (f" of {budget / 1e6:.1f} MB budget" if budget else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Measured speed of each model on this host.
+
+Every completed run is recorded as ``(work, elapsed)``: seconds of audio
+for Whisper, seconds of audio times diffusion steps for F5-TTS. Per model
+the table fits ``elapsed = fixed + rate * work`` (a least-squares line over
+exponentially decayed sums, so it follows the host as it changes). Models
+that have not run here yet are estimated from PRIORS, scaled by how much
+faster or slower this host has been than the priors on the models it has
+run. ``rate`` is the model's real-time factor.
+
+Tables are kept per host name under ``<data_dir>/.rtf``, so a data
+directory shared between machines does not mix their speeds.
+"""
+import json
+import os
+import socket
+import threading
+
+from voicecraft.config import DATA_DIR
+
+RTF_DIR_NAME = ".rtf"
+
+# (fixed seconds, seconds per unit of work) on a typical 4-core CPU,
+# used until a model has been measured on this host
+PRIORS = {
+    "whisper:tiny": (1.0, 0.04),
+    "whisper:base": (1.5, 0.08),
+    "whisper:small": (3.0, 0.25),
+    "whisper:medium": (6.0, 0.7),
+    "whisper:large": (10.0, 1.4),
+    # Loading a Whisper model into memory (work is one load)
+    "whisper:tiny:load": (0.0, 1.0),
+    "whisper:base:load": (0.0, 2.0),
+    "whisper:small:load": (0.0, 5.0),
+    "whisper:medium:load": (0.0, 12.0),
+    "whisper:large:load": (0.0, 25.0),
+    # Per second of reference plus generated audio and per NFE step;
+    # the fixed part is the CLI loading the model on every run
+    "f5tts": (20.0, 0.03),
+}
+
+# Weight left to older runs each time a new one is recorded
+DECAY = 0.9
+
+# Runs needed before the fixed cost is fitted rather than taken from the prior
+MIN_RUNS_FOR_FIT = 3
+
+
+class RtfTable:
+    """Per-model run statistics of one host, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def record(self, key, work, elapsed):
+        """Add a completed run of ``key`` that did ``work`` units in ``elapsed`` seconds"""
+        if work <= 0 or elapsed <= 0:
+            return
+        with self._lock:
+            sums = self.entries.get(key) or {"n": 0.0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "sxy": 0.0, "runs": 0}
+            for name in ("n", "sx", "sy", "sxx", "sxy"):
+                sums[name] *= DECAY
+            sums["n"] += 1.0
+            sums["sx"] += work
+            sums["sy"] += elapsed
+            sums["sxx"] += work * work
+            sums["sxy"] += work * elapsed
+            sums["runs"] += 1
+            self.entries[key] = sums
+            self._save()
+
+    def runs(self, key):
+        with self._lock:
+            return self.entries.get(key, {}).get("runs", 0)
+
+    def _measured(self, key, prior_fixed, prior_rate):
+        sums = self.entries[key]
+        n, sx, sy, sxx, sxy = (sums[name] for name in ("n", "sx", "sy", "sxx", "sxy"))
+        spread = n * sxx - sx * sx
+        # Runs of different lengths separate the fixed cost from the rate
+        if sums["runs"] >= MIN_RUNS_FOR_FIT and spread > 0.01 * n * sxx:
+            rate = (n * sxy - sx * sy) / spread
+            fixed = (sy - rate * sx) / n
+            if rate > 0 and fixed >= 0:
+                return fixed, rate
+        # Otherwise keep the prior's share of fixed cost and fit the rate
+        fixed = min(prior_fixed, 0.5 * sy / n)
+        return fixed, (sy - n * fixed) / sx
+
+    def host_factor(self):
+        """How much slower (>1) or faster (<1) than PRIORS this host has been"""
+        with self._lock:
+            ratios = sorted(
+                self._measured(key, *PRIORS[key])[1] / PRIORS[key][1]
+                for key in self.entries if key in PRIORS and not key.endswith(":load")
+            )
+        if not ratios:
+            return 1.0
+        return ratios[len(ratios) // 2]
+
+    def fit(self, key):
+        """``(fixed_seconds, rate)`` of ``key`` on this host"""
+        prior_fixed, prior_rate = PRIORS.get(key, (0.0, 1.0))
+        with self._lock:
+            if key in self.entries:
+                return self._measured(key, prior_fixed, prior_rate)
+        factor = 1.0 if key.endswith(":load") else self.host_factor()
+        return prior_fixed * factor, prior_rate * factor
+
+    def estimate(self, key, work):
+        """Expected seconds for ``key`` to do ``work`` units on this host"""
+        fixed, rate = self.fit(key)
+        return fixed + rate * work
+
+    def summary(self):
+        """``{key: {"fixed", "rate", "runs"}}`` for every known model, for display"""
+        return {
+            key: dict(zip(("fixed", "rate"), self.fit(key)), runs=self.runs(key))
+            for key in sorted(set(PRIORS) | set(self.entries))
+        }
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_rtf_table(data_dir=DATA_DIR):
+    """This host's table in ``data_dir``, shared by every session"""
+    path = os.path.join(data_dir, RTF_DIR_NAME, f"{socket.gethostname()}.json")
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = RtfTable(path)
+        return table
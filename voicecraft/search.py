@@ -0,0 +1,202 @@
+"""
+Full-text search over the transcripts of every project.
+
+One SQLite FTS5 index per data directory, in ``<data_dir>/.search``. Each
+transcript is indexed by segment with its start and end times, so a hit
+can seek the project's audio to where the phrase is spoken. A transcript
+edited by hand no longer matches its segment timings; it is indexed by
+sentence without times instead.
+
+The index is kept current incrementally: pipeline writes reindex their
+project, and ``sync`` (run once per process on first use) catches up with
+changes made elsewhere by comparing each project's file versions.
+
+Run ``python -m voicecraft.search [--data-dir DIR] "some phrase"`` to query
+it from a shell.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from voicecraft.config import DATA_DIR
+from voicecraft.projects import ARTIFACTS, NAME_FILE, list_projects
+from voicecraft.transcripts import matches_text
+
+SEARCH_DIR_NAME = ".search"
+INDEX_FILE = "transcripts.sqlite3"
+
+DEFAULT_LIMIT = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (project_id TEXT PRIMARY KEY, name TEXT, version TEXT);
+CREATE TABLE IF NOT EXISTS segment_rows (
+    id INTEGER PRIMARY KEY, project_id TEXT, start REAL, end REAL, text TEXT
+);
+CREATE INDEX IF NOT EXISTS segment_rows_project ON segment_rows (project_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+    text, content='segment_rows', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "-"
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def project_version(project_dir):
+    """Changes whenever the project's name, transcript or segment timings are rewritten"""
+    return ":".join(_file_version(os.path.join(project_dir, name))
+                    for name in (NAME_FILE, ARTIFACTS["transcription"], ARTIFACTS["segments"]))
+
+
+def transcript_rows(project):
+    """``(start, end, text)`` to index for a project: timed segments, or untimed sentences of an edited text"""
+    path = project.get("transcription")
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    segments_path = os.path.join(project["dir"], ARTIFACTS["segments"])
+    if os.path.exists(segments_path):
+        with open(segments_path, "r", encoding="utf-8") as f:
+            segments = json.load(f).get("segments", [])
+        # Timings are only trusted while the text is still what Whisper wrote
+        if matches_text(segments, text):
+            return [(start, end, segment_text.strip()) for start, end, segment_text in segments
+                    if segment_text.strip()]
+    sentences = re.split(r"(?<=[.!?])\s+|\n+", text)
+    return [(None, None, sentence.strip()) for sentence in sentences if sentence.strip()]
+
+
+def phrase_query(query):
+    """FTS5 query matching ``query`` as a phrase (quotes and operators in it are literal)"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """The transcript index of one data directory"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            # Readers in other processes (app, API) are not blocked by a write
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One connection per call: cheap, and safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _remove(self, db, project_id):
+        rows = db.execute("SELECT id, text FROM segment_rows WHERE project_id = ?", (project_id,)).fetchall()
+        db.executemany("INSERT INTO segments (segments, rowid, text) VALUES ('delete', ?, ?)", rows)
+        db.execute("DELETE FROM segment_rows WHERE project_id = ?", (project_id,))
+        db.execute("DELETE FROM documents WHERE project_id = ?", (project_id,))
+
+    def index_project(self, project):
+        """(Re)index one project's transcript"""
+        rows = transcript_rows(project)
+        version = project_version(project["dir"])
+        with self._lock, self._connect() as db:
+            self._remove(db, project["id"])
+            db.execute("INSERT INTO documents VALUES (?, ?, ?)", (project["id"], project["name"], version))
+            for start, end, text in rows:
+                cursor = db.execute("INSERT INTO segment_rows (project_id, start, end, text) VALUES (?, ?, ?, ?)",
+                                    (project["id"], start, end, text))
+                db.execute("INSERT INTO segments (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+
+    def remove_project(self, project_id):
+        with self._lock, self._connect() as db:
+            self._remove(db, project_id)
+
+    def sync(self, data_dir):
+        """Reindex projects changed since they were indexed and drop deleted ones; returns how many changed"""
+        with self._connect() as db:
+            indexed = dict(db.execute("SELECT project_id, version FROM documents"))
+        projects = list_projects(data_dir)
+        changed = 0
+        for project_id, project in projects.items():
+            if indexed.get(project_id) != project_version(project["dir"]):
+                self.index_project(project)
+                changed += 1
+        for project_id in set(indexed) - set(projects):
+            self.remove_project(project_id)
+            changed += 1
+        return changed
+
+    def search(self, query, limit=DEFAULT_LIMIT, project_id=None):
+        """
+        Segments containing ``query`` as a phrase, best matches first.
+
+        Each hit is ``{"project_id", "project_name", "start", "end",
+        "snippet"}``; ``start`` and ``end`` are None for hand-edited
+        transcripts. The phrase has to fall within one segment.
+        """
+        if not query.strip():
+            return []
+        sql = (
+            "SELECT r.project_id, d.name, r.start, r.end, snippet(segments, 0, '[', ']', '...', 16) "
+            "FROM segments JOIN segment_rows r ON r.id = segments.rowid "
+            "JOIN documents d ON d.project_id = r.project_id "
+            "WHERE segments MATCH ?"
+        )
+        params = [phrase_query(query.strip())]
+        if project_id is not None:
+            sql += " AND r.project_id = ?"
+            params.append(project_id)
+        sql += " ORDER BY bm25(segments), r.project_id, r.start LIMIT ?"
+        params.append(int(limit))
+        with self._connect() as db:
+            rows = db.execute(sql, params).fetchall()
+        return [
+            {"project_id": pid, "project_name": name, "start": start, "end": end, "snippet": snippet}
+            for pid, name, start, end, snippet in rows
+        ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(data_dir=DATA_DIR):
+    """The index of ``data_dir``, brought up to date the first time this process uses it"""
+    path = os.path.join(data_dir, SEARCH_DIR_NAME, INDEX_FILE)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = SearchIndex(path)
+            index.sync(data_dir)
+            _indexes[path] = index
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the transcripts of every project")
+    parser.add_argument("query", help="phrase to find")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    for hit in get_search_index(args.data_dir).search(args.query, args.limit):
+        where = f"{hit['start']:.1f}s" if hit["start"] is not None else "-"
+        print(f"{hit['project_name']} ({hit['project_id']}) {where}: {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Multi-zoom spectrograms of long recordings, computed out of core.
+
+The STFT of an artifact is computed block by block from its memory-mapped
+16 kHz PCM (``audio_cache.model_audio``) and written as a pyramid to one
+``.npy`` in the artifact's ``.cache`` directory: level 0 has one column per
+hop, and every level above it halves the columns by keeping the louder of
+each pair, until a level fits in one tile. Magnitudes are stored as uint8
+dB relative to full scale, so spectrograms of different artifacts (original
+and cleaned) share one color scale. An hour of audio takes about 115 MB.
+
+Readers memory-map the pyramid and touch only the tiles they show; the
+decode itself streams the file in blocks, so building the pyramid of a
+multi-hour recording needs little memory either.
+"""
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from voicecraft.audio_cache import WHISPER_SAMPLE_RATE, cached_file, model_audio
+
+SAMPLE_RATE = WHISPER_SAMPLE_RATE
+N_FFT = 1024
+HOP = 256
+
+# Frequency bins kept per column (adjacent FFT bins are merged)
+BINS = 256
+
+# Columns per tile, and per block when building
+TILE_COLUMNS = 512
+BLOCK_COLUMNS = 8192
+
+# dBFS mapped to 0 and 255
+FLOOR_DB = -100.0
+CEILING_DB = 0.0
+
+COLORMAP = "magma"
+
+# Pyramids kept open across calls and sessions
+MAX_OPEN_PYRAMIDS = 16
+
+_open_pyramids = OrderedDict()
+_lock = threading.Lock()
+
+
+def level_sizes(columns):
+    """Columns in each level of a pyramid whose level 0 has ``columns``"""
+    sizes = [columns]
+    while sizes[-1] > TILE_COLUMNS:
+        sizes.append(math.ceil(sizes[-1] / 2))
+    return sizes
+
+
+def _columns(samples):
+    # One frame centred on every hop, including the last partial one
+    return samples // HOP + 1
+
+
+def _stft_block(y, first, count, window):
+    """uint8 dB magnitudes of ``count`` frames of ``y`` from frame ``first``"""
+    lo = first * HOP - N_FFT // 2
+    hi = (first + count - 1) * HOP + N_FFT // 2
+    segment = np.zeros(hi - lo, dtype=np.float32)
+    start, end = max(lo, 0), min(hi, len(y))
+    if end > start:
+        segment[start - lo:end - lo] = y[start:end]
+    frames = np.lib.stride_tricks.sliding_window_view(segment, N_FFT)[::HOP]
+    magnitude = np.abs(np.fft.rfft(frames * window, axis=1))[:, :N_FFT // 2]
+    magnitude = magnitude.reshape(count, BINS, -1).max(axis=2)
+    # A full-scale sine peaks at sum(window) / 2
+    db = 20 * np.log10(np.maximum(magnitude / (window.sum() / 2), 1e-10))
+    return np.clip((db - FLOOR_DB) * (255 / (CEILING_DB - FLOOR_DB)), 0, 255).astype(np.uint8)
+
+
+def _write_pyramid(path, tmp_path):
+    y = model_audio(path, SAMPLE_RATE)
+    sizes = level_sizes(_columns(len(y)))
+    pyramid = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(sum(sizes), BINS))
+    window = np.hanning(N_FFT + 1)[:N_FFT].astype(np.float32)
+
+    for first in range(0, sizes[0], BLOCK_COLUMNS):
+        count = min(BLOCK_COLUMNS, sizes[0] - first)
+        pyramid[first:first + count] = _stft_block(y, first, count, window)
+
+    offset = 0
+    for below, size in zip(sizes, sizes[1:]):
+        source = pyramid[offset:offset + below]
+        offset += below
+        for first in range(0, size, BLOCK_COLUMNS):
+            pairs = np.asarray(source[2 * first:2 * min(first + BLOCK_COLUMNS, size)])
+            if len(pairs) % 2:
+                pairs = np.concatenate([pairs, pairs[-1:]])
+            pyramid[offset + first:offset + first + len(pairs) // 2] = pairs.reshape(-1, 2, BINS).max(axis=1)
+    pyramid.flush()
+    del pyramid
+
+
+class SpectrogramPyramid:
+    """The spectrogram pyramid of one audio artifact, built on first use"""
+
+    def __init__(self, path):
+        settings = f"spectrogram-{N_FFT}-{HOP}-{BINS}-{TILE_COLUMNS}"
+        self.file = cached_file(path, settings, ".npy", lambda tmp_path: _write_pyramid(path, tmp_path))
+        self.data = np.load(self.file, mmap_mode="r")
+        self.duration = len(model_audio(path, SAMPLE_RATE)) / SAMPLE_RATE
+        self.sizes = level_sizes(_columns(int(self.duration * SAMPLE_RATE)))
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(int)
+
+    def column_seconds(self, level):
+        return HOP / SAMPLE_RATE * 2 ** level
+
+    def tiles(self, level):
+        return math.ceil(self.sizes[level] / TILE_COLUMNS)
+
+    def tile(self, level, index):
+        """``(columns, BINS)`` uint8 dB of one tile (the last one of a level may be narrower)"""
+        if not 0 <= level < len(self.sizes) or not 0 <= index < self.tiles(level):
+            raise IndexError(f"No tile {index} at level {level}")
+        first = self.offsets[level] + index * TILE_COLUMNS
+        last = self.offsets[level] + min(self.sizes[level], (index + 1) * TILE_COLUMNS)
+        return np.asarray(self.data[first:last])
+
+    def level_for(self, seconds, columns):
+        """Most detailed level that shows ``seconds`` in at most about ``columns`` columns"""
+        for level in range(len(self.sizes)):
+            if seconds / self.column_seconds(level) <= columns:
+                return level
+        return len(self.sizes) - 1
+
+    def view(self, start, end, columns=1000):
+        """
+        ``(image, (start, end))``: uint8 dB of ``start``-``end`` seconds at a fitting zoom.
+
+        Rows are frequencies from low to high. Only the tiles that overlap
+        the range are read.
+        """
+        start, end = max(0.0, start), min(self.duration, end)
+        level = self.level_for(end - start, columns)
+        step = self.column_seconds(level)
+        first = int(start / step)
+        last = min(self.sizes[level], max(first + 1, math.ceil(end / step)))
+        parts = [self.tile(level, index) for index in range(first // TILE_COLUMNS, (last - 1) // TILE_COLUMNS + 1)]
+        skip = first - first // TILE_COLUMNS * TILE_COLUMNS
+        image = np.concatenate(parts)[skip:skip + last - first]
+        return image.T, (first * step, last * step)
+
+
+def open_pyramid(path):
+    """The pyramid of ``path``, opened once per version of the file and shared"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        pyramid = _open_pyramids.get(key)
+        if pyramid is not None:
+            _open_pyramids.move_to_end(key)
+            return pyramid
+    pyramid = SpectrogramPyramid(path)
+    with _lock:
+        _open_pyramids[key] = pyramid
+        while len(_open_pyramids) > MAX_OPEN_PYRAMIDS:
+            _open_pyramids.popitem(last=False)
+    return pyramid
+
+
+def open_files():
+    """Pyramid files this process has memory-mapped right now"""
+    with _lock:
+        return {os.path.abspath(pyramid.file) for pyramid in _open_pyramids.values()}
+
+
+def colorize(image):
+    """RGB of a uint8 dB image, high frequencies at the top"""
+    from matplotlib import colormaps
+
+    lut = (colormaps[COLORMAP](np.arange(256))[:, :3] * 255).astype(np.uint8)
+    return lut[image[::-1]]
+
+
+def png(image):
+    """PNG bytes of a uint8 dB image"""
+    from matplotlib.image import imsave
+
+    buffer = io.BytesIO()
+    imsave(buffer, colorize(image), format="png")
+    return buffer.getvalue()
@@ -0,0 +1,219 @@
+"""
+Codec-aware storage of audio artifacts.
+
+Audio artifacts are named by a stem (``cleaned_audio``) and stored with the
+configured codec, so the file on disk may be ``cleaned_audio.flac`` or an
+older ``cleaned_audio.wav``. FLAC is lossless: decoding it gives exactly the
+samples a 16-bit WAV would hold, so pipeline results do not change. The UI
+plays small lossy previews (Opus by default) cached next to the artifact.
+
+Existing WAV projects can be converted in place with
+``python -m voicecraft.storage [data_dir]``.
+"""
+import argparse
+import functools
+import os
+import threading
+
+from voicecraft.audio_cache import cached_file
+from voicecraft.config import AUDIO_CODEC, DATA_DIR, PREVIEW_CODEC
+
+# soundfile format and subtype of each storage codec
+CODECS = {
+    "flac": {"extension": ".flac", "format": "FLAC", "subtype": "PCM_16"},
+    "wav": {"extension": ".wav", "format": "WAV", "subtype": "PCM_16"},
+}
+
+# Lossy codecs, only used for previews the UI plays
+PREVIEW_CODECS = {
+    "opus": {"extension": ".ogg", "format": "OGG", "subtype": "OPUS"},
+    "vorbis": {"extension": ".ogg", "format": "OGG", "subtype": "VORBIS"},
+}
+
+# Previews are mono speech; 24 kHz is one of the rates Opus supports
+PREVIEW_SAMPLE_RATE = 24000
+
+# Files longer than this get a narrower, lower-bitrate preview
+LONG_PREVIEW_SECONDS = 600
+LONG_PREVIEW_SAMPLE_RATE = 16000
+
+# libsndfile compression level of long previews (about 16 kbit/s with Opus)
+LONG_PREVIEW_COMPRESSION = 0.95
+
+# Extensions an audio artifact can be stored with, in lookup order
+AUDIO_EXTENSIONS = (".flac", ".wav")
+
+MIME_TYPES = {
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+}
+
+# Integer PCM WAV subtypes and the FLAC subtype that holds them losslessly
+_LOSSLESS_SUBTYPES = {"PCM_U8": "PCM_S8", "PCM_S8": "PCM_S8", "PCM_16": "PCM_16", "PCM_24": "PCM_24"}
+
+# Frames per block when re-encoding, so long recordings are never fully in memory
+_BLOCK_FRAMES = 1 << 18
+
+
+def _stem(path):
+    root, extension = os.path.splitext(path)
+    return root if extension in AUDIO_EXTENSIONS else path
+
+
+def stored_audio(path):
+    """The file holding the audio artifact ``path`` whatever codec it was stored with, or None"""
+    stem = _stem(path)
+    for extension in AUDIO_EXTENSIONS:
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+
+def target_path(path, codec=None):
+    """Where the audio artifact ``path`` is written with ``codec`` (default: the configured one)"""
+    return _stem(path) + CODECS[codec or AUDIO_CODEC]["extension"]
+
+
+def remove_audio(path, keep=None):
+    """Delete every stored version of the audio artifact ``path`` except ``keep``"""
+    stem = _stem(path)
+    for extension in AUDIO_EXTENSIONS:
+        candidate = stem + extension
+        if candidate != keep and os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def write_audio(path, data, sample_rate, codec=None):
+    """Store samples as the audio artifact ``path`` and return the file written"""
+    import soundfile as sf
+
+    codec_name = codec or AUDIO_CODEC
+    codec = CODECS[codec_name]
+    target = target_path(path, codec_name)
+    tmp_path = f"{_stem(path)}.{os.getpid()}-{threading.get_ident()}.tmp{codec['extension']}"
+    sf.write(tmp_path, data, sample_rate, format=codec["format"], subtype=codec["subtype"])
+    os.replace(tmp_path, target)
+    remove_audio(path, keep=target)
+    return target
+
+
+def store_file(source, path, codec=None):
+    """
+    Move the audio file ``source`` into place as the audio artifact ``path``.
+
+    Integer PCM WAV is re-encoded losslessly with ``codec`` at its own bit
+    depth. Anything else (MP3, M4A, float WAV, ...) is already compressed or
+    cannot be held losslessly, so it is kept byte for byte.
+    Returns the file the artifact now lives in.
+    """
+    import soundfile as sf
+
+    codec_name = codec or AUDIO_CODEC
+    codec = CODECS[codec_name]
+    try:
+        info = sf.info(source)
+    except RuntimeError:
+        info = None
+
+    if codec["format"] != "WAV" and info is not None and info.format == "WAV" \
+            and info.subtype in _LOSSLESS_SUBTYPES:
+        target = target_path(path, codec_name)
+        tmp_path = f"{_stem(path)}.{os.getpid()}-{threading.get_ident()}.tmp{codec['extension']}"
+        dtype = "int16" if info.subtype != "PCM_24" else "int32"
+        with sf.SoundFile(source) as src, \
+                sf.SoundFile(tmp_path, "w", samplerate=src.samplerate, channels=src.channels,
+                             format=codec["format"], subtype=_LOSSLESS_SUBTYPES[info.subtype]) as dst:
+            for block in src.blocks(blocksize=_BLOCK_FRAMES, dtype=dtype, always_2d=True):
+                dst.write(block)
+        os.replace(tmp_path, target)
+        if os.path.abspath(source) != os.path.abspath(target):
+            os.remove(source)
+    else:
+        target = path
+        if os.path.abspath(source) != os.path.abspath(target):
+            os.replace(source, target)
+    remove_audio(path, keep=target)
+    return target
+
+
+def mime_type(path):
+    return MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+
+@functools.lru_cache(maxsize=1024)
+def _duration(path, mtime_ns, size):
+    import librosa
+    return librosa.get_duration(path=path)
+
+
+def audio_duration(path):
+    """Seconds of audio in ``path``, probed once per version of the file (MP3/M4A need ffmpeg)"""
+    stat = os.stat(path)
+    return _duration(path, stat.st_mtime_ns, stat.st_size)
+
+
+def preview_file(path, codec=None):
+    """
+    Path of a small lossy copy of ``path`` for playback, encoded only once.
+
+    Recordings longer than LONG_PREVIEW_SECONDS are downsampled further and
+    encoded at a lower bitrate. Returns ``path`` itself when previews are
+    turned off (codec "none").
+    """
+    import librosa
+    import soundfile as sf
+
+    codec_name = codec or PREVIEW_CODEC
+    if codec_name not in PREVIEW_CODECS:
+        return path
+    codec = PREVIEW_CODECS[codec_name]
+
+    if audio_duration(path) > LONG_PREVIEW_SECONDS:
+        tag, sample_rate, options = f"preview-{codec_name}-long", LONG_PREVIEW_SAMPLE_RATE, \
+            {"compression_level": LONG_PREVIEW_COMPRESSION}
+    else:
+        tag, sample_rate, options = f"preview-{codec_name}", PREVIEW_SAMPLE_RATE, {}
+
+    def write(tmp_path):
+        y, _ = librosa.load(path, sr=sample_rate, mono=True)
+        sf.write(tmp_path, y, sample_rate, format=codec["format"], subtype=codec["subtype"], **options)
+
+    return cached_file(path, tag, codec["extension"], write)
+
+
+def compact_project(project_dir, codec=None):
+    """Re-encode a project's WAV artifacts with ``codec``; returns bytes saved"""
+    from voicecraft.projects import ARTIFACTS, AUDIO_ARTIFACTS
+
+    saved = 0
+    for key in AUDIO_ARTIFACTS:
+        path = os.path.join(project_dir, ARTIFACTS[key])
+        current = stored_audio(path)
+        if current is None or not current.endswith(".wav"):
+            continue
+        before = os.path.getsize(current)
+        saved += before - os.path.getsize(store_file(current, path, codec))
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode stored WAV artifacts with the configured codec")
+    parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    parser.add_argument("--codec", choices=sorted(CODECS), default=AUDIO_CODEC)
+    args = parser.parse_args()
+
+    from voicecraft.projects import list_projects
+
+    total = 0
+    for project_id, project in list_projects(args.data_dir).items():
+        saved = compact_project(project["dir"], args.codec)
+        total += saved
+        print(f"{project_id}: saved {saved / 1e6:.1f} MB")
+    print(f"Total saved: {total / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
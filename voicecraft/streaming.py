@@ -0,0 +1,395 @@
+"""
+Live denoising and transcription of an audio stream.
+
+Frames arrive from a socket, a pipe or a file replayed at real-time speed
+and are written into a ring buffer by a reader thread. The processing loop
+gates them against a stationary noise threshold block by block (the same
+gate as ``denoise.spectral_gate``, with a short lookahead instead of whole
+file chunks) into a second ring buffer, and decodes a sliding window of
+the cleaned audio with Whisper every ``step_seconds``. Segments that end
+well before the window's end are final; the rest are re-decoded with more
+context on the next step and reported as partial. Every event carries its
+latency: the time from the arrival of the newest sample it covers to the
+moment it is emitted.
+
+The stream is 16 kHz mono (what Whisper takes); pipes and sockets carry
+signed 16-bit little-endian PCM.
+
+    python -m voicecraft.streaming --file call.wav
+    arecord -f S16_LE -r 16000 -c 1 | python -m voicecraft.streaming --stdin
+    python -m voicecraft.streaming --listen 127.0.0.1:9000
+"""
+import argparse
+import bisect
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from voicecraft.admission import get_gate
+from voicecraft.audio_cache import WHISPER_SAMPLE_RATE
+from voicecraft.backends import get_backends
+from voicecraft.denoise import noise_statistics, spectral_gate
+from voicecraft.models import estimate_job_memory_mb
+from voicecraft.resources import get_governor
+
+SAMPLE_RATE = WHISPER_SAMPLE_RATE
+
+# Length of one incoming frame
+FRAME_MS = 20
+
+# Audio kept in each ring buffer; older samples are overwritten
+RING_SECONDS = 60
+
+# Samples gated per block, and the context on each side of it (the lookahead
+# is the latency the gate adds)
+DENOISE_BLOCK = 4096
+DENOISE_PADDING = 2048
+
+# Audio used to estimate the noise threshold when no profile is given
+LEARN_SECONDS = 1.0
+
+# Decoding cadence, longest window and the tail of each window that stays partial
+STEP_SECONDS = 1.0
+WINDOW_SECONDS = 15.0
+OVERLAP_SECONDS = 2.0
+
+
+class RingBuffer:
+    """
+    Fixed-size float32 sample buffer addressed by absolute sample position.
+
+    One thread writes, others read any range still held. ``end`` is the
+    number of samples ever written; samples before ``end - capacity`` have
+    been overwritten.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.end = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def start(self):
+        return max(0, self.end - self.capacity)
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)[-self.capacity:]
+        with self._cond:
+            index = self.end % self.capacity
+            first = min(len(samples), self.capacity - index)
+            self._data[index:index + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+            self.end += len(samples)
+            self._cond.notify_all()
+
+    def read(self, start, end):
+        """Copy of samples ``[start, end)``; raises if part of it was overwritten"""
+        with self._cond:
+            if start < self.start or end > self.end:
+                raise IndexError(f"Samples {start}-{end} not in buffer ({self.start}-{self.end})")
+            index = np.arange(start, end) % self.capacity
+            return self._data[index]
+
+    def wait(self, position, timeout=None):
+        """Block until ``position`` samples were written or the buffer is closed; returns ``end``"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.end >= position or self.closed, timeout)
+            return self.end
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StreamingDenoiser:
+    """
+    Stationary spectral gate over a stream, one block at a time.
+
+    Each block is gated with ``padding`` samples of context on both sides,
+    so the output is exactly ``spectral_gate(y, sr, threshold_db,
+    chunk_size=block, padding=padding)`` of the whole stream. Without
+    ``threshold_db`` the threshold is estimated from the first
+    ``learn_seconds`` of the stream.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, threshold_db=None, prop_decrease=1.0, block=DENOISE_BLOCK,
+                 padding=DENOISE_PADDING, learn_seconds=LEARN_SECONDS):
+        self.sr = sr
+        self.threshold_db = threshold_db
+        self.prop_decrease = prop_decrease
+        self.block = block
+        self.padding = padding
+        self.learn_samples = int(learn_seconds * sr)
+        self.position = 0
+
+    def process(self, source, target, final=False):
+        """Gate every block of ``source`` that has its lookahead, into ``target``; returns samples written"""
+        if self.threshold_db is None:
+            if source.end == 0 or (source.end < self.learn_samples and not final):
+                return 0
+            learn_end = min(source.end, self.learn_samples)
+            self.threshold_db = noise_statistics(source.read(source.start, learn_end))[2]
+
+        written = 0
+        while True:
+            end = min(self.position + self.block, source.end)
+            if end <= self.position or (not final and end + self.padding > source.end):
+                return written
+            lo = max(source.start, self.position - self.padding)
+            hi = min(source.end, end + self.padding)
+            chunk = np.zeros(end - self.position + 2 * self.padding, dtype=np.float32)
+            offset = self.padding - (self.position - lo)
+            chunk[offset:offset + hi - lo] = source.read(lo, hi)
+            filtered = spectral_gate(chunk, self.sr, self.threshold_db, self.prop_decrease,
+                                     chunk_size=len(chunk), padding=0)
+            target.write(filtered[self.padding:self.padding + end - self.position])
+            written += end - self.position
+            self.position = end
+
+
+class LiveTranscriber:
+    """
+    Rolling Whisper decoding of a growing buffer of cleaned audio.
+
+    Audio from ``committed`` (the end of the last final segment) onwards,
+    up to ``window_seconds`` of it, is decoded as one window. Segments
+    ending more than ``overlap_seconds`` before the window's end are final;
+    the rest is decoded again, with more audio, on the next call.
+    """
+
+    def __init__(self, backend, model_size="base", sr=SAMPLE_RATE, window_seconds=WINDOW_SECONDS,
+                 overlap_seconds=OVERLAP_SECONDS):
+        self.backend = backend
+        self.model_size = model_size
+        self.sr = sr
+        self.window = int(window_seconds * sr)
+        self.overlap = int(overlap_seconds * sr)
+        self.committed = 0
+        self.prompt = ""
+
+    def decode(self, cleaned, final=False):
+        """
+        ``(final_segments, partial_text, window_end)`` for the oldest undecided audio in ``cleaned``.
+
+        When decoding falls behind real time the backlog is worked through
+        in order, one window per call; only audio already overwritten in the
+        ring buffer is skipped. ``final`` marks the end of the stream.
+        """
+        start = max(self.committed, cleaned.start)
+        end = min(cleaned.end, start + self.window)
+        final = final and end == cleaned.end
+        self.committed = start
+        if end - start < self.sr // 10:
+            if final:
+                self.committed = end
+            return [], "", end
+        options = dict(fp16=False, language='en', verbose=None, temperature=0, condition_on_previous_text=False)
+        if self.prompt:
+            # Committed text gives the next window context for names and casing
+            options["initial_prompt"] = self.prompt
+        result = self.backend.transcribe(cleaned.read(start, end), self.model_size, **options)
+        segments = [s for s in result.get("segments", []) if s["text"].strip()]
+
+        full = end - start >= self.window
+        if final:
+            stable = len(segments)
+        else:
+            stable_until = (end - start - self.overlap) / self.sr
+            stable = sum(1 for s in segments if s["end"] <= stable_until)
+            if stable == 0 and full:
+                # One segment spans the whole window: commit it rather than grow without bound
+                stable = max(0, len(segments) - 1) or len(segments)
+
+        finals = [
+            {"start": (start + s["start"] * self.sr) / self.sr, "end": (start + s["end"] * self.sr) / self.sr,
+             "text": s["text"].strip()}
+            for s in segments[:stable]
+        ]
+        if finals:
+            self.committed = min(end, start + int(round(segments[stable - 1]["end"] * self.sr)))
+            self.prompt = (self.prompt + " " + " ".join(f["text"] for f in finals))[-200:]
+        if final or (full and stable == len(segments)):
+            self.committed = end
+        partial = " ".join(s["text"].strip() for s in segments[stable:])
+        return finals, partial, end
+
+
+def _arrival_time(arrivals, position):
+    # arrivals: sorted (end_sample, monotonic time) of every frame received
+    index = bisect.bisect_left(arrivals, (position, float("-inf")))
+    return arrivals[min(index, len(arrivals) - 1)][1]
+
+
+def stream_transcribe(frames, backend=None, model_size="base", noise_reduction=True, threshold_db=None,
+                      step_seconds=STEP_SECONDS, window_seconds=WINDOW_SECONDS,
+                      overlap_seconds=OVERLAP_SECONDS, session_id="stream"):
+    """
+    Denoise and transcribe a live stream; yields events as they happen.
+
+    ``frames`` is an iterable of float32 16 kHz mono arrays (see the
+    ``*_frames`` sources). Events are dicts with ``type`` ``"partial"`` or
+    ``"final"``, ``text``, ``start``/``end`` (seconds into the stream; for
+    partials the span still being decoded) and ``latency`` in seconds.
+
+    Every window decode takes a Whisper slot of the inference gate and gives
+    it back when done, so a stream waiting for audio does not keep file
+    transcriptions from running. Audio that arrives while a decode queues
+    is worked through as a backlog once it is granted.
+    """
+    if backend is None:
+        backend = get_backends()[0]
+    capacity = int(RING_SECONDS * SAMPLE_RATE)
+    incoming = RingBuffer(capacity)
+    cleaned = RingBuffer(capacity)
+    denoiser = StreamingDenoiser(threshold_db=threshold_db) if noise_reduction else None
+    transcriber = LiveTranscriber(backend, model_size, window_seconds=window_seconds,
+                                  overlap_seconds=overlap_seconds)
+    arrivals = []
+    errors = []
+
+    def read_frames():
+        try:
+            for frame in frames:
+                incoming.write(frame)
+                arrivals.append((incoming.end, time.monotonic()))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            incoming.close()
+
+    reader = threading.Thread(target=read_frames, name="voicecraft-stream-reader", daemon=True)
+    step = int(step_seconds * SAMPLE_RATE)
+    model_key = f"whisper:{model_size}"
+    reader.start()
+    decoded_until = 0
+    while True:
+        incoming.wait(incoming.end + 1, timeout=step_seconds)
+        done = incoming.closed and not reader.is_alive()
+        if denoiser is not None:
+            denoiser.process(incoming, cleaned, final=done)
+        elif incoming.end > cleaned.end:
+            cleaned.write(incoming.read(max(cleaned.end, incoming.start), incoming.end))
+
+        while cleaned.end - decoded_until >= step or (done and transcriber.committed < cleaned.end):
+            working_set_mb = estimate_job_memory_mb(model_key, window_seconds, backend)
+            with get_gate().slot(model_key, session_id, working_set_mb=working_set_mb), \
+                    get_governor().stage("transcribe"):
+                finals, partial, window_end = transcriber.decode(cleaned, final=done)
+            decoded_until = window_end
+            if not arrivals:
+                continue
+            latency = time.monotonic() - _arrival_time(arrivals, window_end)
+            for segment in finals:
+                yield {"type": "final", **segment, "latency": latency}
+            if partial:
+                yield {"type": "partial", "text": partial, "start": transcriber.committed / SAMPLE_RATE,
+                       "end": window_end / SAMPLE_RATE, "latency": latency}
+            # Arrival times of committed audio are no longer needed
+            del arrivals[:max(0, bisect.bisect_left(arrivals, (transcriber.committed, 0.0)) - 1)]
+        if done:
+            break
+    if errors:
+        raise errors[0]
+
+
+def _split_frames(y, frame):
+    for start in range(0, len(y), frame):
+        yield y[start:start + frame]
+
+
+def file_frames(path, realtime=True, frame_ms=FRAME_MS):
+    """Frames of an audio file, paced at real-time speed when ``realtime``"""
+    import librosa
+
+    y, _ = librosa.load(path, sr=SAMPLE_RATE, mono=True)
+    frame = int(SAMPLE_RATE * frame_ms / 1000)
+    started = time.monotonic()
+    for index, chunk in enumerate(_split_frames(y, frame)):
+        if realtime:
+            # Sleep until the frame would have been recorded, without drifting
+            delay = started + (index + 1) * frame / SAMPLE_RATE - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield chunk
+
+
+def pcm_frames(stream, frame_ms=FRAME_MS):
+    """Frames of signed 16-bit little-endian mono PCM read from a binary stream (pipe, socket file)"""
+    frame_bytes = int(SAMPLE_RATE * frame_ms / 1000) * 2
+    pending = b""
+    while True:
+        data = stream.read(frame_bytes - len(pending))
+        if not data:
+            break
+        pending += data
+        if len(pending) >= frame_bytes:
+            yield np.frombuffer(pending, dtype="<i2").astype(np.float32) / 32768.0
+            pending = b""
+    if len(pending) >= 2:
+        yield np.frombuffer(pending[:len(pending) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def socket_frames(host, port, frame_ms=FRAME_MS):
+    """Frames of the first client that connects to ``host:port`` and sends PCM"""
+    with socket.create_server((host, port)) as server:
+        connection, _ = server.accept()
+        with connection, connection.makefile("rb") as stream:
+            yield from pcm_frames(stream, frame_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live denoising and transcription of an audio stream")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="audio file replayed at real-time speed")
+    source.add_argument("--stdin", action="store_true", help="16 kHz s16le mono PCM on standard input")
+    source.add_argument("--listen", metavar="HOST:PORT", help="accept one connection sending 16 kHz s16le PCM")
+    parser.add_argument("--fast", action="store_true", help="replay --file as fast as possible")
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--no-noise-reduction", action="store_true")
+    parser.add_argument("--noise-profile", default=None, help="stored noise profile to gate against")
+    parser.add_argument("--step", type=float, default=STEP_SECONDS, help="seconds between decodes")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="longest decoded window in seconds")
+    parser.add_argument("--backend", choices=["real", "stub"], default=None)
+    args = parser.parse_args()
+
+    if args.file:
+        frames = file_frames(args.file, realtime=not args.fast)
+    elif args.stdin:
+        frames = pcm_frames(sys.stdin.buffer)
+    else:
+        host, port = args.listen.rsplit(":", 1)
+        frames = socket_frames(host, int(port))
+
+    threshold_db = None
+    if args.noise_profile:
+        from voicecraft import noise_profiles
+        from voicecraft.denoise import resample_threshold
+        meta, threshold_db = noise_profiles.load(args.noise_profile)
+        threshold_db = resample_threshold(threshold_db, meta["sample_rate"], SAMPLE_RATE)
+
+    latencies = {"partial": [], "final": []}
+    events = stream_transcribe(frames, get_backends(args.backend)[0], args.model_size,
+                               noise_reduction=not args.no_noise_reduction, threshold_db=threshold_db,
+                               step_seconds=args.step, window_seconds=args.window)
+    for event in events:
+        latencies[event["type"]].append(event["latency"])
+        if event["type"] == "final":
+            print(f"[{event['start']:7.2f}-{event['end']:7.2f}] {event['text']}  ({event['latency']:.2f}s)",
+                  flush=True)
+        else:
+            print(f"  ... {event['text']}  ({event['latency']:.2f}s)", file=sys.stderr, flush=True)
+
+    for kind, values in latencies.items():
+        if values:
+            print(f"{kind} latency: median {np.median(values):.2f}s, "
+                  f"p95 {np.percentile(values, 95):.2f}s over {len(values)} events", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Time resolution of the lookup table (seconds)
+RESOLUTION = 0.01
+
+
+def save_segments(path, result):
+    """
+    Store Whisper's segments (and word timings if present) in a compact JSON file.
+
+    Layout: ``{"v": 1, "segments": [[start, end, text], ...],
+    "words": [[start, end, word], ...]}`` with times rounded to milliseconds.
+    """
+    segments = [
+        [round(float(s["start"]), 3), round(float(s["end"]), 3), s["text"]]
+        for s in result.get("segments", [])
+    ]
+    words = [
+        [round(float(w["start"]), 3), round(float(w["end"]), 3), w["word"]]
+        for s in result.get("segments", [])
+        for w in s.get("words") or []
+    ]
+    data = {"v": FORMAT_VERSION, "segments": segments}
+    if words:
+        data["words"] = words
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def matches_text(segments, text):
+    """Whether stored ``segments`` still spell out ``text``; a transcript edited by hand no longer does"""
+    return _normalize("".join(segment[2] for segment in segments)) == _normalize(text)
+
+
+class TranscriptIndex:
+    """
+    Constant-time lookup of the transcript text spoken inside a time window.
+
+    Units are words when word timestamps were stored, otherwise segments. A
+    unit belongs to a window when its midpoint falls inside it. At load time
+    the units' midpoints are laid out on a 10 ms grid, so ``text_between``
+    is two array lookups and one string slice, with no search.
+    """
+
+    def __init__(self, units):
+        self.units = units
+        texts = [unit[2] for unit in units]
+        self.text = "".join(texts)
+        self.offsets = np.concatenate(([0], np.cumsum([len(t) for t in texts]))).astype(np.int64)
+        mids = np.array([(unit[0] + unit[1]) / 2 for unit in units], dtype=np.float64)
+        self.duration = float(units[-1][1]) if units else 0.0
+        grid = np.arange(int(np.ceil(self.duration / RESOLUTION)) + 2) * RESOLUTION
+        # first_at[i]: first unit with midpoint >= grid[i]
+        # last_before[i]: number of units with midpoint <= grid[i]
+        self.first_at = np.searchsorted(mids, grid, side="left")
+        self.last_before = np.searchsorted(mids, grid, side="right")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("words") or data.get("segments") or [])
+
+    def _cell(self, seconds):
+        return min(len(self.first_at) - 1, max(0, int(round(seconds / RESOLUTION))))
+
+    def text_between(self, start, end):
+        """Transcript text for the window ``[start, end]`` in seconds"""
+        if not self.units or end <= start:
+            return ""
+        first = self.first_at[self._cell(start)]
+        stop = self.last_before[self._cell(end)]
+        if stop <= first:
+            return ""
+        return self.text[self.offsets[first]:self.offsets[stop]].strip()
+
+
+_index_cache = {}
+
+
+def get_index(path):
+    """TranscriptIndex for ``path``, rebuilt only when the file changes"""
+    mtime = os.path.getmtime(path)
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, TranscriptIndex.load(path))
+        _index_cache[path] = cached
+    return cached[1]
@@ -0,0 +1,194 @@
+"""
+Library of saved voices, shared by every project.
+
+A voice is a speaker's reference clip and the text spoken in it, stored
+under ``<data_dir>/.voices/<voice_id>`` in the form F5-TTS consumes as
+conditioning: mono 16-bit WAV at 24 kHz, at most MAX_REFERENCE_SECONDS
+long, loudness-normalized, with the reference text punctuated the way
+F5-TTS expects. Cloning from a saved voice therefore skips upload,
+denoising, transcription, trimming and resampling, and F5-TTS neither
+clips the clip nor runs its own ASR on it.
+
+The voice ID is derived from the clip and its text, so saving the same
+reference twice gives the same voice. ``index.json`` maps IDs to names
+and a few details for listing and lookup without opening every voice.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from voicecraft.audio_cache import F5_SAMPLE_RATE
+from voicecraft.config import DATA_DIR
+
+VOICES_DIR_NAME = ".voices"
+
+INDEX_FILE = "index.json"
+REFERENCE_FILE = "reference.wav"
+META_FILE = "voice.json"
+
+# F5-TTS cuts longer references down itself, on every call
+MAX_REFERENCE_SECONDS = 12.0
+
+# F5-TTS raises quieter references to this RMS before inference
+TARGET_RMS = 0.1
+
+_lock = threading.Lock()
+_index_cache = {}
+
+
+class VoiceError(Exception):
+    """Raised when a voice cannot be saved or found"""
+
+
+def voices_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, VOICES_DIR_NAME)
+
+
+def _voice_dir(voice_id, data_dir):
+    if not voice_id or not all(c in "0123456789abcdef" for c in voice_id):
+        raise VoiceError(f"Invalid voice id {voice_id!r}")
+    return os.path.join(voices_dir(data_dir), voice_id)
+
+
+def normalize_text(ref_text):
+    """Reference text ending in ". " as F5-TTS would make it"""
+    ref_text = " ".join(ref_text.split())
+    if not ref_text or ref_text.endswith("。"):
+        return ref_text
+    return ref_text + (" " if ref_text.endswith(".") else ". ")
+
+
+def conditioning_audio(y, sr):
+    """Mono 24 kHz float32 reference, loudness-normalized like F5-TTS does before inference"""
+    import librosa
+
+    y = np.asarray(y, dtype=np.float32)
+    if y.ndim > 1:
+        y = librosa.to_mono(y)
+    if sr != F5_SAMPLE_RATE:
+        y = librosa.resample(y, orig_sr=sr, target_sr=F5_SAMPLE_RATE)
+    rms = float(np.sqrt(np.mean(y * y))) if len(y) else 0.0
+    if 0.0 < rms < TARGET_RMS:
+        y = y * (TARGET_RMS / rms)
+    return np.clip(y, -1.0, 1.0)
+
+
+def _read_index(data_dir):
+    path = os.path.join(voices_dir(data_dir), INDEX_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = (mtime, json.load(f))
+        _index_cache[path] = cached
+    return cached[1]
+
+
+def _write_index(index, data_dir):
+    path = os.path.join(voices_dir(data_dir), INDEX_FILE)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save(name, y, sr, ref_text, source=None, data_dir=DATA_DIR):
+    """
+    Save a reference clip and its text as a voice; returns the voice's metadata.
+
+    ``y`` longer than MAX_REFERENCE_SECONDS is cut to its start; pick the
+    window beforehand (``pipeline.save_voice`` does) to keep the best part.
+    ``source`` is free-form provenance stored with the voice.
+    """
+    import soundfile as sf
+
+    name = name.strip()
+    if not name:
+        raise VoiceError("Please provide a voice name")
+    ref_text = normalize_text(ref_text)
+    if not ref_text:
+        raise VoiceError("A voice needs the text spoken in its reference clip")
+    y = conditioning_audio(y, sr)[:int(MAX_REFERENCE_SECONDS * F5_SAMPLE_RATE)]
+    if len(y) < F5_SAMPLE_RATE:
+        raise VoiceError(f"Reference clip is too short ({len(y) / F5_SAMPLE_RATE:.2f}s)")
+
+    pcm = (y * 32767).astype("<i2")
+    voice_id = hashlib.sha256(pcm.tobytes() + ref_text.encode("utf-8")).hexdigest()[:16]
+    voice_dir = _voice_dir(voice_id, data_dir)
+    meta = {
+        "id": voice_id,
+        "name": name,
+        "ref_text": ref_text,
+        "duration": round(len(pcm) / F5_SAMPLE_RATE, 2),
+        "sample_rate": F5_SAMPLE_RATE,
+        "source": source,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+    with _lock:
+        os.makedirs(voice_dir, exist_ok=True)
+        reference_path = os.path.join(voice_dir, REFERENCE_FILE)
+        if not os.path.exists(reference_path):
+            tmp_path = os.path.join(voice_dir, f"reference.{threading.get_ident()}.tmp.wav")
+            sf.write(tmp_path, pcm, F5_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+            os.replace(tmp_path, reference_path)
+        with open(os.path.join(voice_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        index = dict(_read_index(data_dir))
+        index[voice_id] = {key: meta[key] for key in ("name", "duration", "created")}
+        _write_index(index, data_dir)
+    return meta
+
+
+def list_voices(data_dir=DATA_DIR):
+    """``[{"id", "name", "duration", "created"}, ...]`` of every saved voice, sorted by name"""
+    voices = [{"id": voice_id, **entry} for voice_id, entry in _read_index(data_dir).items()]
+    return sorted(voices, key=lambda voice: (voice["name"].lower(), voice["id"]))
+
+
+def find(name_or_id, data_dir=DATA_DIR):
+    """ID of the voice with this ID or name (the newest one if names repeat), or None"""
+    index = _read_index(data_dir)
+    if name_or_id in index:
+        return name_or_id
+    matches = [(entry["created"], voice_id) for voice_id, entry in index.items() if entry["name"] == name_or_id]
+    return max(matches)[1] if matches else None
+
+
+def load(voice_id, data_dir=DATA_DIR):
+    """Metadata of a saved voice, including its ``reference`` path"""
+    voice_dir = _voice_dir(voice_id, data_dir)
+    try:
+        with open(os.path.join(voice_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise VoiceError(f"Voice {voice_id} not found")
+    meta["reference"] = os.path.join(voice_dir, REFERENCE_FILE)
+    return meta
+
+
+def reference(voice_id, data_dir=DATA_DIR):
+    """``(ref_audio_path, ref_text)`` to clone from a saved voice"""
+    meta = load(voice_id, data_dir)
+    return meta["reference"], meta["ref_text"]
+
+
+def delete(voice_id, data_dir=DATA_DIR):
+    """Remove a saved voice"""
+    voice_dir = _voice_dir(voice_id, data_dir)
+    with _lock:
+        index = dict(_read_index(data_dir))
+        if voice_id not in index and not os.path.isdir(voice_dir):
+            raise VoiceError(f"Voice {voice_id} not found")
+        index.pop(voice_id, None)
+        _write_index(index, data_dir)
+        shutil.rmtree(voice_dir, ignore_errors=True)